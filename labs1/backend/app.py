@@ -1,20 +1,31 @@
 # app.py
+import asyncio
+import time
 from contextlib import asynccontextmanager
-from typing import List, AsyncIterator
+from enum import Enum
+from typing import AsyncIterator, List, Optional
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import orjson
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 
-from database import AsyncSessionLocal, init_db
-from models import Task
+import crud
+from cache import CachedResponse, task_cache
+from changes import CREATED, DELETED, UPDATED, change_feed
+from database import AsyncSessionLocal, engine, env_int, init_db, pool_stats, read_router
+from metrics import MetricsMiddleware, SlowRequestProfiler, instrument_sqlalchemy, registry, update_pool_gauges
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     await init_db()
+    await change_feed.start_listener(engine, AsyncSessionLocal)
+    await change_feed.start_pruner(AsyncSessionLocal)
     yield
+    await change_feed.stop_pruner()
+    await change_feed.stop_listener()
 
 app = FastAPI(
     title="Task Tracker API",
@@ -30,13 +41,64 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "ETag", "Last-Modified", "Server-Timing"],
 )
 
+instrument_sqlalchemy()
+app.add_middleware(
+    MetricsMiddleware,
+    statement_warning=env_int("METRICS_STATEMENT_WARNING", 20),
+    profiler=SlowRequestProfiler.from_env(),
+    long_lived_paths=("/tasks/changes",),
+)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 1000
+MAX_SEARCH_OFFSET = 10000
+CHANGES_PAGE_SIZE = 500
+MAX_POLL_WAIT = 60
+SSE_HEARTBEAT_SECONDS = 15
+STICKY_COOKIE = "read_primary_until"
+
 async def get_session() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         yield session
 
 
+async def get_write_session(response: Response, session: AsyncSession = Depends(get_session)) -> AsyncSession:
+    """Сессия основной БД; клиент на время задержки репликации читает тоже из неё"""
+    if read_router:
+        response.set_cookie(
+            STICKY_COOKIE, str(time.time() + read_router.sticky_seconds),
+            max_age=max(int(read_router.sticky_seconds), 1), httponly=True, samesite="lax",
+        )
+    yield session
+
+
+def reads_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def replica_lag(request: Request) -> float:
+    """Отставание реплики, с которой читает запрос; 0 — чтение из основной БД"""
+    return read_router.sticky_seconds if read_router and not reads_primary(request) else 0
+
+
+async def get_read_session(request: Request, session: AsyncSession = Depends(get_session)) -> AsyncSession:
+    """Сессия для чтения: реплики по кругу, после недавней записи клиента — основная БД"""
+    replica = None if reads_primary(request) else read_router.next_replica()
+    if replica is None:
+        yield session
+        return
+    async with replica() as replica_session:
+        yield replica_session
+
+
 class TaskIn(BaseModel):
     title: str
     description: str = ""
@@ -46,51 +108,324 @@ class TaskOut(TaskIn):
     id: int
 
 
+class BatchStatus(str, Enum):
+    UPDATED = "updated"
+    DELETED = "deleted"
+    NOT_FOUND = "not_found"
+
+
+class BatchItemResult(BaseModel):
+    id: int
+    status: BatchStatus
+    task: Optional[TaskOut] = None
+
+
+class StreamFormat(str, Enum):
+    NDJSON = "ndjson"
+    JSON = "json"
+
+
+STREAM_MEDIA_TYPES = {
+    StreamFormat.NDJSON: "application/x-ndjson",
+    StreamFormat.JSON: "application/json",
+}
+
+
+async def encode_task_stream(session: AsyncSession, after: Optional[int], fmt: StreamFormat) -> AsyncIterator[bytes]:
+    """Отдаёт задачи порциями с серверного курсора, не загружая таблицу в память"""
+    if fmt is StreamFormat.JSON:
+        yield b"["
+    first = True
+    async for rows in crud.stream_tasks(session, after, STREAM_BATCH_SIZE):
+        encoded = [orjson.dumps(row) for row in rows]
+        if fmt is StreamFormat.NDJSON:
+            yield b"\n".join(encoded) + b"\n"
+        else:
+            yield (b"" if first else b",") + b",".join(encoded)
+        first = False
+    if fmt is StreamFormat.JSON:
+        yield b"]"
+
+
+class TaskJSONResponse(JSONResponse):
+    """
+    Ответ через orjson. Строки из БД уже соответствуют TaskOut, поэтому обработчики
+    возвращают его напрямую и FastAPI не валидирует их повторно через response_model.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+def task_json(content, response: Response, status_code: int = 200) -> TaskJSONResponse:
+    """
+    Заголовки, выставленные зависимостями (cookie read-your-writes), FastAPI переносит
+    только в ответы, которые строит сам, поэтому для возвращаемого напрямую копируем их.
+    """
+    out = TaskJSONResponse(content, status_code=status_code)
+    out.raw_headers.extend(h for h in response.raw_headers if h[0] == b"set-cookie")
+    return out
+
+
+def dump_json(content) -> str:
+    return orjson.dumps(content).decode()
+
+
+def cached_json_response(request: Request, cached: CachedResponse) -> Response:
+    headers = cached.response_headers()
+    if cached.not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        return Response(status_code=304, headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
+
+
+async def publish_changes(events: List[dict]) -> None:
+    """После COMMIT: свежие версии задач в кэш, удалённые и списки — сбросить, событие — в ленту"""
+    await task_cache.tasks_written(
+        {e["task_id"]: dump_json(e["task"]) if e["task"] is not None else None for e in events},
+        {e["task_id"]: e["seq"] for e in events},
+    )
+    change_feed.publish(events)
+
+
+def format_sse(event: dict) -> bytes:
+    return b"id: %d\ndata: %s\n\n" % (event["seq"], orjson.dumps(event))
+
+
+async def read_journal(session: AsyncSession, after: int) -> AsyncIterator[dict]:
+    """Все изменения журнала после after постранично; соединение с БД отпускается в конце"""
+    while True:
+        backlog = await change_feed.since(session, after, CHANGES_PAGE_SIZE)
+        for event in backlog:
+            yield event
+        if len(backlog) < CHANGES_PAGE_SIZE:
+            break
+        after = backlog[-1]["seq"]
+    await session.close()
+
+
+async def sse_events(session: AsyncSession, after: Optional[int]) -> AsyncIterator[bytes]:
+    """
+    Сначала подписка, потом дочитывание журнала: так не теряются изменения между ними,
+    а повторы отбрасываются по seq. Соединение с БД отпускается до начала ожидания.
+    Если пришедшее событие не следующее по seq, пропуск дочитывается из журнала:
+    параллельные запросы публикуют закоммиченные изменения не обязательно по порядку.
+    """
+    with change_feed.subscribe() as queue:
+        yield b"retry: 3000\n\n"
+        last_seq = after if after is not None else await change_feed.latest_seq(session)
+        async for event in read_journal(session, last_seq):
+            last_seq = event["seq"]
+            yield format_sse(event)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                return  # подписчик отстал; EventSource переподключится с Last-Event-ID
+            if event["seq"] <= last_seq:
+                continue
+            if event["seq"] == last_seq + 1:
+                last_seq = event["seq"]
+                yield format_sse(event)
+                continue
+            # Событие опубликовано после COMMIT, так что журнал содержит и его, и всё до него
+            async for missed in read_journal(session, last_seq):
+                last_seq = missed["seq"]
+                yield format_sse(missed)
+
+
+async def poll_events(session: AsyncSession, after: Optional[int], wait: float) -> dict:
+    with change_feed.subscribe() as queue:
+        if after is None:
+            return {"events": [], "last_seq": await change_feed.latest_seq(session)}
+        events = await change_feed.since(session, after, CHANGES_PAGE_SIZE)
+        if not events and wait > 0:
+            await session.close()
+            try:
+                await asyncio.wait_for(queue.get(), wait)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                # Очередь только будит: публикации параллельных запросов могут идти не по seq,
+                # а в журнале видны все закоммиченные изменения по порядку
+                events = await change_feed.since(session, after, CHANGES_PAGE_SIZE)
+    return {"events": events, "last_seq": events[-1]["seq"] if events else after}
+
+
+@app.get("/tasks/changes")
+async def get_task_changes(
+    request: Request,
+    after: Optional[int] = Query(None, ge=0, description="seq последнего полученного изменения"),
+    wait: float = Query(25, ge=0, le=MAX_POLL_WAIT, description="Ожидание long-poll, секунд"),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Лента изменений задач. С Accept: text/event-stream — Server-Sent Events с id=seq
+    (продолжение по Last-Event-ID), иначе long-poll: JSON с изменениями после after.
+    """
+    if after is None and request.headers.get("last-event-id", "").isdigit():
+        after = int(request.headers["last-event-id"])
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            sse_events(session, after),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    return TaskJSONResponse(await poll_events(session, after, wait))
+
+
 @app.get("/tasks", response_model=List[TaskOut])
-async def get_tasks(session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(Task))
-    tasks = result.scalars().all()
+async def get_tasks(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0, description="id последней задачи предыдущей страницы"),
+    q: Optional[str] = Query(None, min_length=1, max_length=200, description="Полнотекстовый поиск"),
+    title: Optional[str] = Query(None, min_length=1, max_length=255, description="Префикс названия"),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET, description="Смещение в результатах поиска"),
+    stream: Optional[StreamFormat] = Query(None, description="Потоковая выдача всех задач после курсора"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    searching = q is not None or title is not None
+    if stream is not None:
+        if searching:
+            raise HTTPException(status_code=422, detail="Streaming does not support search filters")
+        return StreamingResponse(encode_task_stream(session, after, stream), media_type=STREAM_MEDIA_TYPES[stream])
 
-    return [TaskOut(id=t.id, title=t.title, description=t.description) for t in tasks]
+    if searching:
+        key = await task_cache.list_key("search", q, title, limit, offset)
+    else:
+        key = await task_cache.list_key(after, limit)
+    # После своей записи клиент читает основную БД в обход кэша: там мог осесть ответ реплики
+    cached = None if reads_primary(request) else await task_cache.get(key)
+    if cached is None:
+        # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+        headers = {}
+        if searching:
+            # Результаты поиска упорядочены по релевантности, поэтому страницы идут по смещению
+            rows = await crud.search_tasks(session, q, title, limit + 1, offset)
+            if len(rows) > limit:
+                rows = rows[:limit]
+                headers["X-Next-Offset"] = str(offset + limit)
+        else:
+            rows = await crud.list_tasks(session, after, limit + 1)
+            if len(rows) > limit:
+                rows = rows[:limit]
+                headers["X-Next-Cursor"] = str(rows[-1]["id"])
+
+        cached = await task_cache.put(key, dump_json(rows), headers, replica_lag(request))
+    return cached_json_response(request, cached)
 
 
 @app.get("/tasks/{task_id}", response_model=TaskOut)
-async def get_task(task_id: int, session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(Task).where(Task.id == task_id))
-    task = result.scalar_one_or_none()
-    if task:
-        return TaskOut(id=task.id, title=task.title, description=task.description)
-    raise HTTPException(status_code=404, detail="Task not found")
+async def get_task(task_id: int, request: Request, session: AsyncSession = Depends(get_read_session)):
+    key = await task_cache.task_key(task_id)
+    cached = None if reads_primary(request) else await task_cache.get(key)
+    if cached is None:
+        row = await crud.get_task(session, task_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="Task not found")
+        cached = await task_cache.put(key, dump_json(row), replica_lag=replica_lag(request))
+    return cached_json_response(request, cached)
 
 
 @app.post("/tasks", response_model=TaskOut, status_code=201)
-async def create_task(task_in: TaskIn, session: AsyncSession = Depends(get_session)):
-    task = Task(title=task_in.title, description=task_in.description)
-    session.add(task)
+async def create_task(task_in: TaskIn, response: Response, session: AsyncSession = Depends(get_write_session)):
+    row = await crud.create_task(session, task_in.title, task_in.description)
+    events = await change_feed.record(session, [(CREATED, row["id"], row)])
     await session.commit()
-    await session.refresh(task)
-    return TaskOut(id=task.id, title=task.title, description=task.description)
+    await publish_changes(events)
+    return task_json(row, response, status_code=201)
 
 
 @app.put("/tasks/{task_id}", response_model=TaskOut)
-async def update_task(task_id: int, task_in: TaskIn, session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(Task).where(Task.id == task_id))
-    task = result.scalar_one_or_none()
-    if not task:
+async def update_task(task_id: int, task_in: TaskIn, response: Response,
+                      session: AsyncSession = Depends(get_write_session)):
+    row = await crud.update_task(session, task_id, task_in.title, task_in.description)
+    if not row:
         raise HTTPException(status_code=404, detail="Task not found")
-    task.title = task_in.title
-    task.description = task_in.description
+    events = await change_feed.record(session, [(UPDATED, row["id"], row)])
     await session.commit()
-    await session.refresh(task)
-    return TaskOut(id=task.id, title=task.title, description=task.description)
+    await publish_changes(events)
+    return task_json(row, response)
 
 
 @app.delete("/tasks/{task_id}", status_code=204)
-async def delete_task(task_id: int, session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(Task).where(Task.id == task_id))
-    task = result.scalar_one_or_none()
-    if not task:
+async def delete_task(task_id: int, session: AsyncSession = Depends(get_write_session)):
+    if not await crud.delete_task(session, task_id):
         raise HTTPException(status_code=404, detail="Task not found")
-    await session.delete(task)
+    events = await change_feed.record(session, [(DELETED, task_id, None)])
+    await session.commit()
+    await publish_changes(events)
+    return None
+
+
+@app.get("/debug/pool")
+async def debug_pool():
+    """Состояние пула соединений текущего воркера"""
+    return pool_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики воркера в текстовом формате Prometheus"""
+    update_pool_gauges(pool_stats())
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+def check_batch_size(size: int) -> None:
+    if size == 0:
+        raise HTTPException(status_code=422, detail="Batch is empty")
+    if size > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=422, detail=f"Batch is larger than {MAX_BATCH_SIZE} items")
+
+
+def check_batch_ids(ids: List[int]) -> None:
+    check_batch_size(len(ids))
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=422, detail="Duplicate task ids in batch")
+
+
+@app.post("/tasks:batch", response_model=List[TaskOut], status_code=201)
+async def create_tasks_batch(tasks_in: List[TaskIn], response: Response,
+                             session: AsyncSession = Depends(get_write_session)):
+    check_batch_size(len(tasks_in))
+    rows = await crud.create_tasks(session, [t.model_dump() for t in tasks_in])
+    events = await change_feed.record(session, [(CREATED, r["id"], r) for r in rows])
+    await session.commit()
+    await publish_changes(events)
+    return task_json(rows, response, status_code=201)
+
+
+@app.put("/tasks:batch", response_model=List[BatchItemResult])
+async def update_tasks_batch(tasks_in: List[TaskOut], response: Response,
+                             session: AsyncSession = Depends(get_write_session)):
+    check_batch_ids([t.id for t in tasks_in])
+    rows = await crud.update_tasks(session, [(t.id, t.title, t.description) for t in tasks_in])
+    events = await change_feed.record(session, [(UPDATED, r["id"], r) for r in rows])
+    await session.commit()
+    await publish_changes(events)
+    updated = {r["id"]: r for r in rows}
+    return task_json([
+        {"id": t.id, "status": BatchStatus.UPDATED, "task": updated[t.id]}
+        if t.id in updated else {"id": t.id, "status": BatchStatus.NOT_FOUND, "task": None}
+        for t in tasks_in
+    ], response)
+
+
+@app.delete("/tasks:batch", response_model=List[BatchItemResult])
+async def delete_tasks_batch(task_ids: List[int], response: Response,
+                             session: AsyncSession = Depends(get_write_session)):
+    check_batch_ids(task_ids)
+    deleted = await crud.delete_tasks(session, task_ids)
+    events = await change_feed.record(
+        session, [(DELETED, task_id, None) for task_id in task_ids if task_id in deleted]
+    )
     await session.commit()
-    return None
\ No newline at end of file
+    await publish_changes(events)
+    return task_json([
+        {"id": task_id, "status": BatchStatus.DELETED if task_id in deleted else BatchStatus.NOT_FOUND, "task": None}
+        for task_id in task_ids
+    ], response)
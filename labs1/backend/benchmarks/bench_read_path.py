@@ -0,0 +1,109 @@
+# benchmarks/bench_read_path.py
+"""
+Сравнение пропускной способности чтения задач: исходный путь (ORM-объекты, TaskOut
+и повторная валидация через response_model) против текущего (готовые запросы,
+строки-словари и orjson). Кэш ответов отключён, чтобы мерить именно БД и сериализацию.
+
+    python benchmarks/bench_read_path.py --tasks 5000 --requests 300
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+os.environ.setdefault("POSTGRES_USER", "bench")
+os.environ.setdefault("POSTGRES_PASSWORD", "bench")
+os.environ.setdefault("POSTGRES_DB", "bench")
+os.environ["TASK_CACHE_TTL"] = "0"
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from app import TaskOut, app, get_session
+from models import Base, Task
+
+legacy_app = FastAPI()
+
+
+@legacy_app.get("/tasks", response_model=List[TaskOut])
+async def legacy_get_tasks(limit: int = 100, session: AsyncSession = Depends(get_session)):
+    result = await session.execute(select(Task).order_by(Task.id).limit(limit))
+    return [TaskOut(id=t.id, title=t.title, description=t.description) for t in result.scalars().all()]
+
+
+@legacy_app.get("/tasks/{task_id}", response_model=TaskOut)
+async def legacy_get_task(task_id: int, session: AsyncSession = Depends(get_session)):
+    result = await session.execute(select(Task).where(Task.id == task_id))
+    task = result.scalar_one_or_none()
+    if task:
+        return TaskOut(id=task.id, title=task.title, description=task.description)
+    raise HTTPException(status_code=404, detail="Task not found")
+
+
+async def measure(target: FastAPI, paths: List[str], concurrency: int) -> float:
+    """Прогоняет пути с заданной параллельностью и возвращает запросы в секунду"""
+    queue = list(paths)
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while queue:
+                response = await client.get(queue.pop())
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return len(paths) / (time.perf_counter() - start)
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(Task), [
+                {"title": f"Task {i}", "description": f"Description of task {i} " * 4} for i in range(args.tasks)
+            ])
+
+        SessionLocal = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+        async def override_get_session():
+            async with SessionLocal() as session:
+                yield session
+
+        scenarios = {
+            f"GET /tasks?limit={args.page}": [f"/tasks?limit={args.page}"] * args.requests,
+            "GET /tasks/{id}": [f"/tasks/{1 + i % args.tasks}" for i in range(args.requests)],
+        }
+
+        print(f"{'endpoint':<24}{'before, rps':>14}{'after, rps':>14}{'speedup':>10}")
+        for name, paths in scenarios.items():
+            results = []
+            for target in (legacy_app, app):
+                target.dependency_overrides[get_session] = override_get_session
+                await measure(target, paths[:20], args.concurrency)  # прогрев
+                results.append(await measure(target, paths, args.concurrency))
+                target.dependency_overrides.clear()
+            before, after = results
+            print(f"{name:<24}{before:>14.1f}{after:>14.1f}{after / before:>9.2f}x")
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=5000, help="строк в таблице")
+    parser.add_argument("--page", type=int, default=500, help="размер страницы GET /tasks")
+    parser.add_argument("--requests", type=int, default=300, help="запросов на сценарий")
+    parser.add_argument("--concurrency", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
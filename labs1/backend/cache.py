@@ -0,0 +1,276 @@
+# cache.py
+"""Кэш ответов GET /tasks и GET /tasks/{id} с инвалидацией при записи"""
+import hashlib
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+import orjson
+
+
+class CacheBackend(ABC):
+    """Хранилище строк с TTL; реализация может быть локальной или сетевой"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def add(self, key: str, value: str, ttl: int) -> bool:
+        """Записывает значение, только если ключа ещё нет"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU в памяти процесса с ограничением числа записей и TTL"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def _alive(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._alive(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def add(self, key: str, value: str, ttl: int) -> bool:
+        if self._alive(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Бэкенд поверх Redis-совместимого асинхронного клиента (redis.asyncio или фейк в тестах)"""
+
+    def __init__(self, client, prefix: str = "task-cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCacheBackend":
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("TASK_CACHE_URL requires the 'redis' package: pip install redis") from e
+        return cls(redis.from_url(url, decode_responses=True))
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.client.get(self.prefix + key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self.client.set(self.prefix + key, value, ex=ttl)
+
+    async def add(self, key: str, value: str, ttl: int) -> bool:
+        return bool(await self.client.set(self.prefix + key, value, ex=ttl, nx=True))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self.prefix + key)
+
+    async def clear(self) -> None:
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: str
+    etag: str
+    last_modified: float
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, body: str, headers: Optional[Dict[str, str]] = None) -> "CachedResponse":
+        etag = '"' + hashlib.blake2b(body.encode(), digest_size=12).hexdigest() + '"'
+        return cls(body=body, etag=etag, last_modified=time.time(), headers=headers or {})
+
+    def encode(self) -> str:
+        return orjson.dumps([self.body, self.etag, self.last_modified, self.headers]).decode()
+
+    @classmethod
+    def decode(cls, raw: str) -> "CachedResponse":
+        body, etag, last_modified, headers = orjson.loads(raw)
+        return cls(body=body, etag=etag, last_modified=last_modified, headers=headers)
+
+    def response_headers(self) -> Dict[str, str]:
+        return {
+            **self.headers,
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+
+    def not_modified(self, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """Условный запрос: If-None-Match приоритетнее If-Modified-Since (RFC 9110)"""
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or self.etag in tags
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.last_modified) <= since
+        return False
+
+
+class TaskCache:
+    """
+    Кэш ответов по задачам. Ключи включают «поколение»: запись в задачу меняет
+    поколение этой задачи и поколение списков, поэтому ответы, прочитанные до записи,
+    больше не находятся, даже если параллельный запрос успел положить их в кэш.
+    В поколении хранится время записи: ответ, прочитанный с реплики вскоре после неё,
+    может быть устаревшим и в кэш под новым поколением не кладётся. Ещё в нём хранится
+    seq изменения из ленты: запись, опубликованная позже более новой, не вытесняет её.
+    """
+    LIST_GENERATION = "gen:list"
+
+    def __init__(self, backend: CacheBackend, ttl: int = 30):
+        self.backend = backend
+        self.ttl = ttl
+
+    @property
+    def enabled(self) -> bool:
+        """TASK_CACHE_TTL=0 отключает кэш: ответы строятся, но не сохраняются"""
+        return self.ttl > 0
+
+    @classmethod
+    def from_env(cls) -> "TaskCache":
+        url = os.getenv("TASK_CACHE_URL")
+        if url:
+            backend = RedisCacheBackend.from_url(url)
+        else:
+            backend = MemoryCacheBackend(max_entries=int(os.getenv("TASK_CACHE_MAX_ENTRIES", "10000")))
+        return cls(backend, ttl=int(os.getenv("TASK_CACHE_TTL", "30")))
+
+    @staticmethod
+    def _new_generation(written_at: float = 0.0, seq: int = 0) -> str:
+        return f"{uuid.uuid4().hex}@{written_at}@{seq}"
+
+    @staticmethod
+    def _generation_part(key: str, index: int, parse):
+        parts = key.rsplit(":", 1)[-1].split("@")
+        try:
+            return parse(parts[index])
+        except (IndexError, ValueError):
+            return parse(0)
+
+    @classmethod
+    def written_at(cls, key: str) -> float:
+        """Время записи, начавшей поколение ключа; 0 — поколение создано не записью"""
+        return cls._generation_part(key, 1, float)
+
+    @classmethod
+    def written_seq(cls, key: str) -> int:
+        """seq изменения, начавшего поколение ключа; 0 — неизвестен"""
+        return cls._generation_part(key, 2, int)
+
+    @staticmethod
+    def _task_generation(task_id: int) -> str:
+        return f"gen:task:{task_id}"
+
+    async def _generation(self, key: str) -> str:
+        if not self.enabled:
+            return ""
+        generation = await self.backend.get(key)
+        if generation is None:
+            await self.backend.add(key, self._new_generation(), self.ttl)
+            generation = await self.backend.get(key) or ""
+        return generation
+
+    async def task_key(self, task_id: int) -> str:
+        return f"task:{task_id}:{await self._generation(self._task_generation(task_id))}"
+
+    async def list_key(self, *params) -> str:
+        """Ключ страницы списка или поиска по её параметрам"""
+        return f"list:{orjson.dumps(params).decode()}:{await self._generation(self.LIST_GENERATION)}"
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        raw = await self.backend.get(key)
+        return CachedResponse.decode(raw) if raw is not None else None
+
+    async def put(self, key: str, body: str, headers: Optional[Dict[str, str]] = None,
+                  replica_lag: float = 0) -> CachedResponse:
+        """
+        replica_lag — допустимое отставание реплики, с которой прочитан ответ: если поколение
+        ключа начато записью позже, чем replica_lag секунд назад, ответ не сохраняется.
+        """
+        cached = CachedResponse.build(body, headers)
+        if self.enabled and not (replica_lag and time.time() - self.written_at(key) < replica_lag):
+            await self.backend.set(key, cached.encode(), self.ttl)
+        return cached
+
+    async def tasks_written(self, bodies: Dict[int, Optional[str]], seqs: Optional[Dict[int, int]] = None) -> None:
+        """
+        Запись задач: новое поколение и сразу свежий ответ (write-through).
+        body=None означает удаление — для задачи остаётся только новое пустое поколение.
+        seqs — номера изменений из ленты: параллельные запросы публикуют закоммиченные
+        изменения не обязательно по порядку, и версия старше закэшированной пропускается.
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        seqs = seqs or {}
+        for task_id, body in bodies.items():
+            seq = seqs.get(task_id, 0)
+            if seq:
+                current = await self.backend.get(self._task_generation(task_id))
+                if current is not None and self.written_seq(current) > seq:
+                    continue
+            generation = self._new_generation(now, seq)
+            await self.backend.set(self._task_generation(task_id), generation, self.ttl)
+            if body is not None:
+                await self.put(f"task:{task_id}:{generation}", body)
+        await self.backend.set(self.LIST_GENERATION, self._new_generation(now), self.ttl)
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+
+task_cache = TaskCache.from_env()
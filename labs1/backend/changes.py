@@ -0,0 +1,222 @@
+# changes.py
+"""Лента изменений задач: журнал в БД, рассылка подписчикам процесса и LISTEN/NOTIFY между воркерами"""
+import asyncio
+import logging
+import os
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Set
+
+import orjson
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from models import TaskChange
+
+logger = logging.getLogger(__name__)
+
+task_changes = TaskChange.__table__
+NOTIFY_CHANNEL = "task_changes"
+# Ключ advisory lock, под которым seq выдаётся до COMMIT (см. ChangeFeed.record)
+CHANGE_FEED_LOCK_ID = 7_204_914
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+
+def event_from_row(row) -> dict:
+    return {
+        "seq": row["seq"],
+        "op": row["op"],
+        "task_id": row["task_id"],
+        "task": orjson.loads(row["payload"]) if row["payload"] is not None else None,
+    }
+
+
+class ChangeFeed:
+    """
+    Номер seq выдаёт БД при записи в журнал в той же транзакции, что и само изменение,
+    поэтому клиент может продолжить ленту с последнего полученного seq после переподключения.
+    Подписчик, не успевающий читать, отключается — он переподключится и дочитает из журнала.
+    В журнале хранятся последние retention изменений (0 — без ограничения), лишние удаляются
+    раз в prune_interval секунд.
+    """
+
+    def __init__(self, queue_size: int = 1000, listen: bool = False, retention: int = 100_000,
+                 prune_interval: float = 300.0):
+        self.queue_size = queue_size
+        self.listen = listen
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._last_seq = 0
+        self._listener_task: Optional[asyncio.Task] = None
+        self._pruner_task: Optional[asyncio.Task] = None
+        self._fetch_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ChangeFeed":
+        return cls(
+            queue_size=int(os.getenv("CHANGE_FEED_QUEUE_SIZE", "1000")),
+            listen=os.getenv("CHANGE_FEED_LISTEN", "false").lower() in ("1", "true", "yes", "on"),
+            retention=int(os.getenv("CHANGE_FEED_RETENTION", "100000")),
+            prune_interval=float(os.getenv("CHANGE_FEED_PRUNE_INTERVAL", "300")),
+        )
+
+    async def record(self, session: AsyncSession, changes: Iterable[tuple]) -> List[dict]:
+        """Пишет изменения (op, task_id, task) в журнал в текущей транзакции"""
+        params = [
+            {"op": op, "task_id": task_id, "payload": orjson.dumps(task).decode() if task is not None else None}
+            for op, task_id, task in changes
+        ]
+        if not params:
+            return []
+        if session.bind.dialect.name == "postgresql":
+            # seq из последовательности выдаётся при INSERT, а виден после COMMIT: без блокировки
+            # транзакция с меньшим seq может закоммититься позже, и читатель, уже ушедший дальше
+            # по seq, её пропустит. Блокировка держится до конца транзакции, поэтому порядок seq
+            # совпадает с порядком коммитов. В SQLite пишущие транзакции и так идут по одной.
+            await session.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": CHANGE_FEED_LOCK_ID})
+        result = await session.execute(
+            insert(task_changes).returning(*task_changes.c["seq", "op", "task_id", "payload"],
+                                           sort_by_parameter_order=True),
+            params,
+        )
+        events = [event_from_row(row) for row in result.mappings()]
+        if self.listen:
+            # Уведомление доставляется только после COMMIT, поэтому воркеры не увидят откатанные изменения
+            await session.execute(text("SELECT pg_notify(:channel, :seq)"),
+                                  {"channel": NOTIFY_CHANNEL, "seq": str(events[-1]["seq"])})
+        return events
+
+    def publish(self, events: List[dict]) -> None:
+        """Рассылает закоммиченные изменения подписчикам этого процесса"""
+        if self.listen:
+            return  # придут через LISTEN вместе с изменениями других воркеров
+        self._broadcast(events)
+
+    def _broadcast(self, events: List[dict]) -> None:
+        if not events:
+            return
+        self._last_seq = max(self._last_seq, events[-1]["seq"])
+        for queue in list(self._subscribers):
+            try:
+                for event in events:
+                    queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    @contextmanager
+    def subscribe(self) -> Iterator[asyncio.Queue]:
+        """Очередь событий; None в очереди означает, что подписчик отстал и отключён"""
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def since(self, session: AsyncSession, after: int, limit: int) -> List[dict]:
+        """Изменения из журнала с seq > after по возрастанию"""
+        result = await session.execute(
+            select(*task_changes.c["seq", "op", "task_id", "payload"])
+            .where(task_changes.c.seq > after)
+            .order_by(task_changes.c.seq)
+            .limit(limit)
+        )
+        return [event_from_row(row) for row in result.mappings()]
+
+    async def latest_seq(self, session: AsyncSession) -> int:
+        result = await session.execute(select(task_changes.c.seq).order_by(task_changes.c.seq.desc()).limit(1))
+        return result.scalar() or 0
+
+    async def prune(self, session: AsyncSession) -> int:
+        """Удаляет изменения старше последних retention; возвращает число удалённых"""
+        if self.retention <= 0:
+            return 0
+        latest = await self.latest_seq(session)
+        result = await session.execute(delete(task_changes).where(task_changes.c.seq <= latest - self.retention))
+        await session.commit()
+        return result.rowcount
+
+    async def start_pruner(self, session_factory) -> None:
+        """Периодически чистит журнал; в каждом воркере своя задача, повторное удаление безвредно"""
+        if self.retention <= 0 or self._pruner_task is not None:
+            return
+
+        async def prune_forever() -> None:
+            while True:
+                await asyncio.sleep(self.prune_interval)
+                try:
+                    async with session_factory() as session:
+                        pruned = await self.prune(session)
+                    if pruned:
+                        logger.info("Pruned %d task changes", pruned)
+                except Exception:
+                    logger.exception("Failed to prune task changes")
+
+        self._pruner_task = asyncio.create_task(prune_forever())
+
+    async def stop_pruner(self) -> None:
+        if self._pruner_task is None:
+            return
+        self._pruner_task.cancel()
+        try:
+            await self._pruner_task
+        except asyncio.CancelledError:
+            pass
+        self._pruner_task = None
+
+    async def start_listener(self, engine: AsyncEngine, session_factory) -> None:
+        """Подписывается на NOTIFY отдельным соединением asyncpg на всё время жизни воркера"""
+        if not self.listen or self._listener_task is not None:
+            return
+
+        async def fetch_new() -> None:
+            try:
+                async with self._fetch_lock:
+                    async with session_factory() as session:
+                        while True:
+                            events = await self.since(session, self._last_seq, 500)
+                            if not events:
+                                break
+                            self._broadcast(events)
+            except Exception:
+                logger.exception("Failed to fetch task changes after NOTIFY")
+
+        def on_notify(*_) -> None:
+            asyncio.ensure_future(fetch_new())
+
+        async def listen() -> None:
+            async with engine.connect() as conn:
+                raw = await conn.get_raw_connection()
+                driver = raw.driver_connection
+                async with session_factory() as session:
+                    self._last_seq = await self.latest_seq(session)
+                await driver.add_listener(NOTIFY_CHANNEL, on_notify)
+                try:
+                    await asyncio.Event().wait()
+                finally:
+                    await driver.remove_listener(NOTIFY_CHANNEL, on_notify)
+
+        self._listener_task = asyncio.create_task(listen())
+
+    async def stop_listener(self) -> None:
+        if self._listener_task is None:
+            return
+        self._listener_task.cancel()
+        try:
+            await self._listener_task
+        except asyncio.CancelledError:
+            pass
+        self._listener_task = None
+
+
+change_feed = ChangeFeed.from_env()
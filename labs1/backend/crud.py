@@ -0,0 +1,143 @@
+# crud.py
+"""Слой доступа к данным задач: каждая операция — один SQL-запрос без ORM identity map"""
+from typing import AsyncIterator, Iterable, List, Optional, Set
+
+from sqlalchemy import (Integer, String, Text, and_, bindparam, case, column, delete, func, insert, literal_column,
+                        or_, select, update, values)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task
+
+tasks = Task.__table__
+TASK_COLUMNS = (tasks.c.id, tasks.c.title, tasks.c.description)
+
+# Постоянные запросы собраны один раз: SQLAlchemy мемоизирует ключ кэша компиляции
+# на объекте запроса, поэтому при выполнении не строится и не обходится новое дерево.
+SELECT_TASKS = select(*TASK_COLUMNS).order_by(tasks.c.id)
+SELECT_TASKS_AFTER = SELECT_TASKS.where(tasks.c.id > bindparam("after"))
+SELECT_PAGE = SELECT_TASKS.limit(bindparam("limit", type_=Integer))
+SELECT_PAGE_AFTER = SELECT_TASKS_AFTER.limit(bindparam("limit", type_=Integer))
+SELECT_TASK = select(*TASK_COLUMNS).where(tasks.c.id == bindparam("task_id"))
+INSERT_TASK = insert(tasks).returning(*TASK_COLUMNS)
+UPDATE_TASK = (
+    update(tasks)
+    .where(tasks.c.id == bindparam("task_id"))
+    .values(title=bindparam("new_title"), description=bindparam("new_description"))
+    .returning(*TASK_COLUMNS)
+)
+DELETE_TASK = delete(tasks).where(tasks.c.id == bindparam("task_id")).returning(tasks.c.id)
+INSERT_TASKS = insert(tasks).returning(*TASK_COLUMNS, sort_by_parameter_order=True)
+
+
+def select_tasks_after(after: Optional[int]):
+    """Keyset-выборка задач по возрастанию id, начиная после курсора"""
+    if after is None:
+        return SELECT_TASKS, {}
+    return SELECT_TASKS_AFTER, {"after": after}
+
+
+async def list_tasks(session: AsyncSession, after: Optional[int], limit: int) -> List[dict]:
+    if after is None:
+        result = await session.execute(SELECT_PAGE, {"limit": limit})
+    else:
+        result = await session.execute(SELECT_PAGE_AFTER, {"after": after, "limit": limit})
+    return [dict(row) for row in result.mappings()]
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def search_tasks(session: AsyncSession, q: Optional[str], title_prefix: Optional[str],
+                       limit: int, offset: int) -> List[dict]:
+    """
+    Поиск по задачам. В PostgreSQL — полнотекстовый по индексу GIN над search_vector
+    с ранжированием ts_rank; в остальных СУБД (SQLite в тестах) — LIKE по подстроке.
+    Префикс названия ищется по индексу lower(title).
+    """
+    conditions = []
+    order_by = []
+    if title_prefix:
+        conditions.append(func.lower(tasks.c.title).like(escape_like(title_prefix.lower()) + "%", escape="\\"))
+
+    if q:
+        if session.bind.dialect.name == "postgresql":
+            search_vector = literal_column("search_vector")
+            query = func.websearch_to_tsquery("simple", q)
+            conditions.append(search_vector.op("@@")(query))
+            order_by.append(func.ts_rank(search_vector, query).desc())
+        else:
+            pattern = "%" + escape_like(q.lower()) + "%"
+            in_title = func.lower(tasks.c.title).like(pattern, escape="\\")
+            conditions.append(or_(in_title, func.lower(tasks.c.description).like(pattern, escape="\\")))
+            order_by.append(case((in_title, 0), else_=1))
+
+    stmt = (
+        select(*TASK_COLUMNS)
+        .where(and_(*conditions))
+        .order_by(*order_by, tasks.c.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    result = await session.execute(stmt)
+    return [dict(row) for row in result.mappings()]
+
+
+async def stream_tasks(session: AsyncSession, after: Optional[int], batch_size: int) -> AsyncIterator[List[dict]]:
+    """Читает задачи с серверного курсора порциями по batch_size строк"""
+    stmt, params = select_tasks_after(after)
+    result = await session.stream(stmt, params, execution_options={"yield_per": batch_size})
+    async for rows in result.mappings().partitions():
+        yield [dict(row) for row in rows]
+
+
+async def get_task(session: AsyncSession, task_id: int) -> Optional[dict]:
+    result = await session.execute(SELECT_TASK, {"task_id": task_id})
+    row = result.mappings().one_or_none()
+    return dict(row) if row is not None else None
+
+
+async def create_task(session: AsyncSession, title: str, description: str) -> dict:
+    result = await session.execute(INSERT_TASK, {"title": title, "description": description})
+    return dict(result.mappings().one())
+
+
+async def update_task(session: AsyncSession, task_id: int, title: str, description: str) -> Optional[dict]:
+    """UPDATE ... RETURNING; None, если задачи с таким id нет"""
+    result = await session.execute(
+        UPDATE_TASK, {"task_id": task_id, "new_title": title, "new_description": description}
+    )
+    row = result.mappings().one_or_none()
+    return dict(row) if row is not None else None
+
+
+async def delete_task(session: AsyncSession, task_id: int) -> bool:
+    """DELETE ... RETURNING id; False, если задачи с таким id нет"""
+    result = await session.execute(DELETE_TASK, {"task_id": task_id})
+    return result.scalar_one_or_none() is not None
+
+
+async def create_tasks(session: AsyncSession, items: List[dict]) -> List[dict]:
+    """Многострочный INSERT ... RETURNING, строки возвращаются в порядке входных данных"""
+    result = await session.execute(INSERT_TASKS, items)
+    return [dict(row) for row in result.mappings()]
+
+
+async def update_tasks(session: AsyncSession, items: Iterable[tuple]) -> List[dict]:
+    """UPDATE ... FROM (VALUES ...) одним запросом; возвращает только обновлённые строки"""
+    batch = values(
+        column("id", Integer), column("title", String), column("description", Text), name="batch"
+    ).data(list(items)).cte()
+    result = await session.execute(
+        update(tasks)
+        .where(tasks.c.id == batch.c.id)
+        .values(title=batch.c.title, description=batch.c.description)
+        .returning(*TASK_COLUMNS)
+    )
+    return [dict(row) for row in result.mappings()]
+
+
+async def delete_tasks(session: AsyncSession, task_ids: List[int]) -> Set[int]:
+    """Удаляет задачи одним запросом и возвращает id действительно удалённых"""
+    result = await session.execute(delete(tasks).where(tasks.c.id.in_(task_ids)).returning(tasks.c.id))
+    return set(result.scalars())
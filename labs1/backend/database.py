@@ -1,15 +1,191 @@
+import itertools
 import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import List, Optional
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
 
-DATABASE_URL = f"postgresql+asyncpg://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@db:5432/{os.getenv('POSTGRES_DB')}"
+from metrics import observe_pool_wait
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def build_database_url() -> str:
+    """DATABASE_URL целиком или сборка из переменных POSTGRES_*"""
+    url = os.getenv("DATABASE_URL")
+    if url:
+        return url
+    host = os.getenv("POSTGRES_HOST", "db")
+    port = os.getenv("POSTGRES_PORT", "5432")
+    return (f"postgresql+asyncpg://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}"
+            f"@{host}:{port}/{os.getenv('POSTGRES_DB')}")
+
+
+@dataclass(frozen=True)
+class EngineProfile:
+    """Настройки движка и пула соединений; значения по умолчанию рассчитаны на прод"""
+    url: str
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: int = 30
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = False
+    statement_timeout_ms: int = 0
+    statement_cache_size: int = 100
+    echo: bool = False
+
+    @classmethod
+    def from_env(cls) -> "EngineProfile":
+        return cls(
+            url=build_database_url(),
+            pool_size=env_int("DB_POOL_SIZE", cls.pool_size),
+            max_overflow=env_int("DB_MAX_OVERFLOW", cls.max_overflow),
+            pool_timeout=env_int("DB_POOL_TIMEOUT", cls.pool_timeout),
+            pool_recycle=env_int("DB_POOL_RECYCLE", cls.pool_recycle),
+            pool_pre_ping=env_bool("DB_POOL_PRE_PING", cls.pool_pre_ping),
+            statement_timeout_ms=env_int("DB_STATEMENT_TIMEOUT_MS", cls.statement_timeout_ms),
+            statement_cache_size=env_int("DB_STATEMENT_CACHE_SIZE", cls.statement_cache_size),
+            echo=env_bool("DB_ECHO", cls.echo),
+        )
+
+    def connect_args(self) -> dict:
+        if make_url(self.url).get_backend_name() != "postgresql":
+            return {}
+        args = {"prepared_statement_cache_size": self.statement_cache_size}
+        if self.statement_timeout_ms:
+            args["server_settings"] = {"statement_timeout": str(self.statement_timeout_ms)}
+        return args
+
+
+class TimedQueue(AsyncAdaptedQueue):
+    """Очередь свободных соединений, которая сообщает пулу, сколько ждали выдачи"""
+    on_wait = None
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        start = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            self.on_wait(time.perf_counter() - start)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул, который учитывает время ожидания свободного соединения. Считается только ожидание
+    в очереди: открытие нового соединения сверх pool_size в это время не входит.
+    """
+    _queue_class = TimedQueue
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self._pool.on_wait = self._record_wait
+
+    def _record_wait(self, elapsed: float) -> None:
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_time_total += elapsed
+            self.wait_time_max = max(self.wait_time_max, elapsed)
+        observe_pool_wait(elapsed)
+
+
+def create_engine_from_profile(profile: EngineProfile) -> AsyncEngine:
+    return create_async_engine(
+        profile.url,
+        echo=profile.echo,
+        poolclass=TimedQueuePool,
+        pool_size=profile.pool_size,
+        max_overflow=profile.max_overflow,
+        pool_timeout=profile.pool_timeout,
+        pool_recycle=profile.pool_recycle,
+        pool_pre_ping=profile.pool_pre_ping,
+        connect_args=profile.connect_args(),
+    )
+
+
+engine_profile = EngineProfile.from_env()
+DATABASE_URL = engine_profile.url
+
+engine = create_engine_from_profile(engine_profile)
 AsyncSessionLocal = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 
+def build_replica_urls() -> List[str]:
+    """Список реплик для чтения через запятую в DATABASE_REPLICA_URLS"""
+    return [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+
+class ReadRouter:
+    """Раздаёт сессии реплик по кругу; без реплик чтение идёт в основную БД"""
+
+    def __init__(self, replicas: List[sessionmaker], sticky_seconds: float):
+        self.replicas = replicas
+        self.sticky_seconds = sticky_seconds
+        self._counter = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def next_replica(self) -> Optional[sessionmaker]:
+        if not self.replicas:
+            return None
+        return self.replicas[next(self._counter) % len(self.replicas)]
+
+
+replica_engines = [create_engine_from_profile(replace(engine_profile, url=url)) for url in build_replica_urls()]
+read_router = ReadRouter(
+    [sessionmaker(e, expire_on_commit=False, class_=AsyncSession) for e in replica_engines],
+    sticky_seconds=env_int("DB_READ_YOUR_WRITES_SECONDS", 5),
+)
+
+
+def pool_stats(target: Optional[AsyncEngine] = None) -> dict:
+    """Снимок состояния пула: занятые и overflow-соединения, время ожидания"""
+    pool = (target or engine).pool
+    stats = {
+        "pid": os.getpid(),
+        "pool": type(pool).__name__,
+        "pool_size": engine_profile.pool_size,
+        "max_overflow": engine_profile.max_overflow,
+    }
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            stats.update(
+                checkouts=pool.checkouts,
+                wait_time_total_ms=round(pool.wait_time_total * 1000, 3),
+                wait_time_avg_ms=round(pool.wait_time_total * 1000 / pool.checkouts, 3) if pool.checkouts else 0.0,
+                wait_time_max_ms=round(pool.wait_time_max * 1000, 3),
+            )
+    return stats
+
+
 async def init_db():
-    from models import Base
+    from migrations import run_migrations
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations)
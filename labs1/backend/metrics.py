@@ -0,0 +1,312 @@
+# metrics.py
+"""
+Метрики запросов в формате Prometheus: гистограммы времени по маршрутам, время и число
+SQL-запросов на HTTP-запрос, ожидание соединения из пула и опциональный профилировщик
+медленных запросов. Метрики считаются отдельно в каждом воркере uvicorn.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pragma: no cover - профилировщик ставится отдельно
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+STREAM_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 1800.0, 3600.0)
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}_total{format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (счётчики по корзинам без накопления, сумма, количество)
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def sum(self, *labels: str) -> float:
+        series = self._series.get(labels)
+        return series[1] if series else 0.0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{format_labels(names, labels + (le,))} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {total}")
+                lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.register(Counter(
+    "http_requests", "HTTP requests by route and status", ("method", "route", "status")))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+http_stream_duration = registry.register(Histogram(
+    "http_stream_duration_seconds", "Duration of long-lived SSE and long-poll requests", ("method", "route"),
+    STREAM_BUCKETS))
+http_request_db_statements = registry.register(Histogram(
+    "http_request_db_statements", "SQL statements executed per HTTP request", ("method", "route"), COUNT_BUCKETS))
+http_request_db_duration = registry.register(Histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL statements per HTTP request", ("method", "route")))
+db_statement_duration = registry.register(Histogram(
+    "db_statement_duration_seconds", "SQL statement latency by operation", ("operation",)))
+db_pool_wait = registry.register(Histogram(
+    "db_pool_wait_seconds", "Time waiting for a pooled connection", ()))
+db_pool_connections = registry.register(Gauge(
+    "db_pool_connections", "Pool connections by state", ("state",)))
+
+
+@dataclass
+class RequestStats:
+    """Статистика БД одного HTTP-запроса; объект общий для задачи и greenlet'ов SQLAlchemy"""
+    statements: int = 0
+    db_time: float = 0.0
+    pool_wait: float = 0.0
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def statement_operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    return word if word in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    db_statement_duration.observe(elapsed, statement_operation(statement))
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+
+
+def instrument_sqlalchemy() -> None:
+    """Вешает таймеры на все движки, включая реплики и тестовые"""
+    if not event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+
+
+def observe_pool_wait(elapsed: float) -> None:
+    db_pool_wait.observe(elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.pool_wait += elapsed
+
+
+class SlowRequestProfiler:
+    """Сэмплирующий профилировщик: сохраняет профиль speedscope для запросов медленнее порога"""
+
+    def __init__(self, threshold_ms: float, output_dir: str, interval: float = 0.001):
+        self.threshold = threshold_ms / 1000
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+
+    @classmethod
+    def from_env(cls) -> Optional["SlowRequestProfiler"]:
+        threshold = float(os.getenv("PROFILE_SLOW_REQUESTS_MS", "0"))
+        if threshold <= 0:
+            return None
+        if Profiler is None:
+            logger.warning("PROFILE_SLOW_REQUESTS_MS is set but pyinstrument is not installed")
+            return None
+        return cls(threshold, os.getenv("PROFILE_DIR", "profiles"))
+
+    def start(self):
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        profiler.start()
+        return profiler
+
+    def finish(self, profiler, method: str, route: str, elapsed: float) -> Optional[Path]:
+        profiler.stop()
+        if elapsed < self.threshold:
+            return None
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{route.strip('/').replace('/', '_') or 'root'}" \
+               f"-{int(elapsed * 1000)}ms.speedscope.json"
+        path = self.output_dir / name
+        path.write_text(profiler.output(SpeedscopeRenderer()))
+        logger.warning("Slow request %s %s took %.0f ms, profile saved to %s", method, route, elapsed * 1000, path)
+        return path
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: время запроса до конца тела ответа, число и время SQL-запросов
+    и заголовок Server-Timing, по которому видно долю БД и ожидания пула в запросе.
+    Запросы к long_lived_paths (SSE и long-poll) держат соединение минутами: их длительность
+    пишется в отдельную гистограмму http_stream_duration_seconds и не профилируется.
+    """
+
+    def __init__(self, app, statement_warning: int = 0, profiler: Optional[SlowRequestProfiler] = None,
+                 long_lived_paths: Iterable[str] = ()):
+        self.app = app
+        self.statement_warning = statement_warning
+        self.profiler = profiler
+        self.long_lived_paths = frozenset(long_lived_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        start = time.perf_counter()
+        long_lived = scope["path"] in self.long_lived_paths
+        profiler = self.profiler.start() if self.profiler and not long_lived else None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - start
+                timing = (f"db;dur={stats.db_time * 1000:.2f};desc=\"{stats.statements} statements\", "
+                          f"pool;dur={stats.pool_wait * 1000:.2f}, app;dur={elapsed * 1000:.2f}")
+                message.setdefault("headers", []).append((b"server-timing", timing.encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            method = scope["method"]
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_requests.inc(method, route, str(status))
+            if long_lived:
+                http_stream_duration.observe(elapsed, method, route)
+            else:
+                http_request_duration.observe(elapsed, method, route)
+            http_request_db_statements.observe(stats.statements, method, route)
+            http_request_db_duration.observe(stats.db_time, method, route)
+            if self.statement_warning and stats.statements > self.statement_warning:
+                logger.warning("%s %s executed %d SQL statements", method, route, stats.statements)
+            if profiler is not None:
+                self.profiler.finish(profiler, method, route, elapsed)
+
+
+def update_pool_gauges(stats: dict) -> None:
+    for state in ("checked_in", "checked_out", "overflow"):
+        if state in stats:
+            db_pool_connections.set(stats[state], state)
@@ -0,0 +1,89 @@
+# migrations.py
+"""Версионированные миграции схемы; применяются при старте вместо Base.metadata.create_all"""
+from dataclasses import dataclass
+from typing import Callable, List
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, MetaData, String, Table, Text, func, select, text
+from sqlalchemy.engine import Connection
+
+# Произвольный ключ advisory lock: воркеры uvicorn стартуют одновременно и не должны
+# применять одну и ту же миграцию параллельно.
+MIGRATION_LOCK_ID = 7_204_913
+
+schema_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    schema_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False, server_default=func.now()),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def create_tasks_table(conn: Connection) -> None:
+    # Схема зафиксирована здесь, а не берётся из models: последующие миграции
+    # меняют таблицу сами, а checkfirst подхватывает базы, созданные через create_all.
+    table = Table(
+        "tasks",
+        MetaData(),
+        Column("id", Integer, primary_key=True, index=True),
+        Column("title", String(255), nullable=False),
+        Column("description", Text, default=""),
+    )
+    table.create(conn, checkfirst=True)
+
+
+def add_search_indexes(conn: Connection) -> None:
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('simple', "
+            "coalesce(title, '') || ' ' || coalesce(description, ''))) STORED"
+        ))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING GIN (search_vector)"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_title_prefix ON tasks (lower(title) text_pattern_ops)"
+        ))
+    else:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_title_prefix ON tasks (lower(title))"))
+
+
+def create_task_changes_table(conn: Connection) -> None:
+    table = Table(
+        "task_changes",
+        MetaData(),
+        Column("seq", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+        Column("task_id", Integer, nullable=False),
+        Column("op", String(16), nullable=False),
+        Column("payload", Text, nullable=True),
+        Column("created_at", DateTime, nullable=False, server_default=func.now()),
+    )
+    table.create(conn, checkfirst=True)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "create tasks table", create_tasks_table),
+    Migration(2, "full-text search and title prefix indexes", add_search_indexes),
+    Migration(3, "task change feed log", create_task_changes_table),
+]
+
+
+def run_migrations(conn: Connection) -> List[int]:
+    """Применяет недостающие миграции по порядку и возвращает их номера"""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+    schema_migrations.create(conn, checkfirst=True)
+
+    applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    pending = [m for m in MIGRATIONS if m.version not in applied]
+    for migration in pending:
+        migration.apply(conn)
+        conn.execute(schema_migrations.insert().values(version=migration.version, description=migration.description))
+    return [m.version for m in pending]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, Text, func
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -9,3 +9,14 @@ class Task(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     description = Column(Text, default="")
+
+
+class TaskChange(Base):
+    """Журнал изменений задач; seq — монотонный номер для возобновления ленты изменений"""
+    __tablename__ = "task_changes"
+
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    task_id = Column(Integer, nullable=False)
+    op = Column(String(16), nullable=False)
+    payload = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
@@ -1,4 +1,5 @@
 # tests/test_app.py
+import json
 import pytest
 import sys
 import os
@@ -14,6 +15,9 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app import app, get_session
+from cache import task_cache
+from database import read_router
+from metrics import http_request_db_statements
 from models import Base, Task
 
 # Тестовая база данных в памяти
@@ -46,6 +50,7 @@ async def setup_database():
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)  # Сначала очищаем
         await conn.run_sync(Base.metadata.create_all)
+    await task_cache.clear()
 
     yield
 
@@ -221,6 +226,353 @@ class TestTaskAPI:
         assert get_deleted_response.status_code == 404
 
 
+class TestTaskPagination:
+    """Тесты постраничной и потоковой выдачи задач"""
+
+    def _create_tasks(self, count):
+        return [
+            client.post("/tasks", json={"title": f"Task {i}", "description": f"Description {i}"}).json()
+            for i in range(count)
+        ]
+
+    def test_first_page_with_cursor(self):
+        """Тест первой страницы и курсора на следующую"""
+        created = self._create_tasks(5)
+
+        response = client.get("/tasks", params={"limit": 2})
+        assert response.status_code == 200
+        assert [t["id"] for t in response.json()] == [t["id"] for t in created[:2]]
+        assert response.headers["X-Next-Cursor"] == str(created[1]["id"])
+
+    def test_walk_all_pages(self):
+        """Тест обхода всех страниц по курсору"""
+        created = self._create_tasks(5)
+
+        seen = []
+        params = {"limit": 2}
+        while True:
+            response = client.get("/tasks", params=params)
+            seen.extend(t["id"] for t in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            params["after"] = cursor
+
+        assert seen == [t["id"] for t in created]
+
+    def test_last_page_has_no_cursor(self):
+        """Тест отсутствия курсора на последней странице"""
+        self._create_tasks(2)
+        response = client.get("/tasks", params={"limit": 2})
+        assert len(response.json()) == 2
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_limit_validation(self):
+        """Тест ограничений параметра limit"""
+        assert client.get("/tasks", params={"limit": 0}).status_code == 422
+        assert client.get("/tasks", params={"limit": 100000}).status_code == 422
+
+    def test_stream_ndjson(self):
+        """Тест потоковой выдачи в формате NDJSON"""
+        created = self._create_tasks(3)
+
+        response = client.get("/tasks", params={"stream": "ndjson"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines == created
+
+    def test_stream_json_array_after_cursor(self):
+        """Тест потокового JSON-массива начиная с курсора"""
+        created = self._create_tasks(3)
+
+        response = client.get("/tasks", params={"stream": "json", "after": created[0]["id"]})
+        assert response.status_code == 200
+        assert response.json() == created[1:]
+
+    def test_stream_json_empty(self):
+        """Тест потокового JSON-массива для пустой таблицы"""
+        response = client.get("/tasks", params={"stream": "json"})
+        assert response.json() == []
+
+
+class TestTaskBatch:
+    """Тесты пакетных операций над задачами"""
+
+    def test_batch_create(self):
+        """Тест пакетного создания с сохранением порядка"""
+        tasks_data = [{"title": f"Task {i}", "description": f"Description {i}"} for i in range(3)]
+        response = client.post("/tasks:batch", json=tasks_data)
+        assert response.status_code == 201
+        created = response.json()
+        assert [{"title": t["title"], "description": t["description"]} for t in created] == tasks_data
+        assert len({t["id"] for t in created}) == 3
+        assert client.get("/tasks").json() == created
+
+    def test_batch_create_default_description(self):
+        """Тест значения description по умолчанию в пакете"""
+        response = client.post("/tasks:batch", json=[{"title": "Minimal"}])
+        assert response.json()[0]["description"] == ""
+
+    def test_batch_update_reports_per_item(self):
+        """Тест пакетного обновления с результатом по каждой задаче"""
+        created = client.post("/tasks:batch", json=[{"title": "A"}, {"title": "B"}]).json()
+
+        response = client.put("/tasks:batch", json=[
+            {"id": created[1]["id"], "title": "B2", "description": "new"},
+            {"id": 999, "title": "Missing", "description": ""},
+        ])
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": created[1]["id"], "status": "updated",
+             "task": {"id": created[1]["id"], "title": "B2", "description": "new"}},
+            {"id": 999, "status": "not_found", "task": None},
+        ]
+        assert client.get(f"/tasks/{created[0]['id']}").json()["title"] == "A"
+        assert client.get(f"/tasks/{created[1]['id']}").json()["title"] == "B2"
+
+    def test_batch_delete_reports_per_item(self):
+        """Тест пакетного удаления с результатом по каждой задаче"""
+        created = client.post("/tasks:batch", json=[{"title": "A"}, {"title": "B"}]).json()
+
+        response = client.request("DELETE", "/tasks:batch", json=[created[0]["id"], 999])
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": created[0]["id"], "status": "deleted", "task": None},
+            {"id": 999, "status": "not_found", "task": None},
+        ]
+        assert [t["id"] for t in client.get("/tasks").json()] == [created[1]["id"]]
+
+    def test_batch_rejects_empty_and_duplicates(self):
+        """Тест отклонения пустых пакетов и повторяющихся id"""
+        assert client.post("/tasks:batch", json=[]).status_code == 422
+        assert client.request("DELETE", "/tasks:batch", json=[1, 1]).status_code == 422
+        response = client.put("/tasks:batch", json=[
+            {"id": 1, "title": "A", "description": ""},
+            {"id": 1, "title": "B", "description": ""},
+        ])
+        assert response.status_code == 422
+
+
+class TestTaskSearch:
+    """Тесты поиска задач"""
+
+    @pytest.fixture(autouse=True)
+    def tasks(self):
+        client.post("/tasks:batch", json=[
+            {"title": "Buy milk", "description": "and bread"},
+            {"title": "Write report", "description": "quarterly milk sales"},
+            {"title": "Buyback plan", "description": ""},
+            {"title": "100% done", "description": "under_score"},
+        ])
+
+    def test_search_ranks_title_matches_first(self):
+        """Тест поиска с совпадениями в названии выше описания"""
+        response = client.get("/tasks", params={"q": "milk"})
+        assert response.status_code == 200
+        assert [t["title"] for t in response.json()] == ["Buy milk", "Write report"]
+
+    def test_title_prefix(self):
+        """Тест фильтра по префиксу названия без учёта регистра"""
+        response = client.get("/tasks", params={"title": "buy"})
+        assert [t["title"] for t in response.json()] == ["Buy milk", "Buyback plan"]
+
+    def test_like_wildcards_are_escaped(self):
+        """Тест экранирования спецсимволов LIKE"""
+        assert [t["title"] for t in client.get("/tasks", params={"title": "100%"}).json()] == ["100% done"]
+        assert client.get("/tasks", params={"title": "_"}).json() == []
+        assert [t["title"] for t in client.get("/tasks", params={"q": "r_s"}).json()] == ["100% done"]
+
+    def test_search_pagination(self):
+        """Тест постраничной выдачи результатов поиска"""
+        response = client.get("/tasks", params={"title": "buy", "limit": 1})
+        assert [t["title"] for t in response.json()] == ["Buy milk"]
+        assert response.headers["X-Next-Offset"] == "1"
+
+        response = client.get("/tasks", params={"title": "buy", "limit": 1, "offset": 1})
+        assert [t["title"] for t in response.json()] == ["Buyback plan"]
+        assert "X-Next-Offset" not in response.headers
+
+    def test_search_sees_new_tasks(self):
+        """Тест инвалидации закэшированного поиска после записи"""
+        assert len(client.get("/tasks", params={"q": "milk"}).json()) == 2
+        client.post("/tasks", json={"title": "More milk"})
+        assert len(client.get("/tasks", params={"q": "milk"}).json()) == 3
+
+    def test_stream_rejects_search(self):
+        """Тест запрета поиска в потоковом режиме"""
+        assert client.get("/tasks", params={"q": "milk", "stream": "ndjson"}).status_code == 422
+
+
+class TestChangeFeed:
+    """Тесты ленты изменений задач"""
+
+    def test_long_poll_without_cursor_returns_latest_seq(self):
+        """Тест начальной точки ленты без курсора"""
+        client.post("/tasks", json={"title": "A"})
+        response = client.get("/tasks/changes", params={"wait": 0})
+        assert response.status_code == 200
+        assert response.json()["events"] == []
+        assert response.json()["last_seq"] >= 1
+
+    def test_long_poll_returns_changes_in_order(self):
+        """Тест получения изменений после курсора"""
+        start = client.get("/tasks/changes", params={"wait": 0}).json()["last_seq"]
+        task = client.post("/tasks", json={"title": "A"}).json()
+        client.put(f"/tasks/{task['id']}", json={"title": "B"})
+        client.delete(f"/tasks/{task['id']}")
+
+        body = client.get("/tasks/changes", params={"after": start, "wait": 0}).json()
+        events = body["events"]
+        assert [e["op"] for e in events] == ["created", "updated", "deleted"]
+        assert [e["task_id"] for e in events] == [task["id"]] * 3
+        assert events[1]["task"] == {"id": task["id"], "title": "B", "description": ""}
+        assert events[2]["task"] is None
+        assert body["last_seq"] == events[-1]["seq"]
+        assert [e["seq"] for e in events] == sorted(e["seq"] for e in events)
+
+    def test_resume_from_seq(self):
+        """Тест продолжения ленты с середины"""
+        client.post("/tasks:batch", json=[{"title": "A"}, {"title": "B"}])
+        events = client.get("/tasks/changes", params={"after": 0, "wait": 0}).json()["events"]
+
+        resumed = client.get("/tasks/changes", params={"after": events[0]["seq"], "wait": 0}).json()["events"]
+        assert resumed == events[1:]
+
+    def test_last_event_id_header(self):
+        """Тест продолжения по заголовку Last-Event-ID"""
+        client.post("/tasks:batch", json=[{"title": "A"}, {"title": "B"}])
+        events = client.get("/tasks/changes", params={"after": 0, "wait": 0}).json()["events"]
+
+        response = client.get("/tasks/changes", params={"wait": 0},
+                              headers={"Last-Event-ID": str(events[0]["seq"])})
+        assert response.json()["events"] == events[1:]
+
+    def test_failed_write_is_not_logged(self):
+        """Тест отсутствия событий для неудачной записи"""
+        start = client.get("/tasks/changes", params={"wait": 0}).json()["last_seq"]
+        client.put("/tasks/999", json={"title": "Missing"})
+        assert client.get("/tasks/changes", params={"after": start, "wait": 0}).json()["events"] == []
+
+
+class TestResponseCache:
+    """Тесты кэша ответов и условных запросов"""
+
+    def test_etag_not_modified(self):
+        """Тест ответа 304 при совпадении ETag"""
+        task_id = client.post("/tasks", json={"title": "Cached"}).json()["id"]
+
+        response = client.get(f"/tasks/{task_id}")
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert "Last-Modified" in response.headers
+
+        response = client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_list_not_modified_keeps_cursor(self):
+        """Тест 304 для страницы списка с сохранением курсора"""
+        client.post("/tasks:batch", json=[{"title": "A"}, {"title": "B"}])
+        response = client.get("/tasks", params={"limit": 1})
+        etag = response.headers["ETag"]
+
+        response = client.get("/tasks", params={"limit": 1}, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert "X-Next-Cursor" in response.headers
+
+    def test_update_is_visible_immediately(self):
+        """Тест отсутствия устаревших ответов после обновления"""
+        task_id = client.post("/tasks", json={"title": "Before"}).json()["id"]
+        etag = client.get(f"/tasks/{task_id}").headers["ETag"]
+        client.get("/tasks")
+
+        client.put(f"/tasks/{task_id}", json={"title": "After"})
+
+        response = client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["title"] == "After"
+        assert [t["title"] for t in client.get("/tasks").json()] == ["After"]
+
+    def test_delete_is_visible_immediately(self):
+        """Тест отсутствия удалённой задачи в кэше"""
+        task_id = client.post("/tasks", json={"title": "Doomed"}).json()["id"]
+        client.get(f"/tasks/{task_id}")
+        client.get("/tasks")
+
+        client.request("DELETE", "/tasks:batch", json=[task_id])
+
+        assert client.get(f"/tasks/{task_id}").status_code == 404
+        assert client.get("/tasks").json() == []
+
+
+class TestReadReplicas:
+    """Тесты маршрутизации чтения на реплики"""
+
+    @pytest.fixture(autouse=True)
+    async def replica(self):
+        """Отдельная SQLite-БД в роли реплики"""
+        replica_engine = create_async_engine(
+            TEST_DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        async with replica_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        ReplicaSessionLocal = sessionmaker(replica_engine, expire_on_commit=False, class_=AsyncSession)
+        async with ReplicaSessionLocal() as session:
+            session.add(Task(title="From replica", description=""))
+            await session.commit()
+
+        original = read_router.replicas, read_router.sticky_seconds
+        read_router.replicas = [ReplicaSessionLocal]
+        client.cookies.clear()
+        yield
+        read_router.replicas, read_router.sticky_seconds = original
+        client.cookies.clear()
+        await replica_engine.dispose()
+
+    def test_reads_go_to_replica(self):
+        """Тест чтения с реплики"""
+        assert [t["title"] for t in client.get("/tasks").json()] == ["From replica"]
+        assert client.get("/tasks/1").json()["title"] == "From replica"
+
+    def test_read_your_writes(self):
+        """Тест чтения из основной БД сразу после записи клиента"""
+        response = client.post("/tasks", json={"title": "Written"})
+        assert "read_primary_until" in response.cookies
+
+        assert [t["title"] for t in client.get("/tasks").json()] == ["Written"]
+
+    def test_replica_read_after_write_does_not_reach_writer(self):
+        """Тест: устаревший ответ реплики, прочитанный другим клиентом, не виден писавшему"""
+        client.post("/tasks", json={"title": "Written"})
+        sticky = client.cookies.get("read_primary_until")
+
+        client.cookies.clear()  # другой клиент читает отстающую реплику
+        assert [t["title"] for t in client.get("/tasks").json()] == ["From replica"]
+
+        client.cookies.set("read_primary_until", sticky)
+        assert [t["title"] for t in client.get("/tasks").json()] == ["Written"]
+        assert client.get("/tasks/1").json()["title"] == "Written"
+
+    def test_stickiness_expires(self):
+        """Тест возврата на реплику после окончания окна"""
+        read_router.sticky_seconds = 0
+        client.post("/tasks", json={"title": "Written"})
+        client.cookies.set("read_primary_until", "0")
+
+        assert [t["title"] for t in client.get("/tasks").json()] == ["From replica"]
+
+    def test_replicas_round_robin(self):
+        """Тест обхода реплик по кругу"""
+        first = read_router.replicas[0]
+        read_router.replicas = [first, "second"]
+        picked = [read_router.next_replica() for _ in range(4)]
+        assert picked.count(first) == 2
+        assert picked.count("second") == 2
+
+
 class TestAPIHealth:
     """Тесты здоровья API"""
 
@@ -229,6 +581,27 @@ class TestAPIHealth:
         response = client.get("/docs")
         assert response.status_code == 200
 
+    def test_debug_pool(self):
+        """Тест доступности статистики пула соединений"""
+        response = client.get("/debug/pool")
+        assert response.status_code == 200
+        assert "checked_out" in response.json()
+
+    def test_metrics_per_route(self):
+        """Тест метрик по шаблону маршрута и числа SQL-запросов на запрос"""
+        app.dependency_overrides[get_session] = override_get_session
+        try:
+            task_id = client.post("/tasks", json={"title": "Task"}).json()["id"]
+            response = client.get(f"/tasks/{task_id}")
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.headers["server-timing"].startswith("db;dur=")
+        body = client.get("/metrics").text
+        assert 'http_requests_total{method="GET",route="/tasks/{task_id}",status="200"}' in body
+        assert 'http_request_db_statements_count{method="POST",route="/tasks"}' in body
+        assert http_request_db_statements.sum("POST", "/tasks") >= 1
+
     def test_api_openapi_schema(self):
         """Тест доступности OpenAPI схемы"""
         response = client.get("/openapi.json")
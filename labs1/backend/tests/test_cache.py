@@ -0,0 +1,172 @@
+# tests/test_cache.py
+import fnmatch
+
+import pytest
+
+from cache import CachedResponse, MemoryCacheBackend, RedisCacheBackend, TaskCache
+
+
+class FakeRedis:
+    """Минимальный Redis-совместимый клиент в памяти"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def scan_iter(self, match):
+        for key in list(self.data):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+
+class TestMemoryCacheBackend:
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        """Тест вытеснения самой давно использованной записи"""
+        backend = MemoryCacheBackend(max_entries=2)
+        await backend.set("a", "1", ttl=60)
+        await backend.set("b", "2", ttl=60)
+        await backend.get("a")
+        await backend.set("c", "3", ttl=60)
+
+        assert await backend.get("a") == "1"
+        assert await backend.get("b") is None
+        assert len(backend) == 2
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self, monkeypatch):
+        """Тест истечения TTL"""
+        import cache
+
+        now = [1000.0]
+        monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+        backend = MemoryCacheBackend()
+        await backend.set("a", "1", ttl=10)
+        now[0] += 11
+        assert await backend.get("a") is None
+
+    @pytest.mark.asyncio
+    async def test_add_only_if_absent(self):
+        """Тест записи только при отсутствии ключа"""
+        backend = MemoryCacheBackend()
+        assert await backend.add("a", "1", ttl=60) is True
+        assert await backend.add("a", "2", ttl=60) is False
+        assert await backend.get("a") == "1"
+
+
+class TestCachedResponse:
+    def test_etag_matches(self):
+        """Тест условного запроса по ETag"""
+        cached = CachedResponse.build('{"id":1}')
+        assert cached.not_modified(cached.etag, None)
+        assert cached.not_modified(f'W/{cached.etag}, "other"', None)
+        assert not cached.not_modified('"other"', None)
+
+    def test_if_modified_since(self):
+        """Тест условного запроса по Last-Modified"""
+        cached = CachedResponse.build("[]")
+        last_modified = cached.response_headers()["Last-Modified"]
+        assert cached.not_modified(None, last_modified)
+        assert not cached.not_modified(None, "Thu, 01 Jan 1970 00:00:00 GMT")
+        assert not cached.not_modified(None, "garbage")
+
+    def test_encode_roundtrip(self):
+        """Тест сериализации записи кэша"""
+        cached = CachedResponse.build("[]", {"X-Next-Cursor": "5"})
+        assert CachedResponse.decode(cached.encode()) == cached
+
+
+@pytest.fixture(params=["memory", "redis"])
+def task_cache(request):
+    if request.param == "memory":
+        return TaskCache(MemoryCacheBackend(), ttl=60)
+    return TaskCache(RedisCacheBackend(FakeRedis()), ttl=60)
+
+
+class TestTaskCache:
+    @pytest.mark.asyncio
+    async def test_write_through_replaces_entry(self, task_cache):
+        """Тест обновления записи при записи задачи"""
+        key = await task_cache.task_key(1)
+        await task_cache.put(key, '{"title":"old"}')
+
+        await task_cache.tasks_written({1: '{"title":"new"}'})
+
+        cached = await task_cache.get(await task_cache.task_key(1))
+        assert cached.body == '{"title":"new"}'
+
+    @pytest.mark.asyncio
+    async def test_out_of_order_publish_keeps_newest(self, task_cache):
+        """Тест: версия, опубликованная после более новой, не вытесняет её из кэша"""
+        await task_cache.tasks_written({1: '{"v":2}'}, {1: 8})
+        await task_cache.tasks_written({1: '{"v":1}'}, {1: 7})
+
+        cached = await task_cache.get(await task_cache.task_key(1))
+        assert cached.body == '{"v":2}'
+
+        await task_cache.tasks_written({1: '{"v":3}'}, {1: 9})
+        assert (await task_cache.get(await task_cache.task_key(1))).body == '{"v":3}'
+
+    @pytest.mark.asyncio
+    async def test_stale_fill_after_write_is_unreachable(self, task_cache):
+        """Тест: ответ, прочитанный до записи, не виден после неё"""
+        stale_key = await task_cache.task_key(1)
+        await task_cache.tasks_written({1: None})
+        await task_cache.put(stale_key, '{"title":"stale"}')
+
+        assert await task_cache.get(await task_cache.task_key(1)) is None
+
+    @pytest.mark.asyncio
+    async def test_replica_fill_after_recent_write_is_skipped(self, task_cache):
+        """Тест: ответ реплики не кэшируется под поколением, начатым недавней записью"""
+        untouched = await task_cache.list_key(None, 100)
+        await task_cache.put(untouched, "[]", replica_lag=5)
+        assert await task_cache.get(untouched) is not None
+
+        await task_cache.tasks_written({2: '{"id":2}'})
+        key = await task_cache.list_key(None, 100)
+        await task_cache.put(key, "[]", replica_lag=5)
+        assert await task_cache.get(key) is None
+
+        await task_cache.put(key, '[{"id":2}]')
+        assert (await task_cache.get(key)).body == '[{"id":2}]'
+
+    @pytest.mark.asyncio
+    async def test_write_invalidates_lists(self, task_cache):
+        """Тест сброса закэшированных страниц списка"""
+        key = await task_cache.list_key(None, 100)
+        await task_cache.put(key, "[]")
+
+        await task_cache.tasks_written({2: '{"id":2}'})
+
+        assert await task_cache.get(await task_cache.list_key(None, 100)) is None
+
+    @pytest.mark.asyncio
+    async def test_clear(self, task_cache):
+        """Тест полной очистки"""
+        key = await task_cache.task_key(1)
+        await task_cache.put(key, "{}")
+        await task_cache.clear()
+        assert await task_cache.get(await task_cache.task_key(1)) is None
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_stores_nothing(self):
+        """Тест отключения кэша нулевым TTL"""
+        backend = MemoryCacheBackend()
+        disabled = TaskCache(backend, ttl=0)
+        cached = await disabled.put(await disabled.task_key(1), "{}")
+
+        assert cached.etag
+        assert await disabled.get(await disabled.task_key(1)) is None
+        assert len(backend) == 0
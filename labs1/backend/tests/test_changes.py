@@ -0,0 +1,133 @@
+# tests/test_changes.py
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import poll_events, sse_events
+from changes import CREATED, DELETED, ChangeFeed, change_feed
+from models import Base
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with SessionLocal() as session:
+        yield session
+    await engine.dispose()
+
+
+class TestChangeFeed:
+    @pytest.mark.asyncio
+    async def test_record_assigns_increasing_seq(self, session):
+        """Тест монотонных номеров изменений"""
+        feed = ChangeFeed()
+        first = await feed.record(session, [(CREATED, 1, {"id": 1}), (CREATED, 2, {"id": 2})])
+        second = await feed.record(session, [(DELETED, 1, None)])
+        await session.commit()
+
+        seqs = [e["seq"] for e in first + second]
+        assert seqs == sorted(seqs) and len(set(seqs)) == 3
+        assert await feed.since(session, first[0]["seq"], 10) == first[1:] + second
+
+    @pytest.mark.asyncio
+    async def test_publish_reaches_subscribers(self, session):
+        """Тест рассылки подписчикам процесса"""
+        feed = ChangeFeed()
+        events = await feed.record(session, [(CREATED, 1, {"id": 1})])
+        with feed.subscribe() as queue:
+            feed.publish(events)
+            assert queue.get_nowait() == events[0]
+        assert feed.subscriber_count == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_is_dropped(self):
+        """Тест отключения отставшего подписчика"""
+        feed = ChangeFeed(queue_size=2)
+        events = [{"seq": i, "op": CREATED, "task_id": i, "task": None} for i in range(1, 4)]
+        with feed.subscribe() as queue:
+            feed.publish(events)
+            assert queue.get_nowait() is None
+            assert feed.subscriber_count == 0
+
+
+class TestServerSentEvents:
+    @pytest.mark.asyncio
+    async def test_replay_then_live(self, session):
+        """Тест SSE: дочитывание журнала, затем события в реальном времени"""
+        old = await change_feed.record(session, [(CREATED, 1, {"id": 1}), (CREATED, 2, {"id": 2})])
+        await session.commit()
+
+        stream = sse_events(session, after=old[0]["seq"])
+        assert await anext(stream) == b"retry: 3000\n\n"
+        replayed = await anext(stream)
+        assert replayed.startswith(b"id: %d\n" % old[1]["seq"])
+
+        live_event = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        change_feed.publish(old)  # повтор уже отданного отбрасывается по seq
+        new = await change_feed.record(session, [(DELETED, 1, None)])
+        await session.commit()
+        change_feed.publish(new)
+
+        assert (await asyncio.wait_for(live_event, 1)).startswith(b"id: %d\n" % new[0]["seq"])
+        await stream.aclose()
+        assert change_feed.subscriber_count == 0
+
+    @pytest.mark.asyncio
+    async def test_gap_is_filled_from_journal(self, session):
+        """Тест SSE: событие, опубликованное раньше предыдущего по seq, не теряется"""
+        start = await change_feed.latest_seq(session)
+        stream = sse_events(session, after=start)
+        assert await anext(stream) == b"retry: 3000\n\n"
+
+        live_event = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)  # поток дочитывает журнал и отпускает сессию
+        first = await change_feed.record(session, [(CREATED, 1, {"id": 1})])
+        second = await change_feed.record(session, [(CREATED, 2, {"id": 2})])
+        await session.commit()
+        change_feed.publish(second)  # публикация first ещё не дошла
+
+        assert (await asyncio.wait_for(live_event, 1)).startswith(b"id: %d\n" % first[0]["seq"])
+        assert (await asyncio.wait_for(anext(stream), 1)).startswith(b"id: %d\n" % second[0]["seq"])
+        change_feed.publish(first)
+        await stream.aclose()
+
+
+class TestLongPoll:
+    @pytest.mark.asyncio
+    async def test_wakeup_reads_journal_in_order(self, session):
+        """Тест long-poll: после пробуждения изменения берутся из журнала по порядку"""
+        start = await change_feed.latest_seq(session)
+        poll = asyncio.ensure_future(poll_events(session, start, wait=1))
+        await asyncio.sleep(0.05)  # poll_events читает журнал и отпускает сессию
+        first = await change_feed.record(session, [(CREATED, 1, {"id": 1})])
+        second = await change_feed.record(session, [(CREATED, 2, {"id": 2})])
+        await session.commit()
+        change_feed.publish(second)
+
+        body = await asyncio.wait_for(poll, 1)
+        assert [e["seq"] for e in body["events"]] == [first[0]["seq"], second[0]["seq"]]
+        assert body["last_seq"] == second[0]["seq"]
+
+
+class TestRetention:
+    @pytest.mark.asyncio
+    async def test_prune_keeps_latest_changes(self, session):
+        """Тест удаления изменений сверх retention"""
+        feed = ChangeFeed(retention=2)
+        events = await feed.record(session, [(CREATED, i, {"id": i}) for i in range(1, 6)])
+        await session.commit()
+
+        assert await feed.prune(session) == 3
+        assert await feed.since(session, 0, 10) == events[3:]
+        assert await ChangeFeed(retention=0).prune(session) == 0
@@ -0,0 +1,89 @@
+# tests/test_crud.py
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import crud
+from models import Base
+
+
+class TestTaskCrud:
+    @pytest.fixture
+    async def setup_db(self):
+        """Фикстура тестовой БД со счётчиком выполненных SQL-запросов"""
+        engine = create_async_engine(
+            "sqlite+aiosqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        statements = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        AsyncSessionLocal = sessionmaker(
+            engine, expire_on_commit=False, class_=AsyncSession
+        )
+
+        async with AsyncSessionLocal() as session:
+            yield session, statements
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+
+    @pytest.mark.asyncio
+    async def test_create_uses_single_insert_returning(self, setup_db):
+        """Тест создания задачи одним INSERT ... RETURNING"""
+        session, statements = setup_db
+        statements.clear()
+
+        row = await crud.create_task(session, "Task", "Description")
+
+        assert row["id"] is not None
+        assert (row["title"], row["description"]) == ("Task", "Description")
+        assert len(statements) == 1
+        assert statements[0].startswith("INSERT") and "RETURNING" in statements[0]
+
+    @pytest.mark.asyncio
+    async def test_update_uses_single_statement(self, setup_db):
+        """Тест обновления задачи одним UPDATE ... RETURNING"""
+        session, statements = setup_db
+        created = await crud.create_task(session, "Task", "")
+        statements.clear()
+
+        row = await crud.update_task(session, created["id"], "Updated", "New")
+
+        assert (row["id"], row["title"], row["description"]) == (created["id"], "Updated", "New")
+        assert len(statements) == 1
+        assert statements[0].startswith("UPDATE") and "RETURNING" in statements[0]
+
+    @pytest.mark.asyncio
+    async def test_update_missing_returns_none(self, setup_db):
+        """Тест обновления несуществующей задачи"""
+        session, _ = setup_db
+        assert await crud.update_task(session, 999, "Updated", "") is None
+
+    @pytest.mark.asyncio
+    async def test_delete_uses_single_statement(self, setup_db):
+        """Тест удаления задачи одним DELETE ... RETURNING"""
+        session, statements = setup_db
+        created = await crud.create_task(session, "Task", "")
+        statements.clear()
+
+        assert await crud.delete_task(session, created["id"]) is True
+        assert len(statements) == 1
+        assert statements[0].startswith("DELETE")
+        assert await crud.get_task(session, created["id"]) is None
+
+    @pytest.mark.asyncio
+    async def test_delete_missing_returns_false(self, setup_db):
+        """Тест удаления несуществующей задачи"""
+        session, _ = setup_db
+        assert await crud.delete_task(session, 999) is False
@@ -1,7 +1,9 @@
 # tests/test_database.py
 import pytest
 import os
-from database import AsyncSessionLocal
+import time
+from database import (AsyncSessionLocal, EngineProfile, TimedQueuePool, build_database_url,
+                      create_engine_from_profile, pool_stats)
 
 
 class TestDatabase:
@@ -42,4 +44,92 @@ class TestDatabase:
             pytest.fail(f"init_db failed with exception: {e}")
         finally:
             # Восстанавливаем оригинальный engine
-            database.engine = original_engine
\ No newline at end of file
+            database.engine = original_engine
+
+class TestEngineProfile:
+    def test_defaults_disable_echo(self, monkeypatch):
+        """Тест значений по умолчанию: SQL не логируется"""
+        for name in ("DB_ECHO", "DB_POOL_SIZE", "DB_STATEMENT_TIMEOUT_MS"):
+            monkeypatch.delenv(name, raising=False)
+        profile = EngineProfile.from_env()
+        assert profile.echo is False
+        assert profile.pool_size == 5
+
+    def test_profile_from_environment(self, monkeypatch):
+        """Тест чтения настроек пула из окружения"""
+        monkeypatch.setenv("DB_POOL_SIZE", "20")
+        monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+        monkeypatch.setenv("DB_POOL_RECYCLE", "600")
+        monkeypatch.setenv("DB_POOL_PRE_PING", "true")
+        monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "5000")
+        monkeypatch.setenv("DB_STATEMENT_CACHE_SIZE", "0")
+        monkeypatch.setenv("DB_ECHO", "1")
+
+        profile = EngineProfile.from_env()
+
+        assert profile.pool_size == 20
+        assert profile.max_overflow == 0
+        assert profile.pool_recycle == 600
+        assert profile.pool_pre_ping is True
+        assert profile.echo is True
+        assert profile.connect_args() == {
+            "prepared_statement_cache_size": 0,
+            "server_settings": {"statement_timeout": "5000"},
+        }
+
+    def test_database_url_host_from_environment(self, monkeypatch):
+        """Тест сборки URL с хостом из окружения"""
+        monkeypatch.delenv("DATABASE_URL", raising=False)
+        monkeypatch.setenv("POSTGRES_HOST", "replica")
+        assert "@replica:5432/" in build_database_url()
+
+    def test_database_url_override(self, monkeypatch):
+        """Тест полного переопределения DATABASE_URL"""
+        monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///tasks.db")
+        assert build_database_url() == "sqlite+aiosqlite:///tasks.db"
+        assert EngineProfile.from_env().connect_args() == {}
+
+    def test_pool_stats(self):
+        """Тест снимка состояния пула"""
+        stats = pool_stats()
+        assert stats["pool"] == TimedQueuePool.__name__
+        for key in ("checked_out", "overflow", "wait_time_avg_ms", "wait_time_max_ms"):
+            assert key in stats
+
+    @pytest.mark.asyncio
+    async def test_pool_records_checkout_wait(self):
+        """Тест учёта выдачи соединений из пула"""
+        from sqlalchemy import text
+
+        engine = create_engine_from_profile(EngineProfile(url="sqlite+aiosqlite:///:memory:"))
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                assert pool_stats(engine)["checked_out"] == 1
+            stats = pool_stats(engine)
+            assert stats["checkouts"] == 1
+            assert stats["checked_out"] == 0
+        finally:
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_pool_wait_excludes_connect(self):
+        """Тест: открытие нового соединения не считается ожиданием в очереди пула"""
+        from sqlalchemy import text
+
+        engine = create_engine_from_profile(EngineProfile(url="sqlite+aiosqlite:///:memory:"))
+        pool = engine.pool
+        create_connection = pool._create_connection
+
+        def slow_create_connection():
+            time.sleep(0.2)
+            return create_connection()
+
+        pool._create_connection = slow_create_connection
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            assert pool_stats(engine)["checkouts"] == 1
+            assert pool.wait_time_max < 0.1
+        finally:
+            await engine.dispose()
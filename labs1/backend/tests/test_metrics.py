@@ -0,0 +1,101 @@
+# tests/test_metrics.py
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from metrics import (Counter, Histogram, MetricsMiddleware, MetricsRegistry, RequestStats, current_request,
+                     http_request_duration, http_stream_duration, instrument_sqlalchemy)
+
+
+class TestMetricTypes:
+    def test_histogram_renders_cumulative_buckets(self):
+        """Тест накопительных корзин, суммы и количества гистограммы"""
+        histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, "/tasks")
+        histogram.observe(0.5, "/tasks")
+        histogram.observe(5, "/tasks")
+
+        lines = histogram.render()
+
+        assert 'latency_seconds_bucket{route="/tasks",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{route="/tasks",le="1.0"} 2' in lines
+        assert 'latency_seconds_bucket{route="/tasks",le="+Inf"} 3' in lines
+        assert 'latency_seconds_count{route="/tasks"} 3' in lines
+        assert histogram.sum("/tasks") == pytest.approx(5.55)
+
+    def test_registry_renders_help_and_type(self):
+        """Тест заголовков HELP/TYPE и экранирования значений меток"""
+        registry = MetricsRegistry()
+        counter = registry.register(Counter("requests", "Requests", ("path",)))
+        counter.inc('/a"b')
+
+        output = registry.render()
+
+        assert "# HELP requests Requests\n# TYPE requests counter\n" in output
+        assert 'requests_total{path="/a\\"b"} 1' in output
+
+
+class TestStatementHooks:
+    @pytest.mark.asyncio
+    async def test_statements_counted_for_current_request(self):
+        """Тест подсчёта SQL-запросов в контексте запроса через greenlet SQLAlchemy"""
+        instrument_sqlalchemy()
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        stats = RequestStats()
+        token = current_request.set(stats)
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await conn.execute(text("SELECT 2"))
+        finally:
+            current_request.reset(token)
+            await engine.dispose()
+
+        assert stats.statements == 2
+        assert stats.db_time > 0
+
+
+class FakeProfiler:
+    """Профилировщик, который только запоминает, какие запросы профилировались"""
+
+    def __init__(self):
+        self.finished = []
+
+    def start(self):
+        return object()
+
+    def finish(self, profiler, method, route, elapsed):
+        self.finished.append(route)
+
+
+async def call(middleware, path):
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": path}
+    await middleware(scope, receive, send)
+
+
+class TestMetricsMiddleware:
+    @pytest.mark.asyncio
+    async def test_long_lived_requests_are_kept_apart(self):
+        """Тест: SSE и long-poll не попадают в гистограмму задержек и не профилируются"""
+        async def app(scope, receive, send):
+            scope["route"] = SimpleNamespace(path=scope["path"])
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        profiler = FakeProfiler()
+        middleware = MetricsMiddleware(app, profiler=profiler, long_lived_paths=("/test/changes",))
+        await call(middleware, "/test/changes")
+        await call(middleware, "/test/items")
+
+        assert profiler.finished == ["/test/items"]
+        assert http_request_duration.count("GET", "/test/changes") == 0
+        assert http_stream_duration.count("GET", "/test/changes") == 1
+        assert http_request_duration.count("GET", "/test/items") == 1
@@ -0,0 +1,49 @@
+# tests/test_migrations.py
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from migrations import MIGRATIONS, run_migrations, schema_migrations
+from models import Base
+
+
+class TestMigrations:
+    @pytest.fixture
+    async def engine(self):
+        engine = create_async_engine(
+            "sqlite+aiosqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        yield engine
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_fresh_database(self, engine):
+        """Тест применения всех миграций к пустой БД"""
+        async with engine.begin() as conn:
+            applied = await conn.run_sync(run_migrations)
+            versions = (await conn.execute(select(schema_migrations.c.version))).scalars().all()
+            indexes = (await conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))).scalars().all()
+
+        assert applied == [m.version for m in MIGRATIONS]
+        assert sorted(versions) == applied
+        assert "ix_tasks_title_prefix" in indexes
+
+    @pytest.mark.asyncio
+    async def test_migrations_are_idempotent(self, engine):
+        """Тест повторного запуска без изменений"""
+        async with engine.begin() as conn:
+            await conn.run_sync(run_migrations)
+        async with engine.begin() as conn:
+            assert await conn.run_sync(run_migrations) == []
+
+    @pytest.mark.asyncio
+    async def test_adopts_database_created_by_create_all(self, engine):
+        """Тест перехода с базы, созданной через create_all"""
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            applied = await conn.run_sync(run_migrations)
+
+        assert applied == [m.version for m in MIGRATIONS]
@@ -2,17 +2,39 @@
 import axios from "axios";
 
 const API_URL = import.meta.env.VITE_API_URL || "http://localhost:8000";
+const PAGE_SIZE = 500;
+
+// Cookie read-your-writes: после записи чтение идёт из основной БД, а не с реплики
+axios.defaults.withCredentials = true;
 
 export async function getTasks() {
   try {
-    const res = await axios.get(`${API_URL}/tasks`);
-    return res.data;
+    const tasks = [];
+    let after = null;
+    do {
+      const params = { limit: PAGE_SIZE };
+      if (after !== null) params.after = after;
+      const res = await axios.get(`${API_URL}/tasks`, { params });
+      tasks.push(...res.data);
+      after = res.headers["x-next-cursor"] ?? null;
+    } while (after !== null);
+    return tasks;
   } catch (e) {
     console.error("getTasks error", e);
     return [];
   }
 }
 
+export async function searchTasks(q, limit = 50) {
+  try {
+    const res = await axios.get(`${API_URL}/tasks`, { params: { q, limit } });
+    return res.data;
+  } catch (e) {
+    console.error("searchTasks error", e);
+    return [];
+  }
+}
+
 export async function createTask(task) {
   const res = await axios.post(`${API_URL}/tasks`, task);
   return res.data;
@@ -26,3 +48,10 @@ export async function updateTask(id, task) {
 export async function deleteTask(id) {
   await axios.delete(`${API_URL}/tasks/${id}`);
 }
+
+export function subscribeChanges(onChange) {
+  // EventSource сам переподключается и продолжает ленту по Last-Event-ID
+  const source = new EventSource(`${API_URL}/tasks/changes`, { withCredentials: true });
+  source.onmessage = (e) => onChange(JSON.parse(e.data));
+  return () => source.close();
+}
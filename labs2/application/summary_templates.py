@@ -0,0 +1,44 @@
+"""Шаблоны текстовой сводки погоды по локалям"""
+
+SUMMARY_TEMPLATES = {
+    "ru": {
+        "header": "🌆 Погода в {city}: {temperature:.1f}°C, {description}",
+        "fields": (
+            ("feels_like", "🌡️ Ощущается как: {:.1f}°C"),
+            ("humidity", "💧 Влажность: {}%"),
+            ("pressure", "📈 Давление: {} мбар"),
+            ("wind_speed", "🌬️ Ветер: {} м/с"),
+            ("cloud", "☁️ Облачность: {}%"),
+            ("uv_index", "🌞 UV-индекс: {}"),
+            ("precip_mm", "🌧️ Осадки: {} мм"),
+            ("rain_mm", "🌧️ Дождь: {} мм"),
+            ("snow_cm", "❄️ Снег: {} см"),
+        ),
+        "wind_dir": " ({})",
+        "day": "🌞 День",
+        "night": "🌙 Ночь",
+        "sun": "🌅 Восход: {sunrise}, 🌇 Закат: {sunset}",
+        "error": "Ошибка при получении погоды для {city}: {error}",
+    },
+    "en": {
+        "header": "🌆 Weather in {city}: {temperature:.1f}°C, {description}",
+        "fields": (
+            ("feels_like", "🌡️ Feels like: {:.1f}°C"),
+            ("humidity", "💧 Humidity: {}%"),
+            ("pressure", "📈 Pressure: {} mbar"),
+            ("wind_speed", "🌬️ Wind: {} m/s"),
+            ("cloud", "☁️ Cloud cover: {}%"),
+            ("uv_index", "🌞 UV index: {}"),
+            ("precip_mm", "🌧️ Precipitation: {} mm"),
+            ("rain_mm", "🌧️ Rain: {} mm"),
+            ("snow_cm", "❄️ Snow: {} cm"),
+        ),
+        "wind_dir": " ({})",
+        "day": "🌞 Day",
+        "night": "🌙 Night",
+        "sun": "🌅 Sunrise: {sunrise}, 🌇 Sunset: {sunset}",
+        "error": "Failed to get weather for {city}: {error}",
+    },
+}
+
+DEFAULT_LOCALE = "ru"
@@ -1,36 +1,90 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from labs2.application.summary_templates import DEFAULT_LOCALE, SUMMARY_TEMPLATES
+from labs2.domain.entities.weather_data import WeatherData
+from labs2.domain.entities.weather_result import WeatherResult
 from labs2.domain.interfaces.weather_repository import WeatherRepository
 
+DATA_FIELDS = WeatherData.__slots__
+
+
+def render_summary(w: WeatherData, template: dict) -> str:
+    lines = [template["header"].format(city=w.city, temperature=w.temperature, description=w.description)]
+
+    for attr, line in template["fields"]:
+        value = getattr(w, attr)
+        if value is not None:
+            text = line.format(value)
+            if attr == "wind_speed" and w.wind_dir:
+                text += template["wind_dir"].format(w.wind_dir)
+            lines.append(text)
+
+    if w.is_day is not None:
+        lines.append(template["day"] if w.is_day else template["night"])
+
+    if w.sunrise and w.sunset:
+        lines.append(template["sun"].format(sunrise=w.sunrise, sunset=w.sunset))
+
+    return "\n".join(lines)
+
 
 class WeatherService:
-    def __init__(self, repository: WeatherRepository):
+    """
+    Сводки погоды. Готовый текст запоминается для каждого объекта WeatherData и локали:
+    повторные попадания в кэш не форматируют его заново, а новые данные — это новый объект.
+    """
+
+    def __init__(self, repository: WeatherRepository, locale: str = DEFAULT_LOCALE, memo_size: int = 1024):
+        if locale not in SUMMARY_TEMPLATES:
+            raise ValueError(f"Unknown locale {locale!r}, expected one of {sorted(SUMMARY_TEMPLATES)}")
         self.repository = repository
+        self.locale = locale
+        self.memo_size = memo_size
+        # (id(data), locale) -> (data, текст); ссылка на data не даёт переиспользовать id
+        self._memo: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    def get_weather_summary(self, city: str, locale: Optional[str] = None) -> str:
+        return self.format_summary(self.repository.get_weather(city), locale)
 
-    def get_weather_summary(self, city: str) -> str:
-        w = self.repository.get_weather(city)
+    def get_weather_data(self, city: str) -> dict:
+        """Данные для машинных клиентов, без форматирования текста"""
+        return self.to_dict(self.repository.get_weather(city))
 
-        lines = [f"🌆 Погода в {w.city}: {w.temperature:.1f}°C, {w.description}"]
+    def get_cached_summary(self, city: str, locale: Optional[str] = None) -> Optional[str]:
+        """Сводка из кэша без сетевого запроса или None"""
+        w = self.repository.get_cached(city)
+        return self.format_summary(w, locale) if w is not None else None
 
-        optional_fields = {
-            "feels_like": ("🌡️ Ощущается как", lambda v: f"{v:.1f}°C"),
-            "humidity": ("💧 Влажность", lambda v: f"{v}%"),
-            "pressure": ("📈 Давление", lambda v: f"{v} мбар"),
-            "wind_speed": ("🌬️ Ветер", lambda v: f"{v} м/с" + (f" ({w.wind_dir})" if w.wind_dir else "")),
-            "cloud": ("☁️ Облачность", lambda v: f"{v}%"),
-            "uv_index": ("🌞 UV-индекс", str),
-            "precip_mm": ("🌧️ Осадки", lambda v: f"{v} мм"),
-            "rain_mm": ("🌧️ Дождь", lambda v: f"{v} мм"),
-            "snow_cm": ("❄️ Снег", lambda v: f"{v} см"),
-        }
+    def get_weather_many(self, cities: Iterable[str]) -> List[WeatherResult]:
+        return self.repository.get_weather_many(cities)
 
-        for attr, (label, fmt) in optional_fields.items():
-            value = getattr(w, attr, None)
-            if value is not None:
-                lines.append(f"{label}: {fmt(value)}")
+    def get_weather_summaries(self, cities: Iterable[str], locale: Optional[str] = None) -> List[str]:
+        """Сводки по списку городов в порядке запроса; для недоступных городов — текст ошибки"""
+        template = SUMMARY_TEMPLATES[locale or self.locale]
+        return [
+            self.format_summary(r.data, locale) if r.ok else template["error"].format(city=r.city, error=r.error)
+            for r in self.get_weather_many(cities)
+        ]
 
-        if w.is_day is not None:
-            lines.append("🌞 День" if w.is_day else "🌙 Ночь")
+    @staticmethod
+    def to_dict(w: WeatherData) -> dict:
+        return {name: getattr(w, name) for name in DATA_FIELDS}
 
-        if w.sunrise and w.sunset:
-            lines.append(f"🌅 Восход: {w.sunrise}, 🌇 Закат: {w.sunset}")
+    def format_summary(self, w: WeatherData, locale: Optional[str] = None) -> str:
+        locale = locale or self.locale
+        key = (id(w), locale)
+        with self._memo_lock:
+            entry = self._memo.get(key)
+            if entry is not None and entry[0] is w:
+                self._memo.move_to_end(key)
+                return entry[1]
 
-        return "\n".join(lines)
+        text = render_summary(w, SUMMARY_TEMPLATES[locale])
+        with self._memo_lock:
+            self._memo[key] = (w, text)
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return text
@@ -0,0 +1,116 @@
+"""
+Память на одно показание и скорость разбора ответа провайдера: исходный WeatherData
+(обычный dataclass с __dict__, json.loads и цепочки .get) против текущего
+(dataclass со __slots__, orjson, интернированные строки и разбор через локальные ссылки).
+
+    python -m labs2.benchmarks.bench_weather_data --readings 100000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+from labs2.domain.entities.weather_data import WeatherData
+from labs2.infrastructure.providers.json_codec import loads
+from labs2.infrastructure.providers.weatherapi_provider import parse_weatherapi
+
+SAMPLE_RESPONSE = json.dumps({
+    "location": {"name": "Москва", "region": "Moscow City", "country": "Россия", "lat": 55.75, "lon": 37.62,
+                 "tz_id": "Europe/Moscow", "localtime_epoch": 1700000000, "localtime": "2023-11-14 22:13"},
+    "current": {
+        "last_updated_epoch": 1700000000, "last_updated": "2023-11-14 22:00", "temp_c": -3.0, "temp_f": 26.6,
+        "is_day": 0, "condition": {"text": "Небольшой снег", "icon": "//cdn.weatherapi.com/326.png", "code": 1213},
+        "wind_mph": 8.1, "wind_kph": 13.0, "wind_degree": 240, "wind_dir": "WSW", "pressure_mb": 1012.0,
+        "pressure_in": 29.88, "precip_mm": 0.3, "precip_in": 0.01, "humidity": 93, "cloud": 100,
+        "feelslike_c": -7.4, "feelslike_f": 18.7, "vis_km": 3.0, "vis_miles": 1.0, "uv": 1.0,
+        "gust_mph": 13.6, "gust_kph": 21.9,
+    },
+}, ensure_ascii=False).encode()
+
+
+@dataclass
+class LegacyWeatherData:
+    city: str
+    temperature: float
+    description: str
+    feels_like: Optional[float] = None
+    humidity: Optional[int] = None
+    pressure: Optional[float] = None
+    wind_speed: Optional[float] = None
+    wind_degree: Optional[int] = None
+    wind_dir: Optional[str] = None
+    cloud: Optional[int] = None
+    uv_index: Optional[float] = None
+    precip_mm: Optional[float] = None
+    rain_mm: Optional[float] = None
+    snow_cm: Optional[float] = None
+    is_day: Optional[bool] = None
+    sunrise: Optional[str] = None
+    sunset: Optional[str] = None
+
+
+def legacy_parse(content: bytes, city: str) -> LegacyWeatherData:
+    data = json.loads(content)
+    current = data.get("current", {})
+    condition = current.get("condition", {})
+    location = data.get("location", {})
+    return LegacyWeatherData(
+        city=location.get("name", city),
+        temperature=current.get("temp_c"),
+        feels_like=current.get("feelslike_c"),
+        humidity=current.get("humidity"),
+        pressure=current.get("pressure_mb"),
+        wind_speed=current.get("wind_kph"),
+        wind_degree=current.get("wind_degree"),
+        wind_dir=current.get("wind_dir"),
+        cloud=current.get("cloud"),
+        uv_index=current.get("uv"),
+        description=condition.get("text", ""),
+        precip_mm=current.get("precip_mm"),
+        rain_mm=current.get("precip_mm") if current.get("precip_mm", 0) > 0 else None,
+        snow_cm=current.get("snow_cm") if current.get("snow_cm", 0) > 0 else None,
+        is_day=bool(current.get("is_day", 1)),
+        sunrise=None,
+        sunset=None,
+    )
+
+
+def current_parse(content: bytes, city: str) -> WeatherData:
+    return parse_weatherapi(loads(content), city)
+
+
+def bytes_per_reading(parse, readings: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [parse(SAMPLE_RESPONSE, "Moscow") for _ in range(readings)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return total / readings
+
+
+def parses_per_second(parse, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        parse(SAMPLE_RESPONSE, "Moscow")
+    return iterations / (time.perf_counter() - start)
+
+
+def main(args):
+    print(f"{'variant':<10}{'bytes/reading':>16}{'parses/s':>14}")
+    results = {}
+    for name, parse in (("before", legacy_parse), ("after", current_parse)):
+        results[name] = (bytes_per_reading(parse, args.readings), parses_per_second(parse, args.iterations))
+        print(f"{name:<10}{results[name][0]:>16.0f}{results[name][1]:>14.0f}")
+    (mem_before, speed_before), (mem_after, speed_after) = results["before"], results["after"]
+    print(f"memory: {mem_before / mem_after:.2f}x less, parsing: {speed_after / speed_before:.2f}x faster")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=100_000, help="показаний в памяти для замера")
+    parser.add_argument("--iterations", type=int, default=200_000, help="разборов для замера скорости")
+    main(parser.parse_args())
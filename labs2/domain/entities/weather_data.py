@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class WeatherData:
     city: str
     temperature: float
@@ -27,4 +27,7 @@ class WeatherData:
     sunrise: Optional[str] = None
     sunset: Optional[str] = None
 
-
+    # Место по данным провайдера
+    country: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from labs2.domain.entities.weather_data import WeatherData
+
+
+@dataclass
+class WeatherResult:
+    """Результат запроса одного города в пакетном запросе"""
+    city: str
+    data: Optional[WeatherData] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
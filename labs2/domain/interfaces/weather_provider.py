@@ -1,4 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
+from typing import List, Sequence, Union
 
 from labs2.domain.entities.weather_data import WeatherData
 
@@ -8,3 +10,24 @@ class WeatherProvider(ABC):
     def fetch_weather(self, city: str) -> WeatherData:
         """Запрашивает погоду у конкретного провайдера и возвращает WeatherData"""
         raise NotImplementedError
+
+
+class AsyncWeatherProvider(ABC):
+    @abstractmethod
+    async def fetch_weather(self, city: str) -> WeatherData:
+        """Асинхронно запрашивает погоду у провайдера и возвращает WeatherData"""
+        raise NotImplementedError
+
+    async def fetch_weather_many(self, cities: Sequence[str],
+                                 concurrency: int = 10) -> List[Union[WeatherData, Exception]]:
+        """Погода для нескольких городов, не более concurrency запросов одновременно"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(city: str) -> WeatherData:
+            async with semaphore:
+                return await self.fetch_weather(city)
+
+        return await asyncio.gather(*(fetch(city) for city in cities), return_exceptions=True)
+
+    async def aclose(self) -> None:
+        """Закрывает соединения провайдера"""
@@ -1,10 +1,26 @@
 from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional
 
 from labs2.domain.entities.weather_data import WeatherData
+from labs2.domain.entities.weather_result import WeatherResult
 
 
 class WeatherRepository(ABC):
     @abstractmethod
     def get_weather(self, city: str) -> WeatherData:
         """Возвращает WeatherData (возможно из кэша)"""
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    def get_cached(self, city: str) -> Optional[WeatherData]:
+        """Данные без обращения к провайдеру, если они уже есть; иначе None"""
+        return None
+
+    def get_weather_many(self, cities: Iterable[str]) -> List[WeatherResult]:
+        """Погода для списка городов в порядке запроса; ошибки возвращаются по каждому городу"""
+        results = []
+        for city in cities:
+            try:
+                results.append(WeatherResult(city, data=self.get_weather(city)))
+            except Exception as e:
+                results.append(WeatherResult(city, error=e))
+        return results
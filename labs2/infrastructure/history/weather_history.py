@@ -0,0 +1,191 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from labs2.domain.entities.weather_data import WeatherData
+
+NUMERIC_FIELDS = (
+    "temperature", "feels_like", "humidity", "pressure", "wind_speed",
+    "wind_degree", "cloud", "uv_index", "precip_mm", "rain_mm", "snow_cm",
+)
+FIELD_INDEX = {name: i for i, name in enumerate(NUMERIC_FIELDS)}
+STATS = ("min", "max", "mean", "count")
+
+
+class CitySeries:
+    """Показания одного города: массив времени и матрица (показание × поле), None хранится как NaN"""
+
+    def __init__(self, capacity: int = 64):
+        self.timestamps = np.empty(capacity, dtype=np.float64)
+        self.values = np.empty((capacity, len(NUMERIC_FIELDS)), dtype=np.float64)
+        self.size = 0
+        self.sorted = True
+
+    def append(self, timestamp: float, row: Sequence[float]) -> None:
+        if self.size == len(self.timestamps):
+            self._grow()
+        if self.size and timestamp < self.timestamps[self.size - 1]:
+            self.sorted = False
+        self.timestamps[self.size] = timestamp
+        self.values[self.size] = row
+        self.size += 1
+
+    def _grow(self) -> None:
+        capacity = len(self.timestamps) * 2
+        self.timestamps = np.resize(self.timestamps, capacity)
+        values = np.empty((capacity, len(NUMERIC_FIELDS)), dtype=np.float64)
+        values[:self.size] = self.values[:self.size]
+        self.values = values
+
+    def trim_before(self, cutoff: float) -> None:
+        self._ensure_sorted()
+        start = int(np.searchsorted(self.timestamps[:self.size], cutoff, side="left"))
+        if start:
+            remaining = self.size - start
+            self.timestamps[:remaining] = self.timestamps[start:self.size]
+            self.values[:remaining] = self.values[start:self.size]
+            self.size = remaining
+
+    def _ensure_sorted(self) -> None:
+        if not self.sorted:
+            order = np.argsort(self.timestamps[:self.size], kind="stable")
+            self.timestamps[:self.size] = self.timestamps[:self.size][order]
+            self.values[:self.size] = self.values[:self.size][order]
+            self.sorted = True
+
+    def window(self, start: Optional[float], end: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Срез [start, end) без копирования"""
+        self._ensure_sorted()
+        ts = self.timestamps[:self.size]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = self.size if end is None else int(np.searchsorted(ts, end, side="left"))
+        return ts[lo:hi], self.values[lo:hi]
+
+
+def summarize(values: np.ndarray, percentiles: Sequence[float]) -> Dict[str, np.ndarray]:
+    """Статистики по столбцам матрицы значений без учёта NaN"""
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+    result = {"count": count}
+    if not len(values):
+        empty = np.full(values.shape[1], np.nan)
+        result.update(min=empty, max=empty, mean=empty)
+        result.update({f"p{p:g}": empty for p in percentiles})
+        return result
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result["min"] = np.fmin.reduce(values, axis=0)
+        result["max"] = np.fmax.reduce(values, axis=0)
+        result["mean"] = np.where(valid, values, 0.0).sum(axis=0) / count
+        if percentiles:
+            # Только столбцы, где есть хотя бы одно значение: nanpercentile предупреждает о пустых
+            filled = count > 0
+            pct = np.full((len(percentiles), values.shape[1]), np.nan)
+            pct[:, filled] = np.nanpercentile(values[:, filled], percentiles, axis=0)
+            result.update({f"p{p:g}": pct[i] for i, p in enumerate(percentiles)})
+    return result
+
+
+def as_number(stat: str, value) -> float:
+    return int(value) if stat == "count" else float(value)
+
+
+class WeatherHistory:
+    """
+    Хранилище истории показаний по городам в столбцовых массивах NumPy.
+    Агрегаты за окно времени и ресемплинг считаются векторно по срезу массива.
+    Показания старше retention_seconds отбрасываются при добавлении новых.
+    key_for переводит название города в ключ, под которым записаны показания
+    (CachedWeatherRepository подставляет id места из индекса псевдонимов).
+    """
+
+    def __init__(self, retention_seconds: Optional[float] = 180 * 24 * 3600,
+                 key_for: Optional[Callable[[str], str]] = None):
+        self.retention_seconds = retention_seconds
+        self.key_for = key_for
+        self._series: Dict[str, CitySeries] = {}
+        self._lock = threading.Lock()
+
+    def record(self, city: str, data: WeatherData, timestamp: Optional[float] = None) -> None:
+        timestamp = time.time() if timestamp is None else timestamp
+        row = [np.nan if (v := getattr(data, name)) is None else float(v) for name in NUMERIC_FIELDS]
+        with self._lock:
+            series = self._series.get(city)
+            if series is None:
+                series = self._series[city] = CitySeries()
+            elif self.retention_seconds and series.size == len(series.timestamps):
+                series.trim_before(timestamp - self.retention_seconds)
+            series.append(timestamp, row)
+
+    def _get(self, city: str) -> Optional[CitySeries]:
+        series = self._series.get(city)
+        if series is None and self.key_for is not None:
+            series = self._series.get(self.key_for(city))
+        return series
+
+    def cities(self) -> Iterable[str]:
+        return list(self._series)
+
+    def __len__(self) -> int:
+        return sum(series.size for series in self._series.values())
+
+    def aggregate(self, city: str, fields: Sequence[str] = ("temperature",), start: Optional[float] = None,
+                  end: Optional[float] = None, percentiles: Sequence[float] = (50, 95)) -> Dict[str, Dict[str, float]]:
+        """{поле: {"min", "max", "mean", "count", "p50", ...}} за окно [start, end)"""
+        columns = [FIELD_INDEX[name] for name in fields]
+        with self._lock:
+            series = self._get(city)
+            if series is None:
+                return {}
+            _, values = series.window(start, end)
+            values = values[:, columns].copy()
+        stats = summarize(values, percentiles)
+        return {name: {stat: as_number(stat, arr[i]) for stat, arr in stats.items()} for i, name in enumerate(fields)}
+
+    def aggregate_many(self, cities: Iterable[str], field: str = "temperature", start: Optional[float] = None,
+                       end: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """Min/max/mean/count одного поля за окно для многих городов"""
+        column = FIELD_INDEX[field]
+        result = {}
+        with self._lock:
+            for city in cities:
+                series = self._get(city)
+                if series is None:
+                    continue
+                _, values = series.window(start, end)
+                stats = summarize(values[:, column:column + 1], ())
+                result[city] = {stat: as_number(stat, stats[stat][0]) for stat in STATS}
+        return result
+
+    def resample(self, city: str, field: str, interval: float, start: Optional[float] = None,
+                 end: Optional[float] = None, how: str = "mean") -> Tuple[np.ndarray, np.ndarray]:
+        """Значения поля по интервалам длиной interval секунд: (начала интервалов, min/max/mean/count)"""
+        column = FIELD_INDEX[field]
+        with self._lock:
+            series = self._get(city)
+            if series is None:
+                return np.empty(0), np.empty(0)
+            ts, values = series.window(start, end)
+            ts, values = ts.copy(), values[:, column].copy()
+        if not len(ts):
+            return np.empty(0), np.empty(0)
+
+        origin = ts[0] if start is None else start
+        buckets = ((ts - origin) // interval).astype(np.int64)
+        # Метки интервалов неубывающие, поэтому границы групп — места смены метки
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+        valid = ~np.isnan(values)
+        counts = np.add.reduceat(valid.astype(np.int64), bounds)
+        if how == "count":
+            result = counts.astype(np.float64)
+        elif how == "mean":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result = np.add.reduceat(np.where(valid, values, 0.0), bounds) / counts
+        elif how == "min":
+            result = np.fmin.reduceat(values, bounds)
+        elif how == "max":
+            result = np.fmax.reduceat(values, bounds)
+        else:
+            raise ValueError(f"Unknown aggregation {how!r}, expected one of {STATS}")
+        return origin + buckets[bounds] * interval, result
@@ -0,0 +1,77 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Optional
+
+from labs2.domain.entities.weather_data import WeatherData
+from labs2.domain.interfaces.weather_provider import AsyncWeatherProvider, WeatherProvider
+
+
+logger = logging.getLogger(__name__)
+
+
+def _log_failure(future: concurrent.futures.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Background weather task failed: %r", future.exception())
+
+
+class BackgroundLoop:
+    """Event loop в фоновом потоке, на котором живут асинхронные HTTP-клиенты"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="weather-io", daemon=True).start()
+            return self._loop
+
+    def run(self, coro):
+        """Выполняет корутину на фоновом loop и ждёт результат в вызывающем потоке"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def submit(self, coro) -> "concurrent.futures.Future":
+        """Запускает корутину на фоновом loop, не дожидаясь результата"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        future.add_done_callback(_log_failure)
+        return future
+
+
+background_loop = BackgroundLoop()
+
+
+class SyncProviderAdapter(WeatherProvider):
+    """Синхронный провайдер поверх асинхронного для WeatherService и UI"""
+
+    def __init__(self, provider: AsyncWeatherProvider, loop: BackgroundLoop = background_loop):
+        self.async_provider = provider
+        self._loop = loop
+
+    def fetch_weather(self, city: str) -> WeatherData:
+        return self._loop.run(self.async_provider.fetch_weather(city))
+
+    def close(self) -> None:
+        self._loop.run(self.async_provider.aclose())
+
+
+class AsyncProviderAdapter(AsyncWeatherProvider):
+    """Асинхронный провайдер поверх синхронного: вызовы уходят в пул потоков"""
+
+    def __init__(self, provider: WeatherProvider):
+        self.provider = provider
+
+    async def fetch_weather(self, city: str) -> WeatherData:
+        return await asyncio.to_thread(self.provider.fetch_weather, city)
+
+
+def as_async(provider) -> AsyncWeatherProvider:
+    if isinstance(provider, AsyncWeatherProvider):
+        return provider
+    if isinstance(provider, SyncProviderAdapter):
+        return provider.async_provider
+    return AsyncProviderAdapter(provider)
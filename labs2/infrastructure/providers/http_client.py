@@ -0,0 +1,35 @@
+import os
+from dataclasses import dataclass
+
+import httpx
+
+
+@dataclass(frozen=True)
+class HttpClientSettings:
+    """Параметры пула keep-alive соединений к API провайдера"""
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 3.0
+    read_timeout: float = 10.0
+
+    @classmethod
+    def from_env(cls) -> "HttpClientSettings":
+        default = cls()
+        return cls(
+            max_connections=int(os.getenv("WEATHER_HTTP_MAX_CONNECTIONS", default.max_connections)),
+            max_keepalive_connections=int(os.getenv("WEATHER_HTTP_MAX_KEEPALIVE", default.max_keepalive_connections)),
+            keepalive_expiry=float(os.getenv("WEATHER_HTTP_KEEPALIVE_EXPIRY", default.keepalive_expiry)),
+            connect_timeout=float(os.getenv("WEATHER_HTTP_CONNECT_TIMEOUT", default.connect_timeout)),
+            read_timeout=float(os.getenv("WEATHER_HTTP_READ_TIMEOUT", default.read_timeout)),
+        )
+
+    def build_async_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+        )
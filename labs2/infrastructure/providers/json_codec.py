@@ -0,0 +1,19 @@
+import sys
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - без orjson используется стандартный json
+    orjson = None
+    import json
+
+
+def loads(content: bytes):
+    """Разбор JSON-ответа провайдера; orjson заметно быстрее json.loads на ответах API"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def intern_text(value):
+    """Повторяющиеся строки (города, описания, направления ветра) хранятся в одном экземпляре"""
+    return sys.intern(value) if isinstance(value, str) else value
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, List, Optional, Sequence
+
+import httpx
+
+from labs2.domain.entities.weather_data import WeatherData
+from labs2.domain.interfaces.weather_provider import AsyncWeatherProvider
+from labs2.infrastructure.providers.adapters import SyncProviderAdapter, as_async
+from labs2.infrastructure.providers.weatherstack_provider import WeatherStackError
+
+logger = logging.getLogger(__name__)
+
+
+class NoProviderAvailable(Exception):
+    """Все провайдеры отключены автоматом"""
+
+
+def is_client_error(error: Exception) -> bool:
+    """Ошибка запроса (например, неизвестный город), а не сбой провайдера"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return 400 <= status < 500 and status != 429
+    if isinstance(error, WeatherStackError):
+        return error.is_query_error
+    return False
+
+
+class CircuitBreaker:
+    """После failure_threshold ошибок подряд провайдер отключается на cooldown секунд, затем пробный запрос"""
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_running or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+    def release(self) -> None:
+        """Пробный запрос отменён, не дождавшись ответа"""
+        self._trial_running = False
+
+
+class ProviderRoute:
+    """Провайдер со скользящим средним задержки, окном последних задержек и автоматом"""
+
+    def __init__(self, name: str, provider: AsyncWeatherProvider, breaker: CircuitBreaker,
+                 alpha: float = 0.2, window: int = 100):
+        self.name = name
+        self.provider = provider
+        self.breaker = breaker
+        self.alpha = alpha
+        self.latency_ewma: Optional[float] = None
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+    def observe(self, latency: float) -> None:
+        self.latencies.append(latency)
+        self._update_ewma(latency)
+
+    def observe_cancelled(self, elapsed: float) -> None:
+        """
+        Запрос отменён через elapsed секунд: ответ пришёл бы не раньше, поэтому это
+        только нижняя оценка — она может поднять среднее, но не опустить его, и в окно
+        перцентилей не попадает.
+        """
+        if self.latency_ewma is None or elapsed > self.latency_ewma:
+            self._update_ewma(elapsed)
+
+    def _update_ewma(self, latency: float) -> None:
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = self.alpha * latency + (1 - self.alpha) * self.latency_ewma
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self.latencies) < 10:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(p / 100 * len(ordered)), len(ordered) - 1)]
+
+
+class AsyncRacingWeatherProvider(AsyncWeatherProvider):
+    """
+    Составной провайдер. Запрос уходит самому быстрому по скользящему среднему провайдеру;
+    если ответа нет дольше hedge_percentile-перцентиля его задержек, параллельно
+    запрашивается следующий, и побеждает первый успешный ответ. При ошибке запрос сразу
+    переходит к следующему провайдеру, а провайдеры с частыми ошибками временно отключаются.
+    """
+
+    def __init__(self, providers: Sequence, names: Optional[Sequence[str]] = None, hedge: bool = True,
+                 hedge_percentile: float = 95, default_hedge_delay: float = 1.0, min_hedge_delay: float = 0.05,
+                 failure_threshold: int = 5, cooldown: float = 30.0):
+        names = names or [type(p).__name__ for p in providers]
+        self.routes = [
+            ProviderRoute(name, as_async(provider), CircuitBreaker(failure_threshold, cooldown))
+            for name, provider in zip(names, providers)
+        ]
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+
+    def _ordered_routes(self) -> List[ProviderRoute]:
+        # Провайдеры без замеров идут первыми, чтобы получить оценку задержки
+        return sorted(self.routes, key=lambda r: r.latency_ewma or 0.0)
+
+    def _hedge_delay(self, route: ProviderRoute) -> Optional[float]:
+        if not self.hedge:
+            return None
+        delay = route.percentile(self.hedge_percentile)
+        return max(delay if delay is not None else self.default_hedge_delay, self.min_hedge_delay)
+
+    async def _call(self, route: ProviderRoute, city: str) -> WeatherData:
+        start = time.monotonic()
+        try:
+            data = await route.provider.fetch_weather(city)
+        except asyncio.CancelledError:
+            route.observe_cancelled(time.monotonic() - start)
+            route.breaker.release()
+            raise
+        except Exception as e:
+            if is_client_error(e):
+                route.breaker.record_success()
+            else:
+                route.breaker.record_failure()
+                logger.warning("Provider %s failed for %s: %r", route.name, city, e)
+            raise
+        route.observe(time.monotonic() - start)
+        route.breaker.record_success()
+        return data
+
+    async def fetch_weather(self, city: str) -> WeatherData:
+        candidates = iter(self._ordered_routes())
+        pending = {}
+        last_error: Optional[Exception] = None
+
+        def launch_next() -> Optional[ProviderRoute]:
+            for route in candidates:
+                if route.breaker.allow():
+                    pending[asyncio.ensure_future(self._call(route, city))] = route
+                    return route
+            return None
+
+        route = launch_next()
+        if route is None:
+            raise NoProviderAvailable("All weather providers are temporarily disabled")
+        hedge_delay = self._hedge_delay(route)
+
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Медленный ответ: страхуемся запросом к следующему провайдеру
+                    route = launch_next()
+                    hedge_delay = self._hedge_delay(route) if route else None
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    if is_client_error(error):
+                        raise error
+                    last_error = error
+                route = launch_next()
+                if route is not None:
+                    hedge_delay = self._hedge_delay(route)
+            raise last_error or NoProviderAvailable("All weather providers are temporarily disabled")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def status(self) -> List[dict]:
+        return [
+            {
+                "name": route.name,
+                "state": route.breaker.state,
+                "latency_ewma_ms": round(route.latency_ewma * 1000, 1) if route.latency_ewma is not None else None,
+                "failures": route.breaker.failures,
+                "budget": route.provider.budget() if hasattr(route.provider, "budget") else None,
+            }
+            for route in self.routes
+        ]
+
+    async def aclose(self) -> None:
+        for route in self.routes:
+            await route.provider.aclose()
+
+
+class RacingWeatherProvider(SyncProviderAdapter):
+    def __init__(self, providers: Sequence, **kwargs):
+        super().__init__(AsyncRacingWeatherProvider(providers, **kwargs))
@@ -0,0 +1,257 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple, Union
+
+import httpx
+
+from labs2.domain.entities.weather_data import WeatherData
+from labs2.domain.interfaces.weather_provider import AsyncWeatherProvider
+from labs2.infrastructure.providers.adapters import as_async
+
+logger = logging.getLogger(__name__)
+
+# Меньше — важнее: запросы пользователя обгоняют пакетные и фоновые обновления
+INTERACTIVE = 0
+BATCH = 5
+BACKGROUND = 10
+
+request_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+
+
+class QuotaExceeded(Exception):
+    """Дневная квота запросов к провайдеру исчерпана"""
+
+
+@dataclass(frozen=True)
+class RateLimitSettings:
+    rate: float = 5.0  # запросов в секунду в среднем
+    burst: int = 10  # запросов подряд без ожидания
+    daily_quota: Optional[int] = None  # запросов за сутки UTC
+    max_retries: int = 3
+    base_backoff: float = 0.5
+    max_backoff: float = 30.0
+
+
+class TokenBucketScheduler:
+    """
+    Token bucket с очередью по приоритету: ожидающие получают токены в порядке
+    (приоритет, время постановки). Работает в event loop, на котором живут HTTP-клиенты провайдера.
+    Токены всегда свои у процесса, а дневная квота с quota_store общая для всех процессов с этой базой.
+    """
+
+    def __init__(self, rate: float, burst: int, daily_quota: Optional[int] = None,
+                 quota_store=None, name: str = "provider"):
+        self.rate = rate
+        self.burst = burst
+        self.daily_quota = daily_quota
+        self.quota_store = quota_store if daily_quota is not None else None
+        self.name = name
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._day = self._today()
+        self.used_today = 0
+        self.throttled = 0
+
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).date()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if now > self._updated:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def _reserve_quota(self, cost: int) -> None:
+        today = self._today()
+        if today != self._day:
+            self._day, self.used_today = today, 0
+        if self.quota_store is not None:
+            used = self.quota_store.reserve_quota(self.name, today.isoformat(), cost, self.daily_quota)
+            if used is None:
+                raise QuotaExceeded(f"Daily quota of {self.daily_quota} requests is exhausted")
+            self.used_today = used
+            return
+        if self.daily_quota is not None and self.used_today + cost > self.daily_quota:
+            raise QuotaExceeded(f"Daily quota of {self.daily_quota} requests is exhausted")
+        self.used_today += cost
+
+    def _release_quota(self, cost: int) -> None:
+        self.used_today -= cost
+        if self.quota_store is not None:
+            self.quota_store.release_quota(self.name, self._day.isoformat(), cost)
+
+    async def acquire(self, priority: int = INTERACTIVE, quota_cost: int = 1) -> None:
+        """Один токен на HTTP-запрос; quota_cost — сколько запросов он списывает из дневной квоты"""
+        if self.quota_store is not None:
+            await asyncio.to_thread(self._reserve_quota, quota_cost)
+        else:
+            self._reserve_quota(quota_cost)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._dispatch()
+        if not future.done():
+            self.throttled += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.done() or future.cancelled():
+                self._release_quota(quota_cost)
+            self._dispatch()
+            raise
+
+    def _dispatch(self) -> None:
+        self._refill()
+        while self._waiters and self.tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        if self._waiters and self._timer is None:
+            delay = max(self._updated - time.monotonic(), 0.0) + (1 - self.tokens) / self.rate
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def penalize(self, delay: float) -> None:
+        """Провайдер ответил 429: токенов нет, пополнение начнётся через delay секунд"""
+        self.tokens = 0.0
+        self._updated = max(self._updated, time.monotonic() + delay)
+
+    def budget(self) -> dict:
+        # Без _refill: бюджет читают из других потоков, а состояние меняет только loop провайдера
+        tokens = min(self.burst, self.tokens + max(time.monotonic() - self._updated, 0.0) * self.rate)
+        return {
+            "tokens": round(tokens, 2),
+            "queued": sum(1 for _, _, future in self._waiters if not future.done()),
+            "used_today": self.used_today,
+            "daily_remaining": None if self.daily_quota is None else max(self.daily_quota - self.used_today, 0),
+            "throttled": self.throttled,
+        }
+
+
+def retry_delay(error: Exception, attempt: int, settings: RateLimitSettings) -> Optional[float]:
+    """Пауза перед повтором или None, если ошибку повторять бессмысленно"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        if status != 429 and status < 500:
+            return None
+        retry_after = error.response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), settings.max_backoff)
+    elif not isinstance(error, httpx.TransportError):
+        return None
+    # Экспоненциальная пауза с джиттером, чтобы повторы разных запросов не совпадали
+    backoff = min(settings.base_backoff * 2 ** attempt, settings.max_backoff)
+    return random.uniform(backoff / 2, backoff)
+
+
+def provider_status(provider) -> dict:
+    """
+    Состояние провайдера для мониторинга: остаток бюджета запросов, а у составного
+    провайдера — маршруты с автоматами и бюджетами.
+    """
+    provider = as_async(provider)
+    status = {"name": type(provider).__name__}
+    if hasattr(provider, "budget"):
+        status["budget"] = provider.budget()
+    if hasattr(provider, "status"):
+        status["routes"] = provider.status()
+    return status
+
+
+class RateLimitedProvider(AsyncWeatherProvider):
+    """
+    Провайдер за планировщиком запросов: ограничение частоты, дневная квота и повторы при 429/5xx.
+    Если внутренний провайдер умеет bulk-запросы, пачка до BULK_SIZE городов занимает один токен,
+    а из квоты списывается по запросу на город (так их считает weatherstack).
+    Без quota_store дневная квота считается в памяти процесса: каждый воркер и каждый перезапуск
+    начинают с полной квотой. Чтобы не превысить лимит платного тарифа, передайте общий
+    SqliteWeatherStore — счётчик хранится в нём под именем name.
+    """
+
+    def __init__(self, provider, settings: RateLimitSettings, quota_store=None, name: Optional[str] = None):
+        self.provider = as_async(provider)
+        self.settings = settings
+        self.scheduler = TokenBucketScheduler(settings.rate, settings.burst, settings.daily_quota,
+                                              quota_store, name or type(self.provider).__name__)
+        self.retries = 0
+
+    async def fetch_weather(self, city: str) -> WeatherData:
+        for attempt in range(self.settings.max_retries + 1):
+            await self.scheduler.acquire(request_priority.get())
+            try:
+                return await self.provider.fetch_weather(city)
+            except Exception as e:
+                delay = retry_delay(e, attempt, self.settings)
+                if delay is None or attempt == self.settings.max_retries:
+                    raise
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+                    self.scheduler.penalize(delay)
+                self.retries += 1
+                logger.info("Retrying %s in %.2f s after %r", city, delay, e)
+                await asyncio.sleep(delay)
+
+    async def fetch_weather_many(self, cities: Sequence[str],
+                                 concurrency: int = 10) -> List[Union[WeatherData, Exception]]:
+        if not getattr(self.provider, "bulk", False) or len(cities) < 2:
+            return await super().fetch_weather_many(cities, concurrency)
+
+        size = self.provider.BULK_SIZE
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_chunk(chunk: Sequence[str]) -> List[Union[WeatherData, Exception]]:
+            async with semaphore:
+                try:
+                    return await self._fetch_bulk(chunk)
+                except Exception as e:
+                    return [e] * len(chunk)
+
+        parts = await asyncio.gather(*(fetch_chunk(cities[i:i + size]) for i in range(0, len(cities), size)))
+        return [result for part in parts for result in part]
+
+    async def _fetch_bulk(self, chunk: Sequence[str]) -> List[Union[WeatherData, Exception]]:
+        """Один bulk-запрос; города с ошибками 429/5xx повторяются следующим bulk-запросом"""
+        results: List[Union[WeatherData, Exception]] = list(chunk)
+        pending = list(range(len(chunk)))
+        for attempt in range(self.settings.max_retries + 1):
+            await self.scheduler.acquire(request_priority.get(), quota_cost=len(pending))
+            fetched = await self.provider.fetch_weather_many([chunk[i] for i in pending], len(pending))
+            retry, delay = [], 0.0
+            for i, result in zip(pending, fetched):
+                results[i] = result
+                if isinstance(result, Exception) and attempt < self.settings.max_retries:
+                    result_delay = retry_delay(result, attempt, self.settings)
+                    if result_delay is not None:
+                        retry.append(i)
+                        delay = max(delay, result_delay)
+                        if isinstance(result, httpx.HTTPStatusError) and result.response.status_code == 429:
+                            self.scheduler.penalize(result_delay)
+            if not retry:
+                break
+            self.retries += 1
+            logger.info("Retrying %d cities in %.2f s", len(retry), delay)
+            await asyncio.sleep(delay)
+            pending = retry
+        return results
+
+    def budget(self) -> dict:
+        return {**self.scheduler.budget(), "retries": self.retries}
+
+    async def aclose(self) -> None:
+        await self.provider.aclose()
@@ -1,50 +1,65 @@
-import requests
+from typing import Optional
+
 from labs2.domain.entities.weather_data import WeatherData
-from labs2.domain.interfaces.weather_provider import WeatherProvider
+from labs2.domain.interfaces.weather_provider import AsyncWeatherProvider
+from labs2.infrastructure.providers.adapters import SyncProviderAdapter
+from labs2.infrastructure.providers.http_client import HttpClientSettings
+from labs2.infrastructure.providers.json_codec import intern_text, loads
+
+
+def parse_weatherapi(data: dict, city: str) -> WeatherData:
+    current = data.get("current") or {}
+    get = current.get
+    precip_mm = get("precip_mm")
+    snow_cm = get("snow_cm")
+
+    location = data.get("location") or {}
 
+    return WeatherData(
+        city=intern_text(location.get("name", city)),
+        temperature=get("temp_c"),
+        feels_like=get("feelslike_c"),
+        humidity=get("humidity"),
+        pressure=get("pressure_mb"),
+        wind_speed=get("wind_kph"),
+        wind_degree=get("wind_degree"),
+        wind_dir=intern_text(get("wind_dir")),
+        cloud=get("cloud"),
+        uv_index=get("uv"),
+        description=intern_text((get("condition") or {}).get("text", "")),
+        precip_mm=precip_mm,
+        rain_mm=precip_mm if precip_mm and precip_mm > 0 else None,
+        snow_cm=snow_cm if snow_cm and snow_cm > 0 else None,
+        is_day=bool(get("is_day", 1)),
+        sunrise=None,
+        sunset=None,
+        country=intern_text(location.get("country")),
+        lat=location.get("lat"),
+        lon=location.get("lon"),
+    )
 
-class WeatherAPIProvider(WeatherProvider):
+
+class AsyncWeatherAPIProvider(AsyncWeatherProvider):
     BASE_URL = "http://api.weatherapi.com/v1/current.json"
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, settings: Optional[HttpClientSettings] = None):
         self.api_key = api_key
+        self.client = (settings or HttpClientSettings.from_env()).build_async_client()
 
-    def fetch_weather(self, city: str) -> WeatherData:
+    async def fetch_weather(self, city: str) -> WeatherData:
         params = {
             "key": self.api_key,
             "q": city,
             "lang": "ru",
         }
-        resp = requests.get(self.BASE_URL, params=params, timeout=10)
+        resp = await self.client.get(self.BASE_URL, params=params)
         resp.raise_for_status()
-        data = resp.json()
-
-        current = data.get("current", {})
-        condition = current.get("condition", {})
-        location = data.get("location", {})
-
-        is_day = bool(current.get("is_day", 1))
-
-        wind_speed = current.get("wind_kph")
-        wind_degree = current.get("wind_degree")
-        wind_dir = current.get("wind_dir")
-
-        return WeatherData(
-            city=location.get("name", city),
-            temperature=current.get("temp_c"),
-            feels_like=current.get("feelslike_c"),
-            humidity=current.get("humidity"),
-            pressure=current.get("pressure_mb"),
-            wind_speed=wind_speed,
-            wind_degree=wind_degree,
-            wind_dir=wind_dir,
-            cloud=current.get("cloud"),
-            uv_index=current.get("uv"),
-            description=condition.get("text", ""),
-            precip_mm=current.get("precip_mm"),
-            rain_mm=current.get("precip_mm") if current.get("precip_mm", 0) > 0 else None,
-            snow_cm=current.get("snow_cm") if current.get("snow_cm", 0) > 0 else None,
-            is_day=is_day,
-            sunrise=None,
-            sunset=None
-        )
+        return parse_weatherapi(loads(resp.content), city)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class WeatherAPIProvider(SyncProviderAdapter):
+    def __init__(self, api_key: str, settings: Optional[HttpClientSettings] = None):
+        super().__init__(AsyncWeatherAPIProvider(api_key, settings))
@@ -1,51 +1,144 @@
-import requests
+import asyncio
+from typing import List, Optional, Sequence, Union
+
 from labs2.domain.entities.weather_data import WeatherData
-from labs2.domain.interfaces.weather_provider import WeatherProvider
+from labs2.domain.interfaces.weather_provider import AsyncWeatherProvider
+from labs2.infrastructure.providers.adapters import SyncProviderAdapter
+from labs2.infrastructure.providers.http_client import HttpClientSettings
+from labs2.infrastructure.providers.json_codec import intern_text, loads
+
+
+# 601 — пустой запрос, 615 — запрос не выполнен, как правило из-за неизвестного места
+QUERY_ERROR_CODES = frozenset({601, 615})
+
+
+class WeatherStackError(Exception):
+    """Ошибка, которую weatherstack возвращает в теле ответа с кодом 200"""
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+    @property
+    def is_query_error(self) -> bool:
+        """Ошибка в запросе (например, неизвестный город), а не сбой или ограничение тарифа"""
+        return self.code in QUERY_ERROR_CODES
+
+
+def check_weatherstack_error(data: dict) -> None:
+    if data.get("success") is False:
+        error = data.get("error", {})
+        raise WeatherStackError(f"{error.get('code')}: {error.get('info') or error.get('type')}", error.get("code"))
+
+
+def to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
 
+def parse_weatherstack(data: dict, city: str) -> WeatherData:
+    current = data.get("current") or {}
+    get = current.get
+    precip_mm = get("precip")
+    descriptions = get("weather_descriptions")
 
-class WeatherStackProvider(WeatherProvider):
+    location = data.get("location") or {}
+
+    return WeatherData(
+        city=intern_text(location.get("name", city)),
+        temperature=get("temperature"),
+        feels_like=get("feelslike"),
+        humidity=get("humidity"),
+        pressure=get("pressure"),
+        wind_speed=get("wind_speed"),
+        wind_degree=get("wind_degree"),
+        wind_dir=intern_text(get("wind_dir")),
+        cloud=get("cloudcover"),
+        uv_index=get("uv_index"),
+        description=intern_text(descriptions[0] if descriptions else ""),
+        precip_mm=precip_mm,
+        rain_mm=precip_mm if precip_mm and precip_mm > 0 else None,
+        snow_cm=None,
+        is_day=get("is_day") == "yes",
+        sunrise=None,
+        sunset=None,
+        country=intern_text(location.get("country")),
+        # weatherstack отдаёт координаты строками
+        lat=to_float(location.get("lat")),
+        lon=to_float(location.get("lon")),
+    )
+
+
+class AsyncWeatherStackProvider(AsyncWeatherProvider):
+    """
+    При bulk=True несколько городов запрашиваются одним запросом через query=A;B;C
+    (доступно на тарифах weatherstack с bulk-запросами), по BULK_SIZE городов за раз.
+    """
     BASE_URL = "http://api.weatherstack.com/current"
+    BULK_SIZE = 50
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, settings: Optional[HttpClientSettings] = None, bulk: bool = False):
         self.api_key = api_key
+        self.bulk = bulk
+        self.client = (settings or HttpClientSettings.from_env()).build_async_client()
 
-    def fetch_weather(self, city: str) -> WeatherData:
+    async def fetch_weather(self, city: str) -> WeatherData:
         params = {
             "access_key": self.api_key,
             "query": city,
             "units": "m",
         }
-        resp = requests.get(self.BASE_URL, params=params, timeout=10)
+        resp = await self.client.get(self.BASE_URL, params=params)
         resp.raise_for_status()
-        data = resp.json()
-
-        current = data.get("current", {})
-        location = data.get("location", {})
-
-        wind_speed = current.get("wind_speed")
-        wind_degree = current.get("wind_degree")
-        wind_dir = current.get("wind_dir")
-
-        precip_mm = current.get("precip")
-        rain_mm = precip_mm if precip_mm and precip_mm > 0 else None
-        snow_cm = None
-
-        return WeatherData(
-            city=location.get("name", city),
-            temperature=current.get("temperature"),
-            feels_like=current.get("feelslike"),
-            humidity=current.get("humidity"),
-            pressure=current.get("pressure"),
-            wind_speed=wind_speed,
-            wind_degree=wind_degree,
-            wind_dir=wind_dir,
-            cloud=current.get("cloudcover"),
-            uv_index=current.get("uv_index"),
-            description=current.get("weather_descriptions")[0] if current.get("weather_descriptions") else "",
-            precip_mm=precip_mm,
-            rain_mm=rain_mm,
-            snow_cm=snow_cm,
-            is_day=bool(current.get("is_day") == "yes"),
-            sunrise=None,
-            sunset=None
-        )
+        data = loads(resp.content)
+        check_weatherstack_error(data)
+        return parse_weatherstack(data, city)
+
+    async def fetch_weather_many(self, cities: Sequence[str],
+                                 concurrency: int = 10) -> List[Union[WeatherData, Exception]]:
+        if not self.bulk or len(cities) < 2:
+            return await super().fetch_weather_many(cities, concurrency)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        chunks = [cities[i:i + self.BULK_SIZE] for i in range(0, len(cities), self.BULK_SIZE)]
+
+        async def fetch_chunk(chunk: Sequence[str]) -> List[Union[WeatherData, Exception]]:
+            async with semaphore:
+                params = {
+                    "access_key": self.api_key,
+                    "query": ";".join(chunk),
+                    "units": "m",
+                }
+                try:
+                    resp = await self.client.get(self.BASE_URL, params=params)
+                    resp.raise_for_status()
+                    data = loads(resp.content)
+                    if isinstance(data, dict):
+                        check_weatherstack_error(data)
+                        data = [data]
+                    if len(data) != len(chunk):
+                        raise WeatherStackError(f"Bulk response has {len(data)} items for {len(chunk)} cities")
+                except Exception as e:
+                    return [e] * len(chunk)
+
+            results = []
+            for city, item in zip(chunk, data):
+                try:
+                    check_weatherstack_error(item)
+                    results.append(parse_weatherstack(item, city))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+        parts = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+        return [result for part in parts for result in part]
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class WeatherStackProvider(SyncProviderAdapter):
+    def __init__(self, api_key: str, settings: Optional[HttpClientSettings] = None, bulk: bool = False):
+        super().__init__(AsyncWeatherStackProvider(api_key, settings, bulk))
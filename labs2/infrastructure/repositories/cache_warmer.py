@@ -0,0 +1,172 @@
+import asyncio
+import heapq
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from labs2.domain.entities.weather_result import WeatherResult
+from labs2.infrastructure.providers.adapters import background_loop
+from labs2.infrastructure.providers.rate_limiter import BATCH, request_priority
+
+logger = logging.getLogger(__name__)
+
+
+class AccessTracker:
+    """Частота обращений к ключам с экспоненциальным затуханием (вес обращения падает вдвое за half_life)"""
+
+    def __init__(self, half_life: float = 600.0, max_keys: int = 10_000):
+        self.half_life = half_life
+        self.max_keys = max_keys
+        # ключ -> (оценка на момент updated, updated, исходное название города)
+        self._scores: Dict[str, Tuple[float, float, str]] = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, score: float, updated: float, now: float) -> float:
+        return score * 0.5 ** ((now - updated) / self.half_life)
+
+    def record(self, key: str, city: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._scores.get(key)
+            score = self._decayed(entry[0], entry[1], now) if entry else 0.0
+            self._scores[key] = (score + 1.0, now, city)
+            if len(self._scores) > self.max_keys:
+                self._drop_coldest(now)
+
+    def _drop_coldest(self, now: float) -> None:
+        keep = heapq.nlargest(self.max_keys // 2, self._scores.items(),
+                              key=lambda item: self._decayed(item[1][0], item[1][1], now))
+        self._scores = dict(keep)
+
+    def top(self, n: int, min_score: float = 0.0) -> List[Tuple[str, str]]:
+        """
+        n самых востребованных ключей с оценкой не ниже min_score: (ключ, город).
+        Остывшие ниже min_score ключи забываются.
+        """
+        now = time.monotonic()
+        with self._lock:
+            scored = {key: self._decayed(score, updated, now) for key, (score, updated, _) in self._scores.items()}
+            for key, score in scored.items():
+                if score < min_score:
+                    del self._scores[key]
+            hottest = heapq.nlargest(n, self._scores, key=scored.__getitem__)
+        return [(key, self._scores[key][2]) for key in hottest]
+
+
+class CacheWarmer:
+    """
+    Прогрев кэша: при старте загружает список городов, затем каждые interval секунд
+    обновляет записи, которым до истечения осталось не больше refresh_ahead секунд,
+    чтобы пользователи не попадали на промах после истечения TTL.
+    Обновляются города из списка прогрева и не больше top_n популярных ключей с оценкой
+    не ниже min_score, у которых есть запись в кэше. После неудачной загрузки ключ
+    пропускается с экспоненциально растущей паузой (до max_backoff секунд).
+    """
+
+    def __init__(self, repository, top_n: int = 50, refresh_ahead: float = 15.0, interval: float = 5.0,
+                 concurrency: int = 5, min_score: float = 2.0, max_backoff: float = 600.0):
+        self.repository = repository
+        self.top_n = top_n
+        self.refresh_ahead = refresh_ahead
+        self.interval = interval
+        self.concurrency = concurrency
+        self.min_score = min_score
+        self.max_backoff = max_backoff
+        self.warm_cities: List[str] = []
+        # ключ -> (число неудач подряд, время, раньше которого не повторять)
+        self._failures: Dict[str, Tuple[int, float]] = {}
+        self._task = None
+
+    @staticmethod
+    def cities_from_env() -> List[str]:
+        """Города из WEATHER_WARM_CITIES (через запятую) и файла WEATHER_WARM_FILE (по одному в строке)"""
+        cities = [c.strip() for c in os.getenv("WEATHER_WARM_CITIES", "").split(",") if c.strip()]
+        path = os.getenv("WEATHER_WARM_FILE")
+        if path:
+            with open(path, encoding="utf-8") as f:
+                cities += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        return cities
+
+    def _backing_off(self, key: str, now: float) -> bool:
+        failure = self._failures.get(key)
+        return failure is not None and now < failure[1]
+
+    def _record_result(self, key: str, ok: bool) -> None:
+        if ok:
+            self._failures.pop(key, None)
+            return
+        count = self._failures.get(key, (0, 0.0))[0] + 1
+        delay = min(self.interval * 2 ** count, self.max_backoff)
+        self._failures[key] = (count, time.monotonic() + delay)
+
+    async def warm_up(self, cities: Iterable[str]) -> List[WeatherResult]:
+        request_priority.set(BATCH)
+        cities = list(cities)
+        keys = [self.repository.cache_key(city) for city in cities]
+        results = await self.repository.aget_weather_many(cities)
+        for key, result in zip(keys, results):
+            self._record_result(key, result.ok)
+        failed = [r.city for r in results if not r.ok]
+        logger.info("Cache warm-up: %d cities loaded, %d failed", len(results) - len(failed), len(failed))
+        return results
+
+    def _due(self) -> Dict[str, str]:
+        """Ключи, которые пора обновить: ключ -> город"""
+        now = time.monotonic()
+        due = {}
+        for city in self.warm_cities:
+            key = self.repository.cache_key(city)
+            remaining = self.repository.expires_in(key)
+            if remaining is None or remaining <= self.refresh_ahead:
+                due[key] = city
+        for key, city in self.repository.access.top(self.top_n, self.min_score):
+            # Ключ без записи в кэше либо ещё не загружался, либо не загрузился — такие не обновляем
+            remaining = self.repository.expires_in(key)
+            if remaining is not None and remaining <= self.refresh_ahead:
+                due.setdefault(key, city)
+        return {key: city for key, city in due.items()
+                if not self.repository.in_flight(key) and not self._backing_off(key, now)}
+
+    async def refresh_hot(self) -> int:
+        """Обновляет истекающие ключи и возвращает их число"""
+        due = self._due()
+        if not due:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(key: str, city: str) -> None:
+            async with semaphore:
+                try:
+                    await self.repository.refresh(key, city, self.refresh_ahead)
+                except Exception as e:
+                    logger.warning("Failed to refresh %s: %r", city, e)
+                    self._record_result(key, False)
+                else:
+                    self._record_result(key, True)
+
+        await asyncio.gather(*(refresh(key, city) for key, city in due.items()))
+        return len(due)
+
+    async def run(self, warm_cities: Iterable[str] = ()) -> None:
+        self.warm_cities = list(warm_cities)
+        if self.warm_cities:
+            await self.warm_up(self.warm_cities)
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh_hot()
+            except Exception:
+                logger.exception("Cache refresh failed")
+
+    def start(self, warm_cities: Iterable[str] = ()) -> None:
+        """Запускает прогрев и обновление на фоновом loop провайдеров"""
+        if self._task is None:
+            self._task = background_loop.submit(self.run(warm_cities))
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -1,28 +1,235 @@
-import time
-from typing import Dict, Tuple
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
 
 from labs2.domain.entities.weather_data import WeatherData
+from labs2.domain.entities.weather_result import WeatherResult
 from labs2.domain.interfaces.weather_provider import WeatherProvider
 from labs2.domain.interfaces.weather_repository import WeatherRepository
+from labs2.infrastructure.history.weather_history import WeatherHistory
+from labs2.infrastructure.providers.adapters import as_async, background_loop
+from labs2.infrastructure.providers.rate_limiter import BACKGROUND, request_priority
+from labs2.infrastructure.repositories.cache_warmer import AccessTracker
+from labs2.infrastructure.repositories.location_index import LocationIndex, normalize_city
+from labs2.infrastructure.repositories.single_flight import SingleFlight
+from labs2.infrastructure.repositories.sqlite_weather_store import SqliteWeatherStore
+from labs2.infrastructure.repositories.ttl_cache import CacheStats, TTLCache
+
+logger = logging.getLogger(__name__)
 
 
 class CachedWeatherRepository(WeatherRepository):
-    def __init__(self, provider: WeatherProvider, ttl_seconds: int = 60):
+    """
+    Кэш погоды с TTL. Одновременные промахи по одному городу объединяются в один запрос
+    к провайдеру; репозиторий можно вызывать из нескольких потоков и из корутин.
+    Кэш ограничен max_entries записями (вытесняются давно не использованные).
+    Устаревшие не более чем на stale_seconds данные отдаются сразу, а обновляются в фоне.
+    При промахе сначала проверяется постоянный кэш store (если задан), затем провайдер.
+    Каждый ответ провайдера записывается в history, если она задана.
+    Ключ кэша — канонический id места из индекса locations: после первой загрузки
+    "Москва", "Moscow" и "moskva" попадают в одну запись. В постоянный кэш ответ пишется
+    и под запросом, чтобы его находили процессы, ещё не знающие id места.
+    """
+
+    def __init__(self, provider: WeatherProvider, ttl_seconds: int = 60, max_concurrency: int = 10,
+                 max_entries: int = 1024, stale_seconds: float = 0,
+                 store: Optional[SqliteWeatherStore] = None, history: Optional[WeatherHistory] = None,
+                 locations: Optional[LocationIndex] = None):
         self.provider = provider
         self.ttl_seconds = ttl_seconds
-        self._cache: Dict[str, Tuple[WeatherData, float]] = {}
+        self.max_concurrency = max_concurrency
+        self.store = store
+        self.history = history
+        self.locations = locations if locations is not None else LocationIndex()
+        if history is not None and history.key_for is None:
+            history.key_for = self.locations.key_for
+        self._cache: TTLCache[WeatherData] = TTLCache(max_entries, ttl_seconds, stale_seconds)
+        self._flights = SingleFlight()
+        self.access = AccessTracker()
+
+    def cache_key(self, city: str) -> str:
+        return self.locations.key_for(city)
+
+    def _cached(self, key: str, city: str) -> Optional[WeatherData]:
+        """Данные из кэша; для устаревших запускает фоновое обновление"""
+        self.access.record(key, city)
+        found = self._cache.get(key)
+        if found is None:
+            logger.debug("Cache miss for %s", key)
+            return None
+        data, fresh = found
+        if not fresh and key not in self._flights:
+            logger.debug("Serving stale data for %s, refreshing", key)
+            background_loop.submit(self.refresh(key, city))
+        return data
+
+    async def refresh(self, key: str, city: str, min_remaining: float = 0.0) -> WeatherData:
+        """
+        Фоновое обновление записи, если до её истечения осталось не больше min_remaining секунд.
+        Уступает провайдера запросам пользователей.
+        """
+        request_priority.set(BACKGROUND)
+        # Ключ мог быть записан до того, как стал известен канонический id города
+        key = self.cache_key(city)
+        return await self._flights.do_async(key, lambda: self._afetch(key, city, min_remaining))
+
+    def expires_in(self, key: str) -> Optional[float]:
+        """Секунд до истечения записи (отрицательное — уже устарела) или None, если её нет"""
+        found = self._cache.peek(key)
+        return self.ttl_seconds - found[1] if found is not None else None
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._flights
+
+    def _fresh(self, key: str, min_remaining: float = 0.0) -> Optional[WeatherData]:
+        found = self._cache.peek(key)
+        if found is not None and self.ttl_seconds - found[1] > min_remaining:
+            return found[0]
+        return None
+
+    def _restore(self, key: str, city: str, data: WeatherData, age: float) -> None:
+        """Запись из постоянного кэша: учит псевдоним и кладёт в кэш под id места"""
+        self._cache.set(self.locations.learn(normalize_city(city), data) or key, data, age=age)
+
+    def _remember(self, key: str, city: str, data: WeatherData) -> Dict[str, WeatherData]:
+        """
+        Свежий ответ провайдера: запоминает псевдоним, кладёт в кэш и в историю.
+        Возвращает строки для постоянного кэша: под id места, ключом запроса и самим запросом.
+        Под названием из ответа строка не пишется: у разных мест оно может совпадать.
+        """
+        normalized = normalize_city(city)
+        canonical = self.locations.learn(normalized, data) or key
+        self._cache.set(canonical, data)
+        if self.history is not None:
+            self.history.record(canonical, data)
+        return dict.fromkeys((canonical, key, normalized), data)
+
+    def stats(self) -> CacheStats:
+        return self._cache.stats()
 
-    def _is_valid(self, timestamp: float) -> bool:
-        return (time.time() - timestamp) < self.ttl_seconds
+    def purge_expired(self) -> None:
+        self._cache.purge_expired()
 
     def get_weather(self, city: str) -> WeatherData:
-        key = city.lower()
-        if key in self._cache:
-            data, ts = self._cache[key]
-            if self._is_valid(ts):
-                print("Using cached data")
-                return data
-        print("Fetching cached data")
+        key = self.cache_key(city)
+        data = self._cached(key, city)
+        if data is not None:
+            return data
+        return self._flights.do(key, lambda: self._fetch(key, city))
+
+    def _fetch(self, key: str, city: str) -> WeatherData:
+        # Пока мы ждали очереди, предыдущая загрузка могла уже положить данные в кэш
+        data = self._fresh(key)
+        if data is not None:
+            return data
+        stored = self.store.get(key) if self.store else None
+        if stored is not None:
+            self._restore(key, city, *stored)
+            return stored[0]
         data = self.provider.fetch_weather(city)
-        self._cache[key] = (data, time.time())
+        rows = self._remember(key, city, data)
+        if self.store:
+            self.store.set_many(rows)
+        return data
+
+    async def _afetch(self, key: str, city: str, min_remaining: float = 0.0) -> WeatherData:
+        data = self._fresh(key, min_remaining)
+        if data is not None:
+            return data
+        stored = await asyncio.to_thread(self.store.get, key) if self.store else None
+        if stored is not None and self.ttl_seconds - stored[1] > min_remaining:
+            self._restore(key, city, *stored)
+            return stored[0]
+        data = await as_async(self.provider).fetch_weather(city)
+        rows = self._remember(key, city, data)
+        if self.store:
+            await asyncio.to_thread(self.store.set_many, rows)
         return data
+
+    def get_cached(self, city: str) -> Optional[WeatherData]:
+        """
+        Данные из кэша без запроса к провайдеру. Промах не учитывается в статистике:
+        за ним обычно следует get_weather, который и посчитает его.
+        """
+        key = self.cache_key(city)
+        found = self._cache.peek(key)
+        if found is None or found[1] >= self.ttl_seconds + self._cache.stale_seconds:
+            return None
+        return self._cached(key, city)
+
+    async def aget_weather(self, city: str) -> WeatherData:
+        key = self.cache_key(city)
+        data = self._cached(key, city)
+        if data is not None:
+            return data
+        return await self._flights.do_async(key, lambda: self._afetch(key, city))
+
+    def get_weather_many(self, cities: Iterable[str]) -> List[WeatherResult]:
+        return background_loop.run(self.aget_weather_many(cities))
+
+    async def aget_weather_many(self, cities: Iterable[str]) -> List[WeatherResult]:
+        cities = list(cities)
+        # Ключи считаются один раз: загрузка может выучить псевдоним и поменять результат cache_key
+        keys = [self.cache_key(city) for city in cities]
+        found: Dict[str, WeatherResult] = {}
+        owned: Dict[str, str] = {}
+        waiting = {}
+        for key, city in zip(keys, cities):
+            if key in found or key in owned or key in waiting:
+                continue
+            data = self._cached(key, city)
+            if data is not None:
+                found[key] = WeatherResult(city, data=data)
+                continue
+            future, leader = self._flights.claim(key)
+            if leader:
+                owned[key] = city
+            else:
+                waiting[key] = (city, future)
+
+        if owned:
+            try:
+                fetched = await self._fetch_owned(owned)
+            except BaseException as e:
+                for key in owned:
+                    self._flights.resolve(key, error=e)
+                raise
+            for key, city in owned.items():
+                result = fetched[key]
+                if isinstance(result, BaseException):
+                    found[key] = WeatherResult(city, error=result)
+                    self._flights.resolve(key, error=result)
+                else:
+                    found[key] = WeatherResult(city, data=result)
+                    self._flights.resolve(key, result)
+
+        for key, (city, future) in waiting.items():
+            try:
+                found[key] = WeatherResult(city, data=await asyncio.wrap_future(future))
+            except Exception as e:
+                found[key] = WeatherResult(city, error=e)
+
+        results = []
+        for key, city in zip(keys, cities):
+            result = found[key]
+            results.append(WeatherResult(city, data=result.data, error=result.error))
+        return results
+
+    async def _fetch_owned(self, owned: Dict[str, str]) -> Dict[str, object]:
+        """Загружает ключи из постоянного кэша или у провайдера и кладёт в кэши"""
+        results: Dict[str, object] = {}
+        if self.store:
+            for key, (data, age) in (await asyncio.to_thread(self.store.get_many, owned)).items():
+                self._restore(key, owned[key], data, age)
+                results[key] = data
+        missing = {key: city for key, city in owned.items() if key not in results}
+        if missing:
+            fetched = await as_async(self.provider).fetch_weather_many(list(missing.values()), self.max_concurrency)
+            loaded = {}
+            for key, result in zip(missing, fetched):
+                results[key] = result
+                if not isinstance(result, BaseException):
+                    loaded.update(self._remember(key, missing[key], result))
+            if self.store and loaded:
+                await asyncio.to_thread(self.store.set_many, loaded)
+        return results
@@ -0,0 +1,223 @@
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from labs2.domain.entities.weather_data import WeatherData
+
+logger = logging.getLogger(__name__)
+
+_SEPARATORS = re.compile(r"[\s\-_,.'’]+")
+_END = ""  # ключ конца слова в узле trie; символы слов всегда длины 1
+
+
+def normalize_city(query: str) -> str:
+    """
+    Ключ запроса: регистр, пробелы, дефисы и латинские диакритики не важны
+    ("Sao-Paulo " и "São Paulo" совпадают), кириллица остаётся как есть (й и ё не теряются).
+    """
+    decomposed = unicodedata.normalize("NFKD", query.casefold())
+    chars = []
+    for ch in decomposed:
+        if unicodedata.combining(ch) and chars and chars[-1].isascii():
+            continue
+        chars.append(ch)
+    text = unicodedata.normalize("NFC", "".join(chars))
+    return _SEPARATORS.sub(" ", text).strip()
+
+
+def location_id(data: WeatherData) -> Optional[str]:
+    """Канонический идентификатор места по координатам из ответа провайдера (~1 км)"""
+    if data.lat is None or data.lon is None:
+        return None
+    return f"geo:{data.lat:.2f},{data.lon:.2f}"
+
+
+class PrefixTrie:
+    """Trie по символам: точный поиск и перебор слов с заданным префиксом"""
+
+    def __init__(self):
+        self._root: dict = {}
+        self._size = 0
+
+    def insert(self, word: str, value) -> None:
+        node = self._root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        if _END not in node:
+            self._size += 1
+        node[_END] = value
+
+    def _node(self, prefix: str) -> Optional[dict]:
+        node = self._root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def get(self, word: str):
+        node = self._node(word)
+        return node.get(_END) if node is not None else None
+
+    def with_prefix(self, prefix: str, limit: int = 10) -> List[Tuple[str, object]]:
+        node = self._node(prefix)
+        if node is None:
+            return []
+        found = []
+        stack = [(prefix, node)]
+        while stack and len(found) < limit:
+            word, node = stack.pop()
+            if _END in node:
+                found.append((word, node[_END]))
+            # В обратном порядке, чтобы короткие и алфавитно первые слова шли раньше
+            for ch in sorted((c for c in node if c != _END), reverse=True):
+                stack.append((word + ch, node[ch]))
+        return found
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class LocationIndex:
+    """
+    Индекс псевдонимов городов: нормализованный запрос -> канонический id места.
+    Пополняется после каждой успешной загрузки, так что "Москва", "Moscow" и "moskva"
+    делят одну запись кэша. Если задан path, индекс хранится в JSON-файле: новые псевдонимы
+    сбрасываются на диск не чаще раза в save_delay секунд, а при промахе файл перечитывается
+    (не чаще раза в reload_interval секунд), если его обновил другой процесс.
+    """
+
+    def __init__(self, path: Optional[str] = None, save_delay: float = 2.0, reload_interval: float = 5.0):
+        self.path = path
+        self.save_delay = save_delay
+        self.reload_interval = reload_interval
+        self._aliases = PrefixTrie()
+        self._names: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        self._loaded_mtime: Optional[float] = None
+        self._next_reload = 0.0
+        if path:
+            self._load()
+            atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls) -> "LocationIndex":
+        return cls(os.getenv("WEATHER_ALIAS_FILE"))
+
+    def _load(self) -> None:
+        """Добавляет записи из файла; псевдонимы, выученные этим процессом, не перезаписываются"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable alias index %s: %r", self.path, e)
+            return
+        self._loaded_mtime = mtime
+        for loc_id, name in saved.get("locations", {}).items():
+            self._names.setdefault(loc_id, name)
+        for alias, loc_id in saved.get("aliases", {}).items():
+            if self._aliases.get(alias) is None:
+                self._aliases.insert(alias, loc_id)
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if not self.path or now < self._next_reload:
+            return
+        self._next_reload = now + self.reload_interval
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime != self._loaded_mtime:
+            self._load()
+
+    def flush(self) -> None:
+        """Записывает новые псевдонимы в файл, добавив к ним сохранённые другими процессами"""
+        with self._save_lock:
+            with self._lock:
+                self._save_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                self._load()
+                aliases = dict(self._aliases.with_prefix("", limit=len(self._aliases)))
+                names = dict(self._names)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"locations": names, "aliases": aliases}, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._loaded_mtime = os.stat(self.path).st_mtime
+            except OSError as e:
+                logger.warning("Failed to save alias index %s: %r", self.path, e)
+
+    def _schedule_save(self) -> None:
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def resolve(self, normalized: str) -> Optional[str]:
+        with self._lock:
+            loc_id = self._aliases.get(normalized)
+            if loc_id is None and self.path:
+                self._maybe_reload()
+                loc_id = self._aliases.get(normalized)
+            return loc_id
+
+    def key_for(self, city: str) -> str:
+        """Ключ города: канонический id места, а для ещё не встречавшихся — нормализованный запрос"""
+        normalized = normalize_city(city)
+        return self.resolve(normalized) or normalized
+
+    def learn(self, normalized: str, data: WeatherData) -> Optional[str]:
+        """
+        Запоминает, что запрос указывает на это место; возвращает его id. Название из ответа
+        становится псевдонимом, только если оно ещё не занято другим местом: "Paris, Texas"
+        отвечает как "Paris", и "paris" не должен переехать из Франции в Техас.
+        """
+        loc_id = location_id(data)
+        if loc_id is None:
+            return None
+        with self._lock:
+            changed = False
+            if normalized and self._aliases.get(normalized) != loc_id:
+                self._aliases.insert(normalized, loc_id)
+                changed = True
+            name = normalize_city(data.city)
+            if name and self._aliases.get(name) is None:
+                self._aliases.insert(name, loc_id)
+                changed = True
+            if self._names.get(loc_id) != data.city:
+                self._names[loc_id] = data.city
+                changed = True
+            if changed and self.path:
+                self._schedule_save()
+        return loc_id
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """Названия известных мест, у которых какой-нибудь псевдоним начинается с prefix"""
+        with self._lock:
+            matches = self._aliases.with_prefix(normalize_city(prefix), limit * 4)
+            names = []
+            for _, loc_id in matches:
+                name = self._names.get(loc_id)
+                if name and name not in names:
+                    names.append(name)
+            return names[:limit]
+
+    def __len__(self) -> int:
+        return len(self._aliases)
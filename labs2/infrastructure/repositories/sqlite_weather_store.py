@@ -0,0 +1,139 @@
+import logging
+import marshal
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import fields
+from typing import Dict, Iterable, Optional, Tuple
+
+from labs2.domain.entities.weather_data import WeatherData
+
+logger = logging.getLogger(__name__)
+
+# Меняется при изменении состава полей WeatherData: старые записи считаются промахом
+FORMAT_VERSION = 2
+FIELD_NAMES = tuple(f.name for f in fields(WeatherData))
+FIELD_COUNT = len(FIELD_NAMES)
+
+
+def encode_weather(data: WeatherData) -> bytes:
+    return marshal.dumps(tuple(getattr(data, name) for name in FIELD_NAMES))
+
+
+def decode_weather(blob: bytes) -> WeatherData:
+    values = marshal.loads(blob)
+    if len(values) != FIELD_COUNT:
+        raise ValueError("WeatherData layout changed")
+    return WeatherData(*values)
+
+
+class SqliteWeatherStore:
+    """
+    Постоянный кэш погоды в SQLite (L2 за кэшем в памяти). Режим WAL позволяет нескольким
+    процессам читать параллельно с записью, так что воркеры и перезапуски используют
+    загрузки друг друга. Время записи хранится в секундах Unix, общих для всех процессов.
+    Здесь же хранятся дневные счётчики запросов к провайдерам, общие для всех процессов.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, purge_interval: float = 600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._last_purge = 0.0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS weather_cache ("
+                "key TEXT PRIMARY KEY, version INTEGER NOT NULL, data BLOB NOT NULL, stored_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS provider_quota ("
+                "name TEXT NOT NULL, day TEXT NOT NULL, used INTEGER NOT NULL, PRIMARY KEY (name, day))"
+            )
+
+    @classmethod
+    def from_env(cls, ttl_seconds: float) -> Optional["SqliteWeatherStore"]:
+        path = os.getenv("WEATHER_CACHE_DB")
+        return cls(path, ttl_seconds) if path else None
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[WeatherData, float]]:
+        """Свежие записи по ключам: данные и их возраст в секундах"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ",".join("?" * len(keys))
+        rows = self._connection().execute(
+            f"SELECT key, version, data, stored_at FROM weather_cache WHERE key IN ({placeholders}) AND stored_at > ?",
+            (*keys, now - self.ttl_seconds),
+        ).fetchall()
+        found = {}
+        for key, version, blob, stored_at in rows:
+            if version != FORMAT_VERSION:
+                continue
+            try:
+                found[key] = (decode_weather(blob), max(now - stored_at, 0.0))
+            except (ValueError, EOFError, TypeError):
+                logger.warning("Dropping undecodable cache entry %s", key)
+        return found
+
+    def get(self, key: str) -> Optional[Tuple[WeatherData, float]]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: Dict[str, WeatherData]) -> None:
+        if not items:
+            return
+        now = time.time()
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO weather_cache (key, version, data, stored_at) VALUES (?, ?, ?, ?)",
+            [(key, FORMAT_VERSION, encode_weather(data), now) for key, data in items.items()],
+        )
+        if now - self._last_purge >= self.purge_interval:
+            self._last_purge = now
+            conn.execute("DELETE FROM weather_cache WHERE stored_at <= ?", (now - self.ttl_seconds,))
+
+    def set(self, key: str, data: WeatherData) -> None:
+        self.set_many({key: data})
+
+    def reserve_quota(self, name: str, day: str, cost: int, limit: int) -> Optional[int]:
+        """
+        Списывает cost запросов из дневной квоты провайдера name. Возвращает, сколько
+        израсходовано за day вместе с этим списанием, или None, если квота исчерпана.
+        """
+        conn = self._connection()
+        # BEGIN IMMEDIATE сразу берёт блокировку записи: проверка и списание атомарны между процессами
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT used FROM provider_quota WHERE name = ? AND day = ?", (name, day)).fetchone()
+            used = row[0] if row else 0
+            if used + cost > limit:
+                conn.execute("ROLLBACK")
+                return None
+            if row is None:
+                conn.execute("DELETE FROM provider_quota WHERE name = ? AND day < ?", (name, day))
+            conn.execute(
+                "INSERT INTO provider_quota (name, day, used) VALUES (?, ?, ?) "
+                "ON CONFLICT (name, day) DO UPDATE SET used = used + excluded.used",
+                (name, day, cost),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return used + cost
+
+    def release_quota(self, name: str, day: str, cost: int) -> None:
+        """Возвращает в квоту списание запроса, который так и не был отправлен"""
+        self._connection().execute(
+            "UPDATE provider_quota SET used = MAX(used - ?, 0) WHERE name = ? AND day = ?", (cost, name, day))
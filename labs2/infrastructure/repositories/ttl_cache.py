@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    stale_hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / total if total else 0.0
+
+
+class TTLCache(Generic[V]):
+    """
+    Потокобезопасный LRU-кэш с TTL. Запись старше ttl, но моложе ttl + stale_seconds,
+    ещё отдаётся как устаревшая; более старые записи удаляются при обращении
+    и периодической чистке не чаще раза в purge_interval секунд.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60, stale_seconds: float = 0,
+                 purge_interval: float = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.purge_interval = purge_interval
+        self._data: "OrderedDict[Hashable, Tuple[V, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_purge = time.monotonic()
+        self._hits = self._stale_hits = self._misses = self._evictions = self._expirations = 0
+
+    def _lookup(self, key: Hashable, now: float) -> Optional[Tuple[V, bool]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        age = now - stored_at
+        if age >= self.ttl_seconds + self.stale_seconds:
+            del self._data[key]
+            self._expirations += 1
+            return None
+        self._data.move_to_end(key)
+        return value, age < self.ttl_seconds
+
+    def get(self, key: Hashable) -> Optional[Tuple[V, bool]]:
+        """(значение, свежее ли оно) или None при промахе"""
+        with self._lock:
+            found = self._lookup(key, time.monotonic())
+            if found is None:
+                self._misses += 1
+            elif found[1]:
+                self._hits += 1
+            else:
+                self._stale_hits += 1
+            return found
+
+    def peek(self, key: Hashable) -> Optional[Tuple[V, float]]:
+        """(значение, возраст в секундах) без учёта в статистике и в порядке LRU"""
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None:
+            return None
+        return entry[0], time.monotonic() - entry[1]
+
+    def set(self, key: Hashable, value: V, age: float = 0.0) -> None:
+        """Сохраняет значение; age — сколько секунд назад оно было получено"""
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (value, now - age)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._evictions += 1
+            if now - self._last_purge >= self.purge_interval:
+                self._purge(now)
+
+    def _purge(self, now: float) -> None:
+        self._last_purge = now
+        limit = self.ttl_seconds + self.stale_seconds
+        expired = [key for key, (_, stored_at) in self._data.items() if now - stored_at >= limit]
+        for key in expired:
+            del self._data[key]
+        self._expirations += len(expired)
+
+    def purge_expired(self) -> None:
+        with self._lock:
+            self._purge(time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._stale_hits, self._misses, self._evictions,
+                              self._expirations, len(self._data))
@@ -4,23 +4,35 @@ from enum import Enum
 from dotenv import load_dotenv
 
 from application.weather_service import WeatherService
+from infrastructure.history.weather_history import WeatherHistory
 from infrastructure.providers.fake_provider import FakeWeatherProvider
+from infrastructure.repositories.cache_warmer import CacheWarmer
 from infrastructure.repositories.cached_weather_repository import CachedWeatherRepository
+from infrastructure.repositories.location_index import LocationIndex
+from infrastructure.repositories.sqlite_weather_store import SqliteWeatherStore
+from labs2.infrastructure.providers.adapters import SyncProviderAdapter
+from labs2.infrastructure.providers.racing_provider import RacingWeatherProvider
+from labs2.infrastructure.providers.rate_limiter import RateLimitedProvider, RateLimitSettings
 from labs2.infrastructure.providers.weatherapi_provider import WeatherAPIProvider
 from labs2.infrastructure.providers.weatherstack_provider import WeatherStackProvider
 from labs2.presentation.qt_ui import WeatherApp
 from presentation.console_ui import ConsoleUI
+from presentation.http_api import WeatherHttpAPI
 
 PROVIDERS_CONFIG = {
     "weatherapi": {
         "env": "WEATHERAPI_KEY",
         "cls": WeatherAPIProvider,
         "emoji": "🌦️",
+        "rate_limit": RateLimitSettings(rate=10, burst=20, daily_quota=30_000),
     },
     "weatherstack": {
         "env": "WEATHERSTACK_API_KEY",
         "cls": WeatherStackProvider,
         "emoji": "🌤️",
+        "rate_limit": RateLimitSettings(rate=1, burst=5, daily_quota=1_000),
+        # bulk-запросы (query=A;B;C) есть только на платных тарифах
+        "bulk_env": "WEATHERSTACK_BULK",
     },
 }
 
@@ -28,23 +40,46 @@ PROVIDERS_CONFIG = {
 class WeatherProviderEnum(str, Enum):
     WEATHERAPI = "weatherapi"
     WEATHERSTACK = "weatherstack"
+    RACE = "race"
 
 
 class UIEnum(Enum):
     QT = ("qt", WeatherApp)
     CONSOLE = ("console", ConsoleUI)
+    HTTP = ("http", WeatherHttpAPI)
 
     def __init__(self, label, ui_class):
         self.label = label
         self.ui_class = ui_class
 
 
+def build_provider(name: str, config: dict, api_key: str, store=None):
+    """
+    Провайдер из PROVIDERS_CONFIG за планировщиком запросов с его лимитами.
+    Дневная квота считается в store, если он задан, иначе — в памяти процесса.
+    """
+    options = {}
+    if config.get("bulk_env"):
+        options["bulk"] = os.getenv(config["bulk_env"], "false").lower() in ("1", "true", "yes", "on")
+    provider = config["cls"](api_key=api_key, **options)
+    return SyncProviderAdapter(RateLimitedProvider(provider, config["rate_limit"], quota_store=store, name=name))
+
+
 def build_app(provider_name: WeatherProviderEnum = WeatherProviderEnum.WEATHERAPI,
               ui_type: UIEnum = UIEnum.CONSOLE,
               use_fake: bool = False):
 
+    store = SqliteWeatherStore.from_env(ttl_seconds=120)
     if use_fake:
         provider = FakeWeatherProvider()
+    elif provider_name == WeatherProviderEnum.RACE:
+        configured = {name: config for name, config in PROVIDERS_CONFIG.items() if os.getenv(config["env"])}
+        if not configured:
+            raise RuntimeError("No provider API keys set in environment. See .env.example")
+        provider = RacingWeatherProvider(
+            [build_provider(name, config, os.getenv(config["env"]), store) for name, config in configured.items()],
+            names=list(configured),
+        )
     else:
         config = PROVIDERS_CONFIG.get(provider_name.value)
         if not config:
@@ -54,10 +89,19 @@ def build_app(provider_name: WeatherProviderEnum = WeatherProviderEnum.WEATHERAP
         if not api_key:
             raise RuntimeError(f"{config['env']} not set in environment. See .env.example")
 
-        provider = config["cls"](api_key=api_key)
+        provider = build_provider(provider_name.value, config, api_key, store)
 
-    repository = CachedWeatherRepository(provider=provider, ttl_seconds=120)
-    service = WeatherService(repository=repository)
+    repository = CachedWeatherRepository(
+        provider=provider,
+        ttl_seconds=120,
+        max_entries=1000,
+        stale_seconds=60,
+        store=store,
+        history=WeatherHistory(),
+        locations=LocationIndex.from_env(),
+    )
+    CacheWarmer(repository).start(CacheWarmer.cities_from_env())
+    service = WeatherService(repository=repository, locale=os.getenv("WEATHER_LOCALE", "ru"))
 
     ui_class = ui_type.ui_class
     return ui_class(service=service)
@@ -0,0 +1,133 @@
+import asyncio
+import dataclasses
+import os
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from labs2.application.summary_templates import SUMMARY_TEMPLATES
+from labs2.domain.entities.weather_result import WeatherResult
+from labs2.domain.interfaces.weather_ui import WeatherUI
+from labs2.infrastructure.providers.adapters import background_loop
+from labs2.infrastructure.providers.racing_provider import is_client_error
+from labs2.infrastructure.providers.rate_limiter import provider_status
+
+MAX_BATCH_CITIES = 500
+
+
+class MicroBatcher:
+    """
+    Собирает одиночные запросы, пришедшие почти одновременно, в один пакетный:
+    пакет уходит, когда набралось max_batch городов или прошло max_wait секунд с первого.
+    """
+
+    def __init__(self, fetch_many: Callable[[List[str]], Awaitable[List[WeatherResult]]],
+                 max_batch: int = 50, max_wait: float = 0.01):
+        self.fetch_many = fetch_many
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def submit(self, city: str) -> WeatherResult:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((city, future))
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queue = self._queue, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            results = await self.fetch_many([city for city, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class BatchRequest(BaseModel):
+    cities: List[str] = Field(min_length=1, max_length=MAX_BATCH_CITIES)
+
+
+def result_to_json(service, result: WeatherResult, locale: Optional[str] = None) -> dict:
+    """Данные города; текстовая сводка добавляется, только если запрошена локаль"""
+    if not result.ok:
+        return {"city": result.city, "error": str(result.error)}
+    body = {"city": result.city, "data": service.to_dict(result.data)}
+    if locale:
+        body["summary"] = service.format_summary(result.data, locale)
+    return body
+
+
+def create_app(service, max_batch: int = 50, max_wait: float = 0.01) -> FastAPI:
+    """HTTP API поверх WeatherService: общий кэш для всех клиентов процесса"""
+    app = FastAPI(title="Weather API")
+
+    aget_weather_many = getattr(service.repository, "aget_weather_many", None)
+
+    async def fetch_many(cities: List[str]) -> List[WeatherResult]:
+        if aget_weather_many is None:
+            return await asyncio.to_thread(service.get_weather_many, cities)
+        # Репозиторий и HTTP-клиенты провайдеров живут на своём фоновом loop
+        return await asyncio.wrap_future(background_loop.submit(aget_weather_many(cities)))
+
+    batcher = MicroBatcher(fetch_many, max_batch, max_wait)
+
+    locale_query = Query(None, pattern="^(" + "|".join(SUMMARY_TEMPLATES) + ")$")
+
+    @app.get("/weather/{city}")
+    async def get_weather(city: str, locale: Optional[str] = locale_query):
+        result = await batcher.submit(city.strip())
+        if not result.ok:
+            status = 404 if is_client_error(result.error) else 502
+            raise HTTPException(status_code=status, detail=str(result.error))
+        return result_to_json(service, result, locale)
+
+    @app.post("/weather/batch")
+    async def get_weather_batch(request: BatchRequest, locale: Optional[str] = locale_query):
+        results = await fetch_many([city.strip() for city in request.cities])
+        return [result_to_json(service, result, locale) for result in results]
+
+    @app.get("/status")
+    async def get_status():
+        """Остаток бюджета запросов к провайдерам и статистика кэша"""
+        repository = service.repository
+        status = {}
+        if hasattr(repository, "provider"):
+            status["provider"] = provider_status(repository.provider)
+        if hasattr(repository, "stats"):
+            stats = repository.stats()
+            status["cache"] = {**dataclasses.asdict(stats), "hit_rate": round(stats.hit_rate, 3)}
+        return status
+
+    return app
+
+
+class WeatherHttpAPI(WeatherUI):
+    """Запуск HTTP API через интерфейс WeatherUI; адрес задаётся WEATHER_API_HOST/WEATHER_API_PORT"""
+    def run(self):
+        import uvicorn
+
+        uvicorn.run(
+            create_app(self.service),
+            host=os.getenv("WEATHER_API_HOST", "127.0.0.1"),
+            port=int(os.getenv("WEATHER_API_PORT", "8080")),
+        )
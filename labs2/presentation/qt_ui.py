@@ -1,18 +1,57 @@
 import sys
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QLineEdit, QPushButton, QTextEdit
 from labs2.domain.interfaces.weather_ui import WeatherUI
 
+# Пауза после ввода, после которой город запрашивается без нажатия кнопки
+DEBOUNCE_MS = 600
+
 
 class DummyService:
     def get_weather_summary(self, city):
         return f"Погода в {city}: 🌞"
 
+    def get_cached_summary(self, city):
+        return None
+
+
+class WorkerSignals(QObject):
+    finished = pyqtSignal(int, str)
+    failed = pyqtSignal(int, str)
+
+
+class WeatherWorker(QRunnable):
+    """Запрос погоды в пуле потоков; результат возвращается в GUI-поток через сигналы"""
+
+    def __init__(self, service, city: str, request_id: int):
+        super().__init__()
+        self.service = service
+        self.city = city
+        self.request_id = request_id
+        self.signals = WorkerSignals()
+        # Объектом владеет Python: UI может снять его с пула через tryTake и после завершения
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            summary = self.service.get_weather_summary(self.city)
+        except Exception as e:
+            self.signals.failed.emit(self.request_id, str(e))
+        else:
+            self.signals.finished.emit(self.request_id, summary)
+
 
 class WeatherQtUI(QWidget):
     """Qt-представление приложения погоды"""
     def __init__(self, service):
         super().__init__()
         self.service = service
+        self.pool = QThreadPool.globalInstance()
+        self._request_id = 0
+        self._pending = None
+        # Запущенные воркеры по request_id: без ссылки из Python объект, снятый с очереди
+        # пулом, может быть собран сборщиком мусора до или во время run()
+        self._workers = {}
         self.init_ui()
 
     def init_ui(self):
@@ -21,8 +60,15 @@ class WeatherQtUI(QWidget):
 
         self.city_input = QLineEdit()
         self.city_input.setPlaceholderText("Введите город")
+        self.city_input.returnPressed.connect(self.show_weather)
         layout.addWidget(self.city_input)
 
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(DEBOUNCE_MS)
+        self.debounce.timeout.connect(self.show_weather)
+        self.city_input.textChanged.connect(self.debounce.start)
+
         get_btn = QPushButton("Получить погоду")
         get_btn.clicked.connect(self.show_weather)
         layout.addWidget(get_btn)
@@ -34,15 +80,46 @@ class WeatherQtUI(QWidget):
         self.setLayout(layout)
 
     def show_weather(self):
+        self.debounce.stop()
         city = self.city_input.text().strip()
+        self._cancel_pending()
         if not city:
             self.result_area.setText("Введите название города")
             return
-        try:
-            summary = self.service.get_weather_summary(city)
+
+        cached = self.service.get_cached_summary(city)
+        if cached is not None:
+            self.result_area.setText(cached)
+            return
+
+        self.result_area.setText(f"Загрузка погоды для {city}…")
+        worker = WeatherWorker(self.service, city, self._request_id)
+        worker.signals.finished.connect(self.on_weather_ready)
+        worker.signals.failed.connect(self.on_weather_failed)
+        self._pending = worker
+        self._workers[worker.request_id] = worker
+        self.pool.start(worker)
+
+    def _cancel_pending(self):
+        """Новый запрос отменяет предыдущий: ещё не начатый снимается с пула, ответ начатого игнорируется"""
+        self._request_id += 1
+        if self._pending is not None:
+            # Если tryTake не удался, воркер уже выполняется и уйдёт из _workers по своему сигналу
+            if self.pool.tryTake(self._pending):
+                self._workers.pop(self._pending.request_id, None)
+            self._pending = None
+
+    def on_weather_ready(self, request_id: int, summary: str):
+        self._workers.pop(request_id, None)
+        if request_id == self._request_id:
+            self._pending = None
             self.result_area.setText(summary)
-        except Exception as e:
-            self.result_area.setText(f"Ошибка: {e}")
+
+    def on_weather_failed(self, request_id: int, error: str):
+        self._workers.pop(request_id, None)
+        if request_id == self._request_id:
+            self._pending = None
+            self.result_area.setText(f"Ошибка: {error}")
 
 
 class WeatherApp(WeatherUI):
@@ -52,4 +129,3 @@ class WeatherApp(WeatherUI):
         ui = WeatherQtUI(self.service)
         ui.show()
         sys.exit(app.exec())
-
@@ -0,0 +1,50 @@
+# tests/conftest.py
+import asyncio
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+# Пакет импортируется как labs2.*, поэтому в PYTHONPATH нужен каталог над labs2
+root_dir = Path(__file__).parent.parent.parent
+sys.path.append(str(root_dir))
+
+from labs2.domain.entities.weather_data import WeatherData
+from labs2.domain.interfaces.weather_provider import AsyncWeatherProvider
+
+
+class SlowProvider(AsyncWeatherProvider):
+    """Провайдер, отвечающий через delay секунд; запоминает запрошенные города"""
+
+    def __init__(self, delay: float = 0.2, fail=(), coords=None):
+        self.delay = delay
+        self.fail = set(fail)
+        self.coords = coords or {}
+        self.calls: List[str] = []
+
+    async def fetch_weather(self, city: str) -> WeatherData:
+        self.calls.append(city)
+        await asyncio.sleep(self.delay)
+        if city in self.fail:
+            raise LookupError(f"unknown city {city}")
+        name, lat, lon = self.coords.get(city, (city, None, None))
+        return WeatherData(name, 20.0, "clear", lat=lat, lon=lon)
+
+
+class FailingProvider(SlowProvider):
+    """Провайдер, всегда отвечающий ошибкой error"""
+
+    def __init__(self, error: Exception, delay: float = 0):
+        super().__init__(delay)
+        self.error = error
+
+    async def fetch_weather(self, city: str) -> WeatherData:
+        self.calls.append(city)
+        await asyncio.sleep(self.delay)
+        raise self.error
+
+
+@pytest.fixture
+def slow_provider():
+    return SlowProvider()
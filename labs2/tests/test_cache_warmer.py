@@ -0,0 +1,65 @@
+# tests/test_cache_warmer.py
+import pytest
+
+from labs2.infrastructure.repositories.cache_warmer import AccessTracker, CacheWarmer
+from labs2.infrastructure.repositories.cached_weather_repository import CachedWeatherRepository
+
+
+@pytest.fixture
+def repository(slow_provider):
+    slow_provider.delay = 0
+    # TTL меньше refresh_ahead: любая запись в кэше уже «истекает»
+    return CachedWeatherRepository(slow_provider, ttl_seconds=1)
+
+
+class TestAccessTracker:
+    def test_top_skips_and_forgets_cold_keys(self):
+        """Тест: ключи с оценкой ниже порога не попадают в top и забываются"""
+        tracker = AccessTracker()
+        tracker.record("paris", "Paris")
+        for _ in range(3):
+            tracker.record("rome", "Rome")
+
+        assert tracker.top(10, min_score=2.0) == [("rome", "Rome")]
+        assert tracker.top(10) == [("rome", "Rome")]
+
+
+class TestCacheWarmer:
+    async def test_single_lookup_is_not_refreshed(self, repository, slow_provider):
+        """Тест: город, запрошенный один раз, не обновляется в фоне"""
+        await repository.aget_weather("Paris")
+        warmer = CacheWarmer(repository, refresh_ahead=5)
+
+        assert await warmer.refresh_hot() == 0
+        assert slow_provider.calls == ["Paris"]
+
+    async def test_hot_city_is_refreshed(self, repository, slow_provider):
+        """Тест: популярный город обновляется до истечения"""
+        for _ in range(3):
+            await repository.aget_weather("Paris")
+        warmer = CacheWarmer(repository, refresh_ahead=5)
+
+        assert await warmer.refresh_hot() == 1
+        assert slow_provider.calls == ["Paris", "Paris"]
+
+    async def test_failed_lookup_is_not_retried(self, repository, slow_provider):
+        """Тест: опечатка без записи в кэше не запрашивается у провайдера снова"""
+        slow_provider.fail = {"Mosow"}
+        for _ in range(5):
+            with pytest.raises(LookupError):
+                await repository.aget_weather("Mosow")
+        warmer = CacheWarmer(repository, refresh_ahead=5)
+
+        for _ in range(3):
+            assert await warmer.refresh_hot() == 0
+        assert slow_provider.calls == ["Mosow"] * 5
+
+    async def test_failed_warm_city_backs_off(self, repository, slow_provider):
+        """Тест: город из списка прогрева после неудачи пропускается на время паузы"""
+        slow_provider.fail = {"Mosow"}
+        warmer = CacheWarmer(repository, refresh_ahead=5)
+        warmer.warm_cities = ["Mosow", "Paris"]
+        await warmer.warm_up(warmer.warm_cities)
+
+        assert await warmer.refresh_hot() == 1
+        assert slow_provider.calls.count("Mosow") == 1
@@ -0,0 +1,44 @@
+# tests/test_cached_weather_repository.py
+import time
+
+from labs2.infrastructure.providers.adapters import SyncProviderAdapter
+from labs2.infrastructure.repositories.cached_weather_repository import CachedWeatherRepository
+
+
+class TestBatchLookups:
+    def test_get_weather_many_runs_concurrently(self, slow_provider):
+        """Тест: пакетный запрос не ходит к провайдеру по одному городу"""
+        repository = CachedWeatherRepository(slow_provider)
+        cities = [f"City {i}" for i in range(10)]
+
+        start = time.perf_counter()
+        results = repository.get_weather_many(cities)
+        elapsed = time.perf_counter() - start
+
+        assert [r.city for r in results] == cities
+        assert all(r.ok for r in results)
+        assert elapsed < 1.0
+
+    def test_get_weather_many_dedupes_cities(self, slow_provider):
+        """Тест: одинаковые города в пакете загружаются один раз"""
+        repository = CachedWeatherRepository(slow_provider)
+
+        results = repository.get_weather_many(["Paris", "paris ", "PARIS"])
+
+        assert len(results) == 3
+        assert slow_provider.calls == ["Paris"]
+
+
+class TestCachedLookups:
+    def test_get_cached_miss_is_counted_once(self, slow_provider):
+        """Тест: проверка кэша перед загрузкой (как в Qt UI) не удваивает промах"""
+        repository = CachedWeatherRepository(SyncProviderAdapter(slow_provider))
+
+        assert repository.get_cached("Paris") is None
+        repository.get_weather("Paris")
+        assert repository.get_cached("Paris") is not None
+
+        stats = repository.stats()
+        assert (stats.hits, stats.misses) == (1, 1)
+        # Два обращения к городу, а не три
+        assert repository.access.top(1, min_score=2.5) == []
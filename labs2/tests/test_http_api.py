@@ -0,0 +1,61 @@
+# tests/test_http_api.py
+import asyncio
+import time
+
+import httpx
+
+from labs2.application.weather_service import WeatherService
+from labs2.infrastructure.repositories.cached_weather_repository import CachedWeatherRepository
+from labs2.infrastructure.providers.rate_limiter import RateLimitedProvider, RateLimitSettings
+from labs2.infrastructure.providers.weatherstack_provider import WeatherStackError
+from labs2.presentation.http_api import create_app
+from tests.conftest import FailingProvider, SlowProvider
+
+
+def make_client(provider) -> httpx.AsyncClient:
+    app = create_app(WeatherService(CachedWeatherRepository(provider)))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+class TestWeatherEndpoint:
+    async def test_concurrent_misses_are_fetched_together(self, slow_provider):
+        """Тест: одновременные промахи уходят к провайдеру одним пакетом, а не по очереди"""
+        async with make_client(slow_provider) as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(client.get(f"/weather/City{i}") for i in range(10)))
+            elapsed = time.perf_counter() - start
+
+        assert [r.status_code for r in responses] == [200] * 10
+        assert responses[3].json()["data"]["city"] == "City3"
+        assert elapsed < 1.0
+
+    async def test_batch_endpoint_reports_errors_per_city(self, slow_provider):
+        """Тест: ошибка одного города не ломает пакетный ответ"""
+        slow_provider.fail = {"Nowhere"}
+        async with make_client(slow_provider) as client:
+            response = await client.post("/weather/batch", json={"cities": ["Paris", "Nowhere"]})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body[0]["data"]["city"] == "Paris"
+        assert "error" in body[1]
+
+    async def test_unknown_city_is_not_found(self, slow_provider):
+        """Тест: «неизвестный город» от weatherstack отдаётся как 404, а не 502"""
+        provider = FailingProvider(WeatherStackError("615: Unable to find location", 615))
+        async with make_client(provider) as client:
+            response = await client.get("/weather/Mosow")
+
+        assert response.status_code == 404
+
+
+class TestStatusEndpoint:
+    async def test_status_shows_budget_and_cache(self):
+        """Тест: /status показывает остаток бюджета провайдера и статистику кэша"""
+        provider = RateLimitedProvider(SlowProvider(delay=0), RateLimitSettings(daily_quota=100))
+        async with make_client(provider) as client:
+            await client.get("/weather/Paris")
+            status = (await client.get("/status")).json()
+
+        assert status["provider"]["budget"]["daily_remaining"] == 99
+        assert status["cache"]["misses"] == 1
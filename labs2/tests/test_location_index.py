@@ -0,0 +1,140 @@
+# tests/test_location_index.py
+import json
+
+import pytest
+
+from labs2.domain.entities.weather_data import WeatherData
+from labs2.infrastructure.history.weather_history import WeatherHistory
+from labs2.infrastructure.repositories.cached_weather_repository import CachedWeatherRepository
+from labs2.infrastructure.repositories.location_index import LocationIndex, PrefixTrie, normalize_city
+from labs2.infrastructure.repositories.sqlite_weather_store import SqliteWeatherStore
+
+MOSCOW = ("Moscow", 55.752, 37.616)
+PARIS = {"Paris": ("Paris", 48.87, 2.33), "Paris, Texas": ("Paris", 33.66, -95.56)}
+
+
+@pytest.fixture
+def moscow_provider(slow_provider):
+    slow_provider.delay = 0
+    slow_provider.coords = {q: MOSCOW for q in ("Moscow", "Москва", "Moskva")}
+    return slow_provider
+
+
+def moscow() -> WeatherData:
+    return WeatherData("Moscow", 1.0, "snow", lat=55.752, lon=37.616)
+
+
+class TestNormalize:
+    @pytest.mark.parametrize("query, expected", [
+        ("  MOSCOW ", "moscow"),
+        ("São-Paulo", "sao paulo"),
+        ("New   York.", "new york"),
+        ("Йошкар-Ола", "йошкар ола"),
+    ])
+    def test_normalize_city(self, query, expected):
+        """Тест нормализации запроса"""
+        assert normalize_city(query) == expected
+
+
+class TestPrefixTrie:
+    def test_get_and_prefix(self):
+        """Тест точного поиска и перебора по префиксу"""
+        trie = PrefixTrie()
+        for word in ("moscow", "moskva", "madrid"):
+            trie.insert(word, word.upper())
+
+        assert trie.get("moskva") == "MOSKVA"
+        assert trie.get("mos") is None
+        assert [w for w, _ in trie.with_prefix("mos")] == ["moscow", "moskva"]
+        assert len(trie) == 3
+
+
+class TestLocationIndex:
+    def test_learn_and_suggest(self):
+        """Тест: запрос и название из ответа становятся псевдонимами одного места"""
+        index = LocationIndex()
+        loc_id = index.learn("москва", moscow())
+
+        assert index.key_for("Москва ") == loc_id
+        assert index.key_for("MOSCOW") == loc_id
+        assert index.key_for("Paris") == "paris"
+        assert index.suggest("мос") == ["Moscow"]
+
+    def test_saves_are_debounced(self, tmp_path):
+        """Тест: новые псевдонимы пишутся на диск пачкой, а не на каждый learn"""
+        path = tmp_path / "aliases.json"
+        index = LocationIndex(str(path), save_delay=60)
+        index.learn("москва", moscow())
+        index.learn("moskva", moscow())
+        assert not path.exists()
+
+        index.flush()
+        saved = json.loads(path.read_text(encoding="utf-8"))
+        assert set(saved["aliases"]) == {"москва", "moskva", "moscow"}
+
+    def test_sibling_aliases_are_reloaded(self, tmp_path):
+        """Тест: псевдонимы, сохранённые другим процессом, подхватываются при промахе"""
+        path = str(tmp_path / "aliases.json")
+        reader = LocationIndex(path, reload_interval=0)
+        writer = LocationIndex(path)
+        loc_id = writer.learn("moskva", moscow())
+        writer.flush()
+
+        assert reader.resolve("moskva") == loc_id
+
+    def test_flush_keeps_sibling_aliases(self, tmp_path):
+        """Тест: сохранение не затирает псевдонимы, записанные другим процессом"""
+        path = str(tmp_path / "aliases.json")
+        first, second = LocationIndex(path), LocationIndex(path)
+        first.learn("москва", moscow())
+        first.flush()
+        second.learn("moskva", moscow())
+        second.flush()
+
+        assert LocationIndex(path).resolve("москва") is not None
+
+
+class TestRepositoryWithLocations:
+    async def test_aliases_share_one_entry(self, moscow_provider):
+        """Тест: разные написания города после первой загрузки не ходят к провайдеру"""
+        repository = CachedWeatherRepository(moscow_provider)
+        for city in ("Москва", "Moscow", "moscow ", "MOSCOW"):
+            await repository.aget_weather(city)
+
+        assert moscow_provider.calls == ["Москва"]
+
+    async def test_places_with_the_same_name_stay_apart(self, slow_provider, tmp_path):
+        """Тест: город с тем же названием из ответа не занимает чужую запись кэша"""
+        slow_provider.delay = 0
+        slow_provider.coords = PARIS
+        repository = CachedWeatherRepository(slow_provider, store=SqliteWeatherStore(str(tmp_path / "c.db"), 60))
+
+        assert (await repository.aget_weather("Paris")).lat == 48.87
+        assert (await repository.aget_weather("Paris, Texas")).lat == 33.66
+        assert (await repository.aget_weather("Paris")).lat == 48.87
+        assert (await repository.aget_weather("paris texas")).lat == 33.66
+        assert slow_provider.calls == ["Paris", "Paris, Texas"]
+
+        other = CachedWeatherRepository(slow_provider, store=SqliteWeatherStore(str(tmp_path / "c.db"), 60))
+        assert (await other.aget_weather("Paris")).lat == 48.87
+
+    async def test_store_is_shared_between_processes(self, moscow_provider, tmp_path):
+        """Тест: второй процесс без индекса псевдонимов находит ответ в постоянном кэше"""
+        db = str(tmp_path / "cache.db")
+        first = CachedWeatherRepository(moscow_provider, store=SqliteWeatherStore(db, 60))
+        await first.aget_weather("Moscow")
+        second = CachedWeatherRepository(moscow_provider, store=SqliteWeatherStore(db, 60))
+        await second.aget_weather("Moscow")
+        await second.aget_weather("Москва")
+
+        assert moscow_provider.calls == ["Moscow", "Москва"]
+
+    async def test_history_resolves_city_names(self, moscow_provider):
+        """Тест: история ищется по названию города, хотя записана под id места"""
+        history = WeatherHistory()
+        repository = CachedWeatherRepository(moscow_provider, history=history)
+        await repository.aget_weather("Москва")
+
+        assert history.aggregate("Moscow")["temperature"]["count"] == 1
+        assert history.aggregate_many(["moskva", "Москва"]) == {
+            "Москва": {"min": 20.0, "max": 20.0, "mean": 20.0, "count": 1}}
@@ -0,0 +1,156 @@
+# tests/test_providers.py
+import dataclasses
+import marshal
+
+import httpx
+import pytest
+
+from labs2.domain.entities.weather_data import WeatherData
+from labs2.infrastructure.providers.json_codec import intern_text, loads
+from labs2.infrastructure.providers.weatherapi_provider import AsyncWeatherAPIProvider, parse_weatherapi
+from labs2.infrastructure.providers.weatherstack_provider import (
+    AsyncWeatherStackProvider,
+    WeatherStackError,
+    parse_weatherstack,
+)
+from labs2.infrastructure.repositories.sqlite_weather_store import decode_weather, encode_weather
+
+WEATHERAPI_PAYLOAD = {
+    "location": {"name": "Paris", "country": "France", "lat": 48.87, "lon": 2.33},
+    "current": {
+        "temp_c": 18.0, "feelslike_c": 17.2, "humidity": 72, "pressure_mb": 1015.0,
+        "wind_kph": 11.2, "wind_degree": 250, "wind_dir": "WSW", "cloud": 50, "uv": 4.0,
+        "condition": {"text": "Переменная облачность"}, "precip_mm": 0.0, "snow_cm": 1.5, "is_day": 0,
+    },
+}
+
+WEATHERSTACK_PAYLOAD = {
+    "location": {"name": "Paris", "country": "France", "lat": "48.867", "lon": "2.333"},
+    "current": {
+        "temperature": 18, "feelslike": 17, "humidity": 72, "pressure": 1015, "wind_speed": 11,
+        "wind_degree": 250, "wind_dir": "WSW", "cloudcover": 50, "uv_index": 4,
+        "weather_descriptions": ["Partly cloudy"], "precip": 0.4, "is_day": "yes",
+    },
+}
+
+
+def mock_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestParsers:
+    def test_parse_weatherapi(self):
+        """Тест разбора ответа weatherapi: единицы, осадки и место"""
+        data = parse_weatherapi(WEATHERAPI_PAYLOAD, "paris")
+
+        assert (data.city, data.temperature, data.description) == ("Paris", 18.0, "Переменная облачность")
+        assert (data.pressure, data.wind_speed, data.uv_index) == (1015.0, 11.2, 4.0)
+        assert data.rain_mm is None and data.snow_cm == 1.5
+        assert data.is_day is False
+        assert (data.country, data.lat, data.lon) == ("France", 48.87, 2.33)
+
+    def test_parse_weatherstack(self):
+        """Тест разбора ответа weatherstack: координаты строками, дождь из осадков"""
+        data = parse_weatherstack(WEATHERSTACK_PAYLOAD, "paris")
+
+        assert (data.city, data.temperature, data.description) == ("Paris", 18, "Partly cloudy")
+        assert data.rain_mm == 0.4 and data.snow_cm is None
+        assert data.is_day is True
+        assert (data.lat, data.lon) == (48.867, 2.333)
+
+    def test_missing_sections_fall_back_to_query(self):
+        """Тест: ответ без location и current даёт город из запроса и пустые поля"""
+        for parse in (parse_weatherapi, parse_weatherstack):
+            data = parse({}, "Atlantis")
+            assert data.city == "Atlantis"
+            assert data.temperature is None and data.lat is None
+
+    def test_repeated_strings_are_interned(self):
+        """Тест: одинаковые строки из разных ответов — один объект"""
+        first = parse_weatherapi(loads(b'{"location": {"name": "Par' + b'is"}}'), "x")
+        second = parse_weatherapi(loads(b'{"location": {"name": "Pa' + b'ris"}}'), "x")
+
+        assert first.city is second.city
+        assert intern_text(None) is None
+
+
+class TestWeatherDataCodec:
+    def test_slots(self):
+        """Тест: WeatherData без __dict__, лишние атрибуты не заводятся"""
+        data = WeatherData("Paris", 18.0, "clear")
+
+        assert not hasattr(data, "__dict__")
+        with pytest.raises(AttributeError):
+            data.extra = 1
+
+    def test_round_trip(self):
+        """Тест: кодирование для постоянного кэша сохраняет все поля"""
+        data = parse_weatherapi(WEATHERAPI_PAYLOAD, "paris")
+
+        decoded = decode_weather(encode_weather(data))
+
+        assert decoded == data
+        assert dataclasses.astuple(decoded) == dataclasses.astuple(data)
+
+    def test_layout_change_is_rejected(self):
+        """Тест: запись с другим числом полей не декодируется"""
+        with pytest.raises(ValueError):
+            decode_weather(marshal.dumps(("Paris", 18.0)))
+
+
+class TestAsyncProviders:
+    async def test_weatherapi_fetch(self):
+        """Тест запроса к weatherapi: ключ и город в параметрах, разбор ответа"""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json=WEATHERAPI_PAYLOAD)
+
+        provider = AsyncWeatherAPIProvider("secret")
+        provider.client = mock_client(handler)
+
+        data = await provider.fetch_weather("Paris")
+
+        assert data.city == "Paris"
+        assert requests[0].url.params["key"] == "secret"
+        assert requests[0].url.params["q"] == "Paris"
+
+    async def test_http_error_is_raised(self):
+        """Тест: ошибка HTTP не превращается в пустые данные"""
+        provider = AsyncWeatherAPIProvider("secret")
+        provider.client = mock_client(lambda request: httpx.Response(400, json={"error": {"code": 1006}}))
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await provider.fetch_weather("Atlantis")
+
+    async def test_weatherstack_error_body(self):
+        """Тест: ошибка weatherstack в теле ответа с кодом 200"""
+        provider = AsyncWeatherStackProvider("secret")
+        provider.client = mock_client(lambda request: httpx.Response(
+            200, json={"success": False, "error": {"code": 615, "info": "Request failed"}}))
+
+        with pytest.raises(WeatherStackError) as error:
+            await provider.fetch_weather("Atlantis")
+        assert error.value.is_query_error
+
+    async def test_weatherstack_bulk(self):
+        """Тест bulk-запроса: один запрос на пачку, ошибка города не портит остальные"""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json=[
+                WEATHERSTACK_PAYLOAD,
+                {"success": False, "error": {"code": 615, "info": "Request failed"}},
+            ])
+
+        provider = AsyncWeatherStackProvider("secret", bulk=True)
+        provider.client = mock_client(handler)
+
+        paris, atlantis = await provider.fetch_weather_many(["Paris", "Atlantis"])
+
+        assert len(requests) == 1
+        assert requests[0].url.params["query"] == "Paris;Atlantis"
+        assert paris.city == "Paris"
+        assert isinstance(atlantis, WeatherStackError)
@@ -0,0 +1,128 @@
+# tests/test_racing_provider.py
+import time
+
+import httpx
+import pytest
+
+from labs2.infrastructure.providers.racing_provider import (
+    AsyncRacingWeatherProvider, CircuitBreaker, NoProviderAvailable, ProviderRoute, is_client_error,
+)
+from labs2.infrastructure.providers.weatherstack_provider import AsyncWeatherStackProvider, WeatherStackError
+from tests.conftest import FailingProvider, SlowProvider
+
+
+def weatherstack_server(body: dict) -> AsyncWeatherStackProvider:
+    """weatherstack поверх локального обработчика вместо сети"""
+    provider = AsyncWeatherStackProvider("test-key")
+    provider.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json=body)))
+    return provider
+
+
+class TestHedging:
+    async def test_slow_primary_is_hedged(self):
+        """Тест: при медленном первом провайдере ответ приходит от второго"""
+        slow, fast = SlowProvider(delay=1.0), SlowProvider(delay=0.01)
+        racing = AsyncRacingWeatherProvider([slow, fast], names=["slow", "fast"], default_hedge_delay=0.05)
+
+        start = time.perf_counter()
+        data = await racing.fetch_weather("Paris")
+
+        assert data.city == "Paris"
+        assert time.perf_counter() - start < 0.5
+        assert slow.calls == fast.calls == ["Paris"]
+
+    async def test_cancelled_loser_does_not_look_fast(self):
+        """Тест: отменённый запрос не занижает оценку задержки и не попадает в перцентили"""
+        route = ProviderRoute("slow", SlowProvider(), CircuitBreaker())
+        for _ in range(3):
+            route.observe(0.5)
+
+        route.observe_cancelled(0.01)
+        assert route.latency_ewma == pytest.approx(0.5)
+        route.observe_cancelled(1.0)
+        assert route.latency_ewma > 0.5
+        assert list(route.latencies) == [0.5] * 3
+
+    async def test_hedge_backup_is_not_promoted(self):
+        """Тест: резерв, отменённый вскоре после запуска, не становится основным"""
+        primary, backup = SlowProvider(delay=0.06), SlowProvider(delay=0.5)
+        racing = AsyncRacingWeatherProvider([primary, backup], names=["primary", "backup"], default_hedge_delay=0.05)
+        racing.routes[0].observe(0.06)
+        racing.routes[1].observe(0.07)
+
+        for _ in range(3):
+            await racing.fetch_weather("Paris")
+
+        assert [r.name for r in racing._ordered_routes()] == ["primary", "backup"]
+
+
+class TestFailover:
+    async def test_error_moves_to_next_provider(self):
+        """Тест: при сбое провайдера запрос уходит следующему"""
+        broken = FailingProvider(httpx.ConnectError("down"))
+        healthy = SlowProvider(delay=0)
+        racing = AsyncRacingWeatherProvider([broken, healthy], hedge=False)
+
+        assert (await racing.fetch_weather("Paris")).city == "Paris"
+        assert racing.routes[0].breaker.failures == 1
+
+    async def test_unknown_city_from_weatherstack_is_not_a_failure(self):
+        """Тест: «неизвестный город» в теле ответа weatherstack не открывает автомат и не вызывает failover"""
+        weatherstack = weatherstack_server(
+            {"success": False, "error": {"code": 615, "type": "request_failed", "info": "Unable to find location"}})
+        backup = SlowProvider(delay=0)
+        racing = AsyncRacingWeatherProvider([weatherstack, backup], hedge=False, failure_threshold=2)
+
+        for _ in range(3):
+            with pytest.raises(WeatherStackError) as info:
+                await racing.fetch_weather("Mosow")
+            assert is_client_error(info.value)
+
+        assert racing.routes[0].breaker.state == "closed"
+        assert backup.calls == []
+
+    async def test_weatherstack_quota_error_fails_over(self):
+        """Тест: ошибка тарифа weatherstack считается сбоем провайдера"""
+        weatherstack = weatherstack_server({"success": False, "error": {"code": 104, "type": "usage_limit_reached"}})
+        backup = SlowProvider(delay=0)
+        racing = AsyncRacingWeatherProvider([weatherstack, backup], hedge=False)
+
+        assert (await racing.fetch_weather("Paris")).city == "Paris"
+        assert racing.routes[0].breaker.failures == 1
+
+
+class TestCircuitBreaker:
+    async def test_breaker_opens_and_skips_provider(self):
+        """Тест: после порога ошибок провайдер пропускается до конца паузы"""
+        broken = FailingProvider(httpx.ConnectError("down"))
+        healthy = SlowProvider(delay=0)
+        racing = AsyncRacingWeatherProvider([broken, healthy], hedge=False, failure_threshold=2, cooldown=60)
+        racing.routes[1].observe(1.0)  # сломанный провайдер идёт первым
+
+        for _ in range(4):
+            await racing.fetch_weather("Paris")
+
+        assert racing.routes[0].breaker.state == "open"
+        assert len(broken.calls) == 2
+        assert len(healthy.calls) == 4
+
+    async def test_all_open_raises(self):
+        """Тест: если все автоматы открыты, запрос не уходит никуда"""
+        broken = FailingProvider(httpx.ConnectError("down"))
+        racing = AsyncRacingWeatherProvider([broken], hedge=False, failure_threshold=1, cooldown=60)
+        with pytest.raises(httpx.ConnectError):
+            await racing.fetch_weather("Paris")
+
+        with pytest.raises(NoProviderAvailable):
+            await racing.fetch_weather("Paris")
+
+    def test_half_open_allows_single_trial(self):
+        """Тест: после паузы пропускается один пробный запрос"""
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=0)
+        breaker.record_failure()
+
+        assert breaker.state == "half_open"
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+        breaker.record_success()
+        assert breaker.state == "closed"
@@ -0,0 +1,139 @@
+# tests/test_rate_limiter.py
+import asyncio
+
+import httpx
+import pytest
+
+from labs2.domain.entities.weather_data import WeatherData
+from labs2.infrastructure.providers.racing_provider import AsyncRacingWeatherProvider
+from labs2.infrastructure.providers.rate_limiter import (
+    QuotaExceeded, RateLimitedProvider, RateLimitSettings, TokenBucketScheduler, provider_status,
+)
+from labs2.infrastructure.repositories.sqlite_weather_store import SqliteWeatherStore
+from tests.conftest import SlowProvider
+
+
+class BulkProvider(SlowProvider):
+    """Провайдер с bulk-запросами: запоминает состав каждого пакетного запроса"""
+    BULK_SIZE = 3
+
+    def __init__(self, failures=None):
+        super().__init__(delay=0)
+        self.bulk = True
+        self.requests = []
+        # город -> сколько раз подряд ответить 503
+        self.failures = dict(failures or {})
+
+    async def fetch_weather_many(self, cities, concurrency=10):
+        self.requests.append(list(cities))
+        results = []
+        for city in cities:
+            if self.failures.get(city):
+                self.failures[city] -= 1
+                request = httpx.Request("GET", "http://weather.test")
+                results.append(httpx.HTTPStatusError("busy", request=request,
+                                                     response=httpx.Response(503, request=request)))
+            else:
+                results.append(WeatherData(city, 20.0, "clear"))
+        return results
+
+
+class TestTokenBucketScheduler:
+    async def test_quota_cost(self):
+        """Тест: запрос может списать из квоты больше одного"""
+        scheduler = TokenBucketScheduler(rate=100, burst=10, daily_quota=5)
+        await scheduler.acquire(quota_cost=4)
+
+        with pytest.raises(QuotaExceeded):
+            await scheduler.acquire(quota_cost=2)
+        assert scheduler.budget()["daily_remaining"] == 1
+
+    async def test_quota_is_shared_through_store(self, tmp_path):
+        """Тест: квота в общей базе одна на все процессы и не сбрасывается перезапуском"""
+        path = str(tmp_path / "cache.db")
+        first = TokenBucketScheduler(100, 10, daily_quota=5, quota_store=SqliteWeatherStore(path, 60), name="ws")
+        second = TokenBucketScheduler(100, 10, daily_quota=5, quota_store=SqliteWeatherStore(path, 60), name="ws")
+        await first.acquire(quota_cost=3)
+        await second.acquire(quota_cost=2)
+
+        with pytest.raises(QuotaExceeded):
+            await first.acquire()
+        restarted = TokenBucketScheduler(100, 10, daily_quota=5, quota_store=SqliteWeatherStore(path, 60), name="ws")
+        with pytest.raises(QuotaExceeded):
+            await restarted.acquire()
+        other = TokenBucketScheduler(100, 10, daily_quota=5, quota_store=SqliteWeatherStore(path, 60), name="wa")
+        await other.acquire()
+
+    async def test_cancelled_request_returns_quota(self, tmp_path):
+        """Тест: отменённое в очереди ожидание возвращает списанное в общую квоту"""
+        store = SqliteWeatherStore(str(tmp_path / "cache.db"), 60)
+        scheduler = TokenBucketScheduler(rate=1, burst=1, daily_quota=5, quota_store=store, name="ws")
+        await scheduler.acquire()
+        waiting = asyncio.ensure_future(scheduler.acquire())
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        assert store.reserve_quota("ws", scheduler._day.isoformat(), 0, 5) == 1
+
+    async def test_priority_order(self):
+        """Тест: при нехватке токенов первым обслуживается более важный запрос"""
+        scheduler = TokenBucketScheduler(rate=20, burst=1)
+        await scheduler.acquire()
+        order = []
+
+        async def take(name, priority):
+            await scheduler.acquire(priority)
+            order.append(name)
+
+        await asyncio.gather(take("background", 10), take("interactive", 0))
+        assert order == ["interactive", "background"]
+
+
+class TestRateLimitedProvider:
+    async def test_bulk_request_takes_one_token(self):
+        """Тест: bulk-провайдер получает пачки городов, по токену на пачку"""
+        inner = BulkProvider()
+        limited = RateLimitedProvider(inner, RateLimitSettings(rate=100, burst=10, daily_quota=100))
+
+        results = await limited.fetch_weather_many([f"City {i}" for i in range(7)])
+
+        assert [r.city for r in results] == [f"City {i}" for i in range(7)]
+        assert sorted(len(r) for r in inner.requests) == [1, 3, 3]
+        budget = limited.budget()
+        assert budget["tokens"] == pytest.approx(7, abs=0.5)
+        assert budget["used_today"] == 7
+
+    async def test_bulk_retries_only_failed_cities(self):
+        """Тест: после 503 повторяются только города, которые не загрузились"""
+        inner = BulkProvider(failures={"B": 1})
+        settings = RateLimitSettings(rate=100, burst=10, base_backoff=0.01)
+        limited = RateLimitedProvider(inner, settings)
+
+        results = await limited.fetch_weather_many(["A", "B", "C"])
+
+        assert all(isinstance(r, WeatherData) for r in results)
+        assert inner.requests == [["A", "B", "C"], ["B"]]
+        assert limited.retries == 1
+
+    async def test_without_bulk_fetches_per_city(self):
+        """Тест: без bulk каждый город — отдельный запрос за своим токеном"""
+        inner = BulkProvider()
+        inner.bulk = False
+        limited = RateLimitedProvider(inner, RateLimitSettings(rate=100, burst=10))
+
+        await limited.fetch_weather_many(["A", "B"])
+
+        assert inner.requests == []
+        assert sorted(inner.calls) == ["A", "B"]
+
+    def test_provider_status_reports_route_budgets(self):
+        """Тест: у составного провайдера видны бюджеты маршрутов"""
+        limited = RateLimitedProvider(SlowProvider(), RateLimitSettings(daily_quota=10))
+        racing = AsyncRacingWeatherProvider([limited], names=["weatherstack"])
+
+        status = provider_status(racing)
+
+        assert status["routes"][0]["budget"]["daily_remaining"] == 10
+        assert provider_status(limited)["budget"]["daily_remaining"] == 10
@@ -0,0 +1,78 @@
+# tests/test_single_flight.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from labs2.infrastructure.repositories.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    def test_one_call_per_key_across_threads(self):
+        """Тест: одновременные вызовы из потоков выполняют загрузку один раз"""
+        flight = SingleFlight()
+        calls = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.1)
+            return "data"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("paris", load))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert calls == [1]
+        assert results == ["data"] * 8
+        assert flight.in_flight() == 0
+
+    async def test_one_call_per_key_across_coroutines(self):
+        """Тест: одновременные корутины ждут одну загрузку, разные ключи грузятся отдельно"""
+        flight = SingleFlight()
+        calls = []
+
+        async def load(key):
+            calls.append(key)
+            await asyncio.sleep(0.05)
+            return key.upper()
+
+        results = await asyncio.gather(*(flight.do_async(key, lambda key=key: load(key))
+                                         for key in ("paris", "paris", "rome", "paris")))
+
+        assert sorted(calls) == ["paris", "rome"]
+        assert results == ["PARIS", "PARIS", "ROME", "PARIS"]
+
+    async def test_error_reaches_every_waiter(self):
+        """Тест: ошибку загрузки получают все ожидающие, а не только первый"""
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.05)
+            raise LookupError("unknown city")
+
+        results = await asyncio.gather(*(flight.do_async("atlantis", load) for _ in range(3)),
+                                       return_exceptions=True)
+
+        assert len(results) == 3
+        assert all(isinstance(r, LookupError) for r in results)
+
+    async def test_key_is_cleared_after_error(self):
+        """Тест: после ошибки ключ освобождается и следующий вызов загружает заново"""
+        flight = SingleFlight()
+
+        async def fail():
+            raise LookupError("temporary")
+
+        async def load():
+            return "data"
+
+        with pytest.raises(LookupError):
+            await flight.do_async("paris", fail)
+
+        assert "paris" not in flight
+        assert await flight.do_async("paris", load) == "data"
+        assert flight.in_flight() == 0
@@ -0,0 +1,68 @@
+# tests/test_sqlite_weather_store.py
+import sqlite3
+
+import pytest
+
+from labs2.domain.entities.weather_data import WeatherData
+from labs2.infrastructure.repositories import sqlite_weather_store
+from labs2.infrastructure.repositories.sqlite_weather_store import SqliteWeatherStore
+
+
+def paris() -> WeatherData:
+    return WeatherData("Paris", 18.5, "Cloudy", humidity=70, wind_dir="NW", is_day=True, lat=48.87, lon=2.33)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "weather.db")
+
+
+class TestSqliteWeatherStore:
+    def test_round_trip(self, db_path):
+        """Тест: запись возвращается со всеми полями и возрастом"""
+        store = SqliteWeatherStore(db_path, ttl_seconds=60)
+        store.set("paris", paris())
+
+        data, age = store.get("paris")
+        assert data == paris()
+        assert 0 <= age < 5
+        assert store.get("rome") is None
+
+    def test_get_many(self, db_path):
+        """Тест: пакетное чтение возвращает только найденные ключи"""
+        store = SqliteWeatherStore(db_path, ttl_seconds=60)
+        store.set_many({"paris": paris(), "geo:48.87,2.33": paris()})
+
+        assert set(store.get_many(["paris", "geo:48.87,2.33", "rome"])) == {"paris", "geo:48.87,2.33"}
+        assert store.get_many([]) == {}
+
+    def test_expired_entries_are_misses(self, db_path, monkeypatch):
+        """Тест: запись старше ttl не отдаётся и удаляется при следующей записи"""
+        now = [1_000_000.0]
+        monkeypatch.setattr(sqlite_weather_store.time, "time", lambda: now[0])
+        store = SqliteWeatherStore(db_path, ttl_seconds=60, purge_interval=0)
+        store.set("paris", paris())
+
+        now[0] += 30
+        assert store.get("paris")[1] == 30
+        now[0] += 30
+        assert store.get("paris") is None
+
+        store.set("rome", WeatherData("Rome", 25.0, "Sunny"))
+        count = sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM weather_cache").fetchone()[0]
+        assert count == 1
+
+    def test_reopened_from_disk(self, db_path):
+        """Тест: другой экземпляр (процесс после перезапуска) читает сохранённые записи"""
+        SqliteWeatherStore(db_path, ttl_seconds=60).set("paris", paris())
+
+        data, _ = SqliteWeatherStore(db_path, ttl_seconds=60).get("paris")
+        assert data == paris()
+
+    def test_old_format_is_a_miss(self, db_path):
+        """Тест: записи другой версии формата считаются промахом"""
+        store = SqliteWeatherStore(db_path, ttl_seconds=60)
+        store.set("paris", paris())
+        sqlite3.connect(db_path, isolation_level=None).execute("UPDATE weather_cache SET version = version - 1")
+
+        assert SqliteWeatherStore(db_path, ttl_seconds=60).get("paris") is None
@@ -0,0 +1,132 @@
+# tests/test_ttl_cache.py
+import pytest
+
+from labs2.domain.entities.weather_data import WeatherData
+from labs2.infrastructure.providers.adapters import SyncProviderAdapter
+from labs2.infrastructure.repositories import ttl_cache
+from labs2.infrastructure.repositories.cached_weather_repository import CachedWeatherRepository
+from labs2.infrastructure.repositories.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", clock)
+    return clock
+
+
+class TestTTLCache:
+    def test_lru_eviction(self, clock):
+        """Тест: при переполнении вытесняется давно не использованная запись"""
+        cache = TTLCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == (1, True)
+        assert cache.get("c") == (3, True)
+        assert cache.stats().evictions == 1
+
+    def test_expiry(self, clock):
+        """Тест: запись старше ttl без stale_seconds не отдаётся и удаляется"""
+        cache = TTLCache(ttl_seconds=60)
+        cache.set("a", 1)
+        clock.advance(59)
+        assert cache.get("a") == (1, True)
+
+        clock.advance(1)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+        assert cache.stats().expirations == 1
+
+    def test_stale_window(self, clock):
+        """Тест: запись старше ttl отдаётся как устаревшая, пока не кончится stale_seconds"""
+        cache = TTLCache(ttl_seconds=60, stale_seconds=30)
+        cache.set("a", 1)
+        clock.advance(70)
+        assert cache.get("a") == (1, False)
+
+        clock.advance(20)
+        assert cache.get("a") is None
+
+    def test_set_with_age(self, clock):
+        """Тест: запись из постоянного кэша стареет с учётом уже прожитого возраста"""
+        cache = TTLCache(ttl_seconds=60, stale_seconds=30)
+        cache.set("a", 1, age=50)
+        clock.advance(15)
+
+        assert cache.get("a") == (1, False)
+
+    def test_purge_expired(self, clock):
+        """Тест: периодическая чистка удаляет записи старше ttl + stale_seconds"""
+        cache = TTLCache(ttl_seconds=10, stale_seconds=5)
+        cache.set("old", 1)
+        clock.advance(12)
+        cache.set("new", 2)
+        clock.advance(4)
+        cache.purge_expired()
+
+        assert cache.peek("old") is None
+        assert cache.peek("new") is not None
+        assert cache.stats().expirations == 1
+
+    def test_stats(self, clock):
+        """Тест подсчёта попаданий, устаревших попаданий и промахов"""
+        cache = TTLCache(ttl_seconds=60, stale_seconds=60)
+        cache.get("a")
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("a")
+        clock.advance(90)
+        cache.get("a")
+        cache.peek("a")
+
+        stats = cache.stats()
+        assert (stats.hits, stats.stale_hits, stats.misses, stats.size) == (2, 1, 1, 1)
+        assert stats.hit_rate == 0.75
+
+
+class TestStaleWhileRevalidate:
+    def test_stale_entry_is_served_and_refreshed(self, clock, slow_provider, monkeypatch):
+        """Тест: устаревшие данные отдаются сразу, а обновление уходит в фон"""
+        submitted = []
+        monkeypatch.setattr(
+            "labs2.infrastructure.repositories.cached_weather_repository.background_loop.submit",
+            lambda coro: submitted.append(coro) or coro.close(),
+        )
+        slow_provider.delay = 0
+        repository = CachedWeatherRepository(SyncProviderAdapter(slow_provider), ttl_seconds=60, stale_seconds=60)
+        first = repository.get_weather("Paris")
+        clock.advance(90)
+
+        assert repository.get_weather("Paris") is first
+        assert slow_provider.calls == ["Paris"]
+        assert len(submitted) == 1
+        assert repository.stats().stale_hits == 1
+
+    async def test_refresh_replaces_stale_entry(self, clock, slow_provider):
+        """Тест: фоновое обновление кладёт свежие данные, и запись снова свежая"""
+        slow_provider.delay = 0
+        repository = CachedWeatherRepository(slow_provider, ttl_seconds=60, stale_seconds=60)
+        first = await repository.aget_weather("Paris")
+        clock.advance(90)
+
+        refreshed = await repository.refresh(repository.cache_key("Paris"), "Paris")
+
+        assert refreshed is not first
+        assert isinstance(refreshed, WeatherData)
+        assert repository.get_cached("Paris") is refreshed
+        assert slow_provider.calls == ["Paris", "Paris"]
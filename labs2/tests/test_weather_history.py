@@ -0,0 +1,118 @@
+# tests/test_weather_history.py
+import math
+import random
+
+import numpy as np
+import pytest
+
+from labs2.domain.entities.weather_data import WeatherData
+from labs2.infrastructure.history.weather_history import WeatherHistory
+
+
+def reading(temperature, humidity=None) -> WeatherData:
+    return WeatherData("Paris", temperature, "clear", humidity=humidity)
+
+
+@pytest.fixture
+def history():
+    """Показания раз в 10 минут за сутки, в случайном порядке, с пропусками влажности"""
+    rng = random.Random(42)
+    history = WeatherHistory(retention_seconds=None)
+    rows = [(i * 600.0, rng.uniform(-5, 25), None if i % 7 == 0 else rng.randint(30, 90)) for i in range(144)]
+    rng.shuffle(rows)
+    for ts, temperature, humidity in rows:
+        history.record("paris", reading(temperature, humidity), timestamp=ts)
+    history.rows = sorted(rows)
+    return history
+
+
+class TestAggregate:
+    def test_matches_plain_loop(self, history):
+        """Тест: агрегаты за окно совпадают с подсчётом в цикле, None не учитывается"""
+        start, end = 3600.0, 43200.0
+        result = history.aggregate("paris", ("temperature", "humidity"), start, end, percentiles=(50,))
+
+        window = [row for row in history.rows if start <= row[0] < end]
+        for name, column in (("temperature", 1), ("humidity", 2)):
+            values = [row[column] for row in window if row[column] is not None]
+            stats = result[name]
+            assert stats["count"] == len(values)
+            assert stats["min"] == min(values)
+            assert stats["max"] == max(values)
+            assert stats["mean"] == pytest.approx(sum(values) / len(values))
+            assert stats["p50"] == pytest.approx(float(np.median(values)))
+
+    def test_empty_window(self, history):
+        """Тест: пустое окно даёт count 0 и NaN вместо ошибки"""
+        stats = history.aggregate("paris", start=1e9)["temperature"]
+
+        assert stats["count"] == 0
+        assert math.isnan(stats["mean"]) and math.isnan(stats["p95"])
+
+    def test_unknown_city(self):
+        """Тест: для города без истории агрегаты пустые"""
+        history = WeatherHistory()
+
+        assert history.aggregate("paris") == {}
+        assert history.aggregate_many(["paris"]) == {}
+        ts, values = history.resample("paris", "temperature", 3600)
+        assert len(ts) == len(values) == 0
+
+    def test_aggregate_many(self, history):
+        """Тест: сводка по многим городам пропускает города без истории"""
+        history.record("rome", WeatherData("Rome", 30.0, "sunny"), timestamp=0)
+
+        result = history.aggregate_many(["paris", "rome", "oslo"])
+
+        assert set(result) == {"paris", "rome"}
+        assert result["rome"] == {"min": 30.0, "max": 30.0, "mean": 30.0, "count": 1}
+        assert result["paris"]["count"] == 144
+
+
+class TestResample:
+    @pytest.mark.parametrize("how", ["mean", "min", "max", "count"])
+    def test_matches_plain_loop(self, history, how):
+        """Тест: ресемплинг по часам совпадает с группировкой в цикле"""
+        ts, values = history.resample("paris", "humidity", 3600, how=how)
+
+        buckets = {}
+        for timestamp, _, humidity in history.rows:
+            buckets.setdefault(timestamp // 3600 * 3600, []).append(humidity)
+        expected = []
+        for bucket in sorted(buckets):
+            present = [v for v in buckets[bucket] if v is not None]
+            expected.append({
+                "mean": sum(present) / len(present) if present else math.nan,
+                "min": min(present, default=math.nan),
+                "max": max(present, default=math.nan),
+                "count": len(present),
+            }[how])
+
+        assert list(ts) == sorted(buckets)
+        np.testing.assert_allclose(values, expected)
+
+    def test_window_origin(self, history):
+        """Тест: интервалы отсчитываются от start, пустые интервалы не выдаются"""
+        history.record("paris", reading(40.0), timestamp=200_000.0)
+
+        ts, values = history.resample("paris", "temperature", 3600, start=82_800.0, how="count")
+
+        assert list(ts) == [82_800.0, 198_000.0]
+        assert list(values) == [6.0, 1.0]
+
+    def test_unknown_aggregation(self, history):
+        """Тест: неизвестный способ агрегации — ошибка"""
+        with pytest.raises(ValueError):
+            history.resample("paris", "temperature", 3600, how="median")
+
+
+class TestRetention:
+    def test_old_readings_are_trimmed(self):
+        """Тест: при заполнении буфера старые показания отбрасываются, а моложе retention_seconds остаются"""
+        history = WeatherHistory(retention_seconds=100)
+        for ts in range(200):
+            history.record("paris", reading(float(ts)), timestamp=float(ts))
+
+        assert len(history) < 200
+        assert history.aggregate("paris")["temperature"]["min"] > 0
+        assert history.aggregate("paris", start=99.0)["temperature"]["count"] == 101
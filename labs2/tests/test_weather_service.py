@@ -0,0 +1,112 @@
+# tests/test_weather_service.py
+from unittest import mock
+
+import pytest
+
+from labs2.application import weather_service
+from labs2.application.weather_service import WeatherService
+from labs2.domain.entities.weather_data import WeatherData
+from labs2.domain.interfaces.weather_repository import WeatherRepository
+
+
+class StaticRepository(WeatherRepository):
+    """Репозиторий с заранее заданными данными; неизвестный город — ошибка"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def get_weather(self, city: str) -> WeatherData:
+        if city not in self.data:
+            raise LookupError(f"unknown city {city}")
+        return self.data[city]
+
+
+def paris() -> WeatherData:
+    return WeatherData("Paris", 18.04, "clear", feels_like=17.25, humidity=72, wind_speed=3.0,
+                       wind_dir="NW", is_day=False, sunrise="06:30", sunset="19:45")
+
+
+@pytest.fixture
+def service():
+    return WeatherService(StaticRepository({"Paris": paris()}))
+
+
+class TestSummaries:
+    def test_ru_summary(self, service):
+        """Тест русской сводки: заголовок, поля, направление ветра, время суток"""
+        assert service.get_weather_summary("Paris").split("\n") == [
+            "🌆 Погода в Paris: 18.0°C, clear",
+            "🌡️ Ощущается как: 17.2°C",
+            "💧 Влажность: 72%",
+            "🌬️ Ветер: 3.0 м/с (NW)",
+            "🌙 Ночь",
+            "🌅 Восход: 06:30, 🌇 Закат: 19:45",
+        ]
+
+    def test_en_summary(self, service):
+        """Тест английской сводки; пустые поля пропускаются"""
+        summary = service.format_summary(WeatherData("Paris", 18.0, "clear", is_day=True), "en")
+
+        assert summary == "🌆 Weather in Paris: 18.0°C, clear\n🌞 Day"
+
+    def test_locale_fallback(self):
+        """Тест: без локали в вызове используется локаль сервиса"""
+        service = WeatherService(StaticRepository({"Paris": paris()}), locale="en")
+
+        assert service.get_weather_summary("Paris").startswith("🌆 Weather in Paris")
+        assert service.get_weather_summary("Paris", locale="ru").startswith("🌆 Погода в Paris")
+
+    def test_unknown_locale(self):
+        """Тест: неизвестная локаль отклоняется при создании сервиса"""
+        with pytest.raises(ValueError):
+            WeatherService(StaticRepository({}), locale="de")
+
+    def test_summaries_include_errors(self, service):
+        """Тест: пакетные сводки сохраняют порядок, для ошибок — текст ошибки в локали"""
+        summaries = service.get_weather_summaries(["Atlantis", "Paris"], locale="en")
+
+        assert summaries[0] == "Failed to get weather for Atlantis: unknown city Atlantis"
+        assert summaries[1].startswith("🌆 Weather in Paris")
+
+    def test_to_dict(self, service):
+        """Тест: данные для машинных клиентов содержат все поля"""
+        data = service.get_weather_data("Paris")
+
+        assert data["city"] == "Paris"
+        assert set(data) == set(WeatherData.__slots__)
+
+
+class TestSummaryMemo:
+    def test_same_data_is_rendered_once(self, service):
+        """Тест: повторная сводка по тому же объекту берётся из памяти, по локали — отдельно"""
+        with mock.patch.object(weather_service, "render_summary", wraps=weather_service.render_summary) as render:
+            first = service.get_weather_summary("Paris")
+            assert service.get_weather_summary("Paris") is first
+            service.get_weather_summary("Paris", locale="en")
+
+        assert render.call_count == 2
+
+    def test_new_data_is_rendered_again(self, service):
+        """Тест: новые данные — новый объект, и сводка строится заново"""
+        first = service.get_weather_summary("Paris")
+        updated = paris()
+        updated.temperature = 25.0
+        service.repository.data["Paris"] = updated
+
+        assert service.get_weather_summary("Paris") != first
+
+    def test_memo_is_bounded(self):
+        """Тест: память сводок ограничена memo_size"""
+        service = WeatherService(StaticRepository({}), memo_size=2)
+        readings = [WeatherData(f"City {i}", 20.0, "clear") for i in range(5)]
+        for data in readings:
+            service.format_summary(data)
+
+        assert len(service._memo) == 2
+
+    def test_weather_many_passes_through(self, service):
+        """Тест: пакетный запрос возвращает результаты репозитория"""
+        results = service.get_weather_many(["Paris"])
+
+        assert [r.city for r in results] == ["Paris"]
+        assert results[0].ok and results[0].data == paris()